@@ -0,0 +1,144 @@
+"""
+Contains the code for the aggregate functions that can be used in the calculator, which take any number of operands
+Each function is given an iterator of the values rather than separate operands so it can go through them one at a time,
+including values streamed from a file, without needing them all in memory (except the median which needs to select from them)
+This is a pack of functions, added to the registry in 'Registry.py' with the 'register' function the first time one is used
+"""
+
+from Errors import CalcOperationError
+
+def func_sum(values):
+    """Return the sum of all values"""
+
+    total = 0
+    for x in values:
+        total += x
+
+    return total
+
+def func_prod(values):
+    """Return the product of all values"""
+
+    total = 1
+    for x in values:
+        total *= x
+
+    return total
+
+def func_mean(values):
+    """Return the mean of all values"""
+    return welford(values, "mean")[1]
+
+def func_min(values):
+    """Return the smallest value"""
+
+    # use the built-in function which goes through the values one at a time
+    smallest = min(values, default=None)
+    if smallest is None:
+        raise CalcOperationError("Must have at least 1 value", "min", [])
+
+    return smallest
+
+def func_max(values):
+    """Return the largest value"""
+
+    # use the built-in function which goes through the values one at a time
+    largest = max(values, default=None)
+    if largest is None:
+        raise CalcOperationError("Must have at least 1 value", "max", [])
+
+    return largest
+
+def func_var(values):
+    """Return the (sample) variance of all values"""
+
+    count, mean, sum_of_squares = welford(values, "var")
+    if count < 2:
+        raise CalcOperationError("Must have at least 2 values", "var", [mean])
+
+    return sum_of_squares / (count - 1)
+
+def func_stdev(values):
+    """Return the (sample) standard deviation of all values"""
+
+    count, mean, sum_of_squares = welford(values, "stdev")
+    if count < 2:
+        raise CalcOperationError("Must have at least 2 values", "stdev", [mean])
+
+    return (sum_of_squares / (count - 1)).sqrt()
+
+def welford(values, op_name):
+    """
+    Find the mean and sum of squared differences from the mean in a single pass using Welford's algorithm,
+    which updates them for each value so they don't lose accuracy when the values are large compared to their differences
+
+    :param values (iterator): The values
+    :param op_name (str): The name of the operation, for error messages
+    :return (tuple): The number of values, their mean and the sum of the squares of their differences from the mean
+    """
+
+    count = 0
+    mean = sum_of_squares = 0
+    for x in values:
+        count += 1
+        delta = x - mean
+        mean += delta / count
+        sum_of_squares += delta * (x - mean)
+
+    # the functions that call this raise errors for too few values but this makes sure they aren't divided by 0
+    if count == 0:
+        raise CalcOperationError("Must have at least 1 value", op_name, [])
+
+    return count, mean, sum_of_squares
+
+def func_median(values):
+    """Return the median of all values - the middle value when they are in order or the mean of the 2 middle values"""
+
+    values = list(values)
+    if not values:
+        raise CalcOperationError("Must have at least 1 value", "median", [])
+    middle = len(values) // 2
+
+    # if there is an odd number of values, it's the middle one
+    if len(values) % 2 == 1:
+        return select(values, middle)
+
+    # otherwise it's the mean of the 2 middle values
+    return (select(values, middle - 1) + select(values, middle)) / 2
+
+def select(values, k):
+    """
+    Return the value that would be at index 'k' if 'values' was sorted, without sorting it
+    Uses quickselect which only keeps the part of the values the answer is in, so takes linear time on average
+
+    :param values (list): The values to select from
+    :param k (int): The index of the value to find
+    """
+
+    while True:
+
+        # use the middle of the first, middle and last values as the pivot to avoid the worst case with sorted values
+        pivot = sorted([values[0], values[len(values) // 2], values[-1]])[1]
+
+        # split the values into those less than, equal to and greater than the pivot and keep the part 'k' is in
+        lower = [x for x in values if x < pivot]
+        if k < len(lower):
+            values = lower
+            continue
+        num_equal = sum(1 for x in values if x == pivot)
+        if k < len(lower) + num_equal:
+            return pivot
+        k -= len(lower) + num_equal
+        values = [x for x in values if x > pivot]
+
+def register(registry):
+    """Add the functions in this pack to 'registry'"""
+
+    registry.add_function("sum", "Sum", func_sum, None)
+    registry.add_function("prod", "Product", func_prod, None)
+    registry.add_function("mean", "Mean", func_mean, None)
+    registry.add_function("min", "Minimum", func_min, None)
+    registry.add_function("max", "Maximum", func_max, None)
+    registry.add_function("var", "Variance", func_var, None)
+    registry.add_function("stdev", "Standard deviation", func_stdev, None)
+    registry.add_function("median", "Median", func_median, None)
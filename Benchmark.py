@@ -0,0 +1,1025 @@
+"""
+Benchmarks for the calculator's calculation pipeline
+
+Each corpus is a list of generated expressions and each phase of the pipeline ('tokenise', 'convert',
+'execute' and 'post_calc') is timed separately on it, as well as the end-to-end 'calculate' function.
+There are also benchmarks of a long 'Interface' session, of previewing answers while typing, of aggregate functions
+of many operands, of using variables and functions defined in a session, of how often a cache finds expressions that are typed
+again but written differently, of vectors and matrices (including solving 1000 linear equations), of typing into the graphical user interface's text objects, of formatting long text into lines,
+of scrolling through a long memory history, of the graphical user interface's CPU usage while idle and scrolling and of
+calculating very big, deeply nested expressions from files (only run when named as it takes minutes), as well as of the time taken to start a process and import each module. The graphical benchmarks use SDL's dummy
+video driver so don't need a display and are only run by default if pygame is installed (and the matrices if NumPy is).
+For each benchmark, the number of operations per second and the peak memory allocated (or CPU usage) are reported
+
+Run this file directly to benchmark:
+- 'python Benchmark.py' to run every benchmark and print the results
+- 'python Benchmark.py --save' to also store the results as the baseline in the baseline JSON file
+- 'python Benchmark.py --compare' to compare the results with the baseline and exit with a non-zero
+  status if any benchmark has regressed past the threshold (25% by default)
+
+Baselines depend on the machine they were measured on so save them on the machine that compares against them
+"""
+
+from Calc import tokenise, convert, execute, post_calc, calculate, IncrementalCalculator
+from Datatypes import Num, number_files
+from Interface import Interface
+from Definitions import Definitions
+from Errors import CalcError
+from random import Random
+from argparse import ArgumentParser
+from timeit import default_timer
+from importlib.util import find_spec, module_from_spec, spec_from_loader
+from importlib.machinery import SourceFileLoader
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import process_time, sleep
+from tracemalloc import start as start_tracing, stop as stop_tracing, get_traced_memory
+import json
+import os
+import re
+import subprocess
+import sys
+
+# the default location of the baseline results, next to this file
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# the default fraction a benchmark may get worse by before it counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# the seed for generating the corpora so they are identical every run
+SEED = 1892
+
+def corpus_short(rand):
+    """Return a list of short arithmetic expressions"""
+
+    expressions = []
+    for _ in range(500):
+        expressions.append("{} {} {} {} {}".format(
+            rand.randint(1, 1000), rand.choice("+-*/"), round(rand.uniform(1, 100), 3), rand.choice("+-*/"), rand.randint(1, 1000)
+        ))
+
+    return expressions
+
+def corpus_chains(rand):
+    """Return a list of long chains of binary operators"""
+
+    expressions = []
+    for _ in range(20):
+        terms = [str(rand.randint(1, 99))]
+        for _ in range(500):
+            terms.append(rand.choice("+-+-*/"))
+            terms.append(str(rand.randint(1, 99)))
+        expressions.append(" ".join(terms))
+
+    return expressions
+
+def corpus_brackets(rand):
+    """Return a list of expressions with deeply nested brackets"""
+
+    expressions = []
+    for _ in range(20):
+        expr = str(rand.randint(1, 9))
+        for _ in range(300):
+            expr = "({} {} {})".format(expr, rand.choice("+-*"), rand.randint(1, 9))
+        expressions.append(expr)
+
+    return expressions
+
+def corpus_functions(rand):
+    """Return a list of expressions with nested function calls"""
+
+    expressions = []
+    for _ in range(50):
+        expr = str(rand.randint(1, 9))
+        for _ in range(15):
+            expr = rand.choice(["abs({})", "sin({})", "cos({})", "artan({})", "log(abs({}) + 1, 2)", "hcf(abs({}) \\ 1 + 1, 12)"]).format(expr)
+        expressions.append(expr)
+
+    return expressions
+
+def corpus_big(rand):
+    """Return a list of expressions with big factorials and powers"""
+
+    expressions = []
+    for _ in range(20):
+        n = rand.randint(500, 1000)
+        expressions.append("{}! / {}!".format(n, n - rand.randint(1, 20)))
+        expressions.append("{} ^ {} - 1".format(rand.randint(2, 9), rand.randint(100, 300)))
+
+    return expressions
+
+# the corpora to benchmark each phase of the pipeline on, in the order they are run
+CORPORA = {
+    "short": corpus_short,
+    "chains": corpus_chains,
+    "brackets": corpus_brackets,
+    "functions": corpus_functions,
+    "big": corpus_big
+}
+
+def measure(func, inputs, repeat):
+    """
+    Time 'func' on every input and measure the memory it allocates
+
+    :param func (function): The function to call with each input
+    :param inputs (list): The inputs to call 'func' with, one at a time
+    :param repeat (int): The number of times to time all of the inputs - the fastest is used
+    :return (dict): The number of calls per second and the peak memory allocated in KiB
+    """
+
+    # time all of the inputs 'repeat' times and keep the fastest to reduce noise
+    best = float("inf")
+    for _ in range(repeat):
+        start = default_timer()
+        for item in inputs:
+            func(item)
+        best = min(best, default_timer() - start)
+
+    # run once more while tracing allocations to find the peak memory used
+    start_tracing()
+    for item in inputs:
+        func(item)
+    peak = get_traced_memory()[1]
+    stop_tracing()
+
+    return {"ops_per_sec": len(inputs) / best if best > 0 else float("inf"), "peak_kib": peak / 1024}
+
+def benchmark_corpus(expressions, repeat):
+    """Return the results of benchmarking each phase and the whole pipeline on 'expressions'"""
+
+    # get the input for each phase from the output of the last so the phases are timed separately
+    tokens = [tokenise(expr) for expr in expressions]
+    queues = [convert(token_list) for token_list in tokens]
+    answers = [execute(queue) for queue in queues]
+
+    return {
+        "tokenise": measure(tokenise, expressions, repeat),
+        "convert": measure(convert, tokens, repeat),
+        "execute": measure(execute, queues, repeat),
+        "post_calc": measure(post_calc, answers, repeat),
+        "calculate": measure(calculate, expressions, repeat)
+    }
+
+def benchmark_session(rand, repeat):
+    """Return the results of a long 'Interface' session that builds up a lot of memory"""
+
+    expressions = corpus_short(rand) * 10
+
+    def session(num_lookups):
+        """Calculate every expression through one interface and then look through its memory"""
+
+        calc = Interface()
+        for expr in expressions:
+            try:
+                calc.calculate(expr)
+            except CalcError:
+                pass
+        for num in range(1, num_lookups + 1):
+            calc.memory_item(num)
+            calc.recent_memory(5)
+
+    return {"session": measure(session, [len(expressions)], repeat)}
+
+def benchmark_preview(rand, repeat):
+    """Return the results of previewing the answer after every keystroke while typing expressions, incrementally and in full"""
+
+    expressions = [" * ".join(corpus_functions(rand)[:3]) + " + " + expr[:300] for expr in corpus_chains(rand)[:3]]
+
+    def type_expression(expr, calc):
+        """Type 'expr' one character at a time, calculating the answer with 'calc' after each keystroke"""
+
+        for end in range(1, len(expr) + 1):
+            try:
+                calc(expr[:end])
+            except (CalcError, ArithmeticError, ValueError):
+                pass
+
+    results = {
+        "incremental": measure(lambda expr: type_expression(expr, IncrementalCalculator().calculate), expressions, repeat),
+        "full": measure(lambda expr: type_expression(expr, calculate), expressions, repeat)
+    }
+
+    # report the number of keystrokes per second rather than the number of expressions
+    for result in results.values():
+        result["ops_per_sec"] *= sum(len(expr) for expr in expressions) / len(expressions)
+
+    return results
+
+def benchmark_aggregates(rand, repeat, num_values=2000):
+    """
+    Return the results of calculating aggregate functions of many operands
+
+    :param num_values (int): The number of operands of each function. Default: 2000
+    """
+
+    values = ", ".join("{:.3f}".format(rand.uniform(-1000, 1000)) for _ in range(num_values))
+
+    return {name: measure(calculate, ["{}({})".format(name, values)], repeat) for name in ["sum", "mean", "stdev", "median"]}
+
+def benchmark_definitions(rand, repeat, num_calls=200):
+    """
+    Return the results of calling a function defined in a session compared to typing out the expression it stands for each time,
+    and of calculating expressions that have been calculated before so their answers are cached
+
+    :param num_calls (int): The number of times the function is called. Default: 200
+    """
+
+    # the same definitions with and without caching answers so calling the function can be timed
+    uncached, cached = Definitions(max_cached_answers=0), Definitions()
+    for definitions in [uncached, cached]:
+        definitions.calculate("let r = 6371")
+        definitions.calculate("hav(x) = sin(x / 2) ^ 2")
+        definitions.calculate("dist(x, y, u, v) = 2 * r * arsin(2¬(hav(u - x) + cos(x) * cos(u) * hav(v - y)))")
+
+    points = [[round(rand.uniform(-1.5, 1.5), 3) for _ in range(4)] for _ in range(num_calls)]
+    calls = ["dist({}, {}, {}, {})".format(*point) for point in points]
+    typed = ["2 * 6371 * arsin(2¬(sin(({2} - {0}) / 2) ^ 2 + cos({0}) * cos({2}) * sin(({3} - {1}) / 2) ^ 2))".format(*point) for point in points]
+
+    return {
+        "defined": measure(uncached.calculate, calls, repeat),
+        "typed": measure(calculate, typed, repeat),
+        "cached": measure(cached.calculate, calls, repeat)
+    }
+
+def benchmark_matrices(rand, repeat, size=1000):
+    """
+    Return the results of calculating with vectors and matrices, solving 'size' linear equations read from files,
+    and of calculating the short corpus once arrays have been used to check numbers are still as quick
+
+    :param size (int): The number of linear equations (and unknowns) to solve. Default: 1000
+    """
+
+    vector = "[{}]".format(", ".join("{:.3f}".format(rand.uniform(-1000, 1000)) for _ in range(size)))
+
+    with TemporaryDirectory() as directory:
+
+        # write the coefficients (with a big diagonal so there is a solution) and the right hand sides to files
+        matrix_file = os.path.join(directory, "matrix.txt")
+        with open(matrix_file, "w") as f:
+            for row in range(size):
+                f.write(", ".join("{:.6f}".format(rand.random() + (size if row == column else 0)) for column in range(size)) + "\n")
+        vector_file = os.path.join(directory, "vector.txt")
+        with open(vector_file, "w") as f:
+            f.write(", ".join("{:.6f}".format(rand.random()) for _ in range(size)))
+
+        # only the files written here can be read
+        with number_files(directory):
+            return {
+                "elementwise": measure(calculate, ["{0} * 2 + {0} ^ 2".format(vector)], repeat),
+                "solve": measure(calculate, ["solve(reshape([@{}], {size}, {size}), [@{}])".format(matrix_file, vector_file, size=size)], repeat),
+                "scalar": measure(calculate, corpus_short(rand), repeat)
+            }
+
+def benchmark_calculus(rand, repeat, size=100000):
+    """
+    Return the results of summing, integrating and solving expressions, which compile the expression once and evaluate it many times -
+    all at once when every operation in it works on arrays and one at a time otherwise
+
+    :param size (int): The number of values summed. Default: 100000
+    """
+
+    return {
+        "sum": measure(calculate, ["sum(1 / i ^ 2 + sin(i), i, 1, {})".format(size)], repeat),
+        "sum_scalar": measure(calculate, ["sum(hcf(i, 12), i, 1, {})".format(size // 100)], repeat),
+        "integrate": measure(calculate, ["integrate(sin(x) ^ 2 * ln(x + 1), x, 0, 100)"], repeat),
+        "solve": measure(calculate, ["solve(cos(x) - x, x, 0, 1)"], repeat)
+    }
+
+def benchmark_derivatives(rand, repeat, num_points=200):
+    """
+    Return the results of finding derivatives with dual numbers, in a single evaluation, compared to estimating them with
+    finite differences by calculating the expression twice, close together
+
+    :param num_points (int): The number of values the derivative is found at. Default: 200
+    """
+
+    from Derivatives import value_and_derivative
+
+    expr = "sin(x) ^ 2 * ln(x + 1) + x ^ 3"
+    points = ["{:.3f}".format(rand.uniform(0.1, 10)) for _ in range(num_points)]
+
+    def finite_difference(point):
+        step = 1e-7
+        low = calculate(expr.replace("x", "({})".format(point)))
+        high = calculate(expr.replace("x", "({:.10f})".format(float(point) + step)))
+        return (float(high.replace("~", "e")) - float(low.replace("~", "e"))) / step
+
+    return {
+        "diff": measure(calculate, ["diff({}, x, {})".format(expr, point) for point in points], repeat),
+        "value_and_derivative": measure(lambda point: value_and_derivative(expr, "x", point), points, repeat),
+        "finite_difference": measure(finite_difference, points, repeat)
+    }
+
+def benchmark_tabulate(rand, repeat, num_values=10000):
+    """
+    Return the results of tabulating an expression over a range of values, compiling it once, compared to
+    calculating it once per value with the value typed into the expression. Each op is a whole table
+
+    :param num_values (int): The number of values in the table. Default: 10000
+    """
+
+    from Tabulate import tabulate
+    from io import StringIO
+
+    expr = "sin(x) ^ 2 * ln(x + 1) + x ^ 3"
+    step = Num(10) / num_values
+
+    def substituted(_):
+        output = StringIO()
+        for i in range(num_values):
+            value = post_calc(Num(step * i))
+            output.write("{},{}\n".format(value, calculate(expr.replace("x", "({})".format(value)))))
+
+    return {
+        "tabulate": measure(lambda _: tabulate(expr, "x", 0, 10 - step, step, StringIO()), [None], repeat),
+        "substituted": measure(substituted, [None], repeat)
+    }
+
+def benchmark_integers(rand, repeat, num_exprs=200):
+    """
+    Return the results of calculating expressions of only whole numbers, which are calculated exactly with Python's integers,
+    compared to the same expressions with the numbers written with decimal points so they are calculated with 'Num's
+
+    :param num_exprs (int): The number of expressions. Default: 200
+    """
+
+    # small enough that the answers fit in a 'Num' so both give the same answers
+    exprs = []
+    for _ in range(num_exprs):
+        a, b, c = rand.randint(2, 999), rand.randint(2, 8), rand.randint(1, 9999)
+        exprs.append("({} ^ {} - {}) \\ {} % {} + {}! * {}".format(a, b, c, b, c, rand.randint(5, 20), a))
+
+    return {
+        "exact": measure(calculate, exprs, repeat),
+        "decimal": measure(calculate, [re.sub(r"(?<![\d.])(\d+)(?![\d.!])", r"\1.0", expr) for expr in exprs], repeat)
+    }
+
+def benchmark_modular(rand, repeat, bits=2048, num_exprs=20):
+    """
+    Return the results of modular exponentiation with 'bits'-bit numbers, as typed with '^' then '%' (which are fused
+    so the power isn't calculated first) and with 'powmod', and of finding modular inverses
+
+    :param bits (int): The number of bits in the base, exponent and modulus. Default: 2048
+    :param num_exprs (int): The number of expressions. Default: 20
+    """
+
+    # odd so the bases have inverses mod powers of 2
+    numbers = [[rand.getrandbits(bits) | 1 for _ in range(3)] for _ in range(num_exprs)]
+
+    return {
+        "fused": measure(calculate, ["{} ^ {} % {}".format(*values) for values in numbers], repeat),
+        "powmod": measure(calculate, ["powmod({}, {}, {})".format(*values) for values in numbers], repeat),
+        "modinv": measure(calculate, ["modinv({}, 2 ^ {})".format(values[0], bits) for values in numbers], repeat)
+    }
+
+def benchmark_constants(rand, repeat, digits=10000):
+    """
+    Return the results of calculating constants to 'digits' significant figures from nothing, of calculating pi to
+    twice as many carrying on from 'digits', and of getting them again once they're cached
+
+    :param digits (int): The number of significant figures. Default: 10000
+    """
+
+    import Constants
+
+    def calculate_new(name, digits=digits):
+        Constants.cache.clear()
+        Constants.series.clear()
+        Constants.constant(name, digits)
+
+    def extend_pi(_):
+        calculate_new("pi")
+        Constants.pi(2 * digits)
+
+    return {
+        "new": measure(calculate_new, ["pi", "e", "phi"], repeat),
+        "extend": measure(extend_pi, [None], repeat),
+        "cached": measure(lambda name: Constants.constant(name, digits), ["pi", "tau", "e", "phi"], repeat)
+    }
+
+def benchmark_simulate(rand, repeat, n=100000):
+    """
+    Return the results of simulating expressions that use 'rand' 'n' times with 'simulate' - all at once when every operation in them
+    works on arrays and one answer at a time otherwise - compared to calculating them with 'calculate' each time. Each op is a whole simulation
+
+    :param n (int): The number of answers in each simulation. Default: 100000
+    """
+
+    from Simulate import simulate
+
+    expr = "rand(1, 6) + rand(1, 6) * 2 ^ rand(0, 3)"
+
+    return {
+        "vectorised": measure(lambda _: simulate(expr, n, 1), [None], repeat),
+        "scalar": measure(lambda _: simulate("hcf(rand(1, 60), 12)", n // 10, 1), [None], repeat),
+        "calculate": measure(lambda _: [calculate(expr) for _ in range(n // 10)], [None], repeat)
+    }
+
+def benchmark_cache(rand, repeat):
+    """
+    Return the results of calculating expressions in a new session (like another process would) without a shared cache,
+    with a shared cache that already has their answers and with an empty one that the answers are stored in
+    """
+
+    from Cache import SharedCache
+
+    exprs = corpus_functions(rand) + corpus_big(rand)
+
+    with TemporaryDirectory() as directory:
+        warm = SharedCache(os.path.join(directory, "warm.sqlite3"))
+        for expr in exprs:
+            warm.calculate(expr)
+
+        def empty(_):
+            """Calculate every expression with a new shared cache"""
+
+            cache = SharedCache(os.path.join(directory, "empty.sqlite3"))
+            cache.clear()
+            definitions = Definitions(shared_cache=cache)
+            for expr in exprs:
+                definitions.calculate(expr)
+            cache.close()
+
+        results = {
+            "uncached": measure(lambda _: [Definitions().calculate(expr) for expr in exprs], [None], repeat),
+            "shared": measure(lambda _: [Definitions(shared_cache=warm).calculate(expr) for expr in exprs], [None], repeat),
+            "storing": measure(empty, [None], repeat)
+        }
+        warm.close()
+
+    return results
+
+# the precedence of the operators in calculations written by 'write_calculation' - lower numbers are executed first
+PRECEDENCE = {"+": 4, "-": 4, "*": 3, "/": 3}
+
+def random_calculation(rand, depth):
+    """Return a random calculation as a tree - a number or constant, or a function and its operand, or an operator and its 2 operands"""
+
+    if depth == 0 or rand.random() < 0.3:
+        return rand.choice([str(rand.randint(1, 100)), str(round(rand.uniform(0.1, 10), 2)), "pi", "e"])
+    if rand.random() < 0.2:
+        return (rand.choice(["sin", "cos", "abs", "artan"]), random_calculation(rand, depth - 1))
+
+    return (rand.choice("+-*/"), random_calculation(rand, depth - 1), random_calculation(rand, depth - 1))
+
+def write_calculation(rand, tree, parent=None, is_right=False):
+    """
+    Return the calculation 'tree' (see 'random_calculation') written as a user might type it - sometimes with the operands of '+'
+    and '*' the other way round, extra brackets, different spacing or whole numbers written as sums
+
+    :param parent (str): The operator it's an operand of. Default: None
+    :param is_right (bool): Whether or not it's the right operand of that operator. Default: False
+    """
+
+    if isinstance(tree, str):
+        if tree.isdigit() and int(tree) > 1 and rand.random() < 0.1:
+            first = rand.randint(1, int(tree) - 1)
+            return "({} + {})".format(first, int(tree) - first)
+        return tree
+
+    if len(tree) == 2:
+        return "{}({})".format(tree[0], write_calculation(rand, tree[1]))
+
+    operator, left, right = tree
+    if operator in "+*" and rand.random() < 0.5:
+        left, right = right, left
+    space = rand.choice(["", " "])
+    text = write_calculation(rand, left, operator) + space + operator + space + write_calculation(rand, right, operator, True)
+
+    # brackets are needed around operators executed after their parent, or at the same time on its right
+    needed = parent is not None and (PRECEDENCE[operator] > PRECEDENCE[parent] or is_right and PRECEDENCE[operator] == PRECEDENCE[parent])
+    return "({})".format(text) if needed or rand.random() < 0.1 else text
+
+def benchmark_canonical(rand, repeat, num_calculations=100, num_typed=1000):
+    """
+    Return the percentage of expressions found in a cache of answers when calculations are typed many times, written differently
+    (see 'write_calculation'), if the cache were keyed by the expression as it was typed and with a 'SharedCache', which is keyed
+    by the hash of its canonical form, as well as the time taken to find the hash of each compiled expression
+    """
+
+    from Cache import SharedCache
+    from Calc import compile_expression
+    from Optimiser import structural_hash
+
+    # calculations that give an error (such as dividing by 0) aren't cached so aren't used
+    calculations = []
+    while len(calculations) < num_calculations:
+        tree = random_calculation(rand, 3)
+        try:
+            calculate(write_calculation(rand, tree))
+            calculations.append(tree)
+        except CalcError:
+            pass
+
+    # some calculations are typed much more often than others
+    weights = [1 / (rank + 1) for rank in range(num_calculations)]
+    exprs = [write_calculation(rand, tree) for tree in rand.choices(calculations, weights, k=num_typed)]
+    programs = [compile_expression(expr, defer=True) for expr in exprs]
+
+    with TemporaryDirectory() as directory:
+
+        def calculate_all(_):
+            """Calculate every expression with a new shared cache and return its metrics"""
+
+            cache = SharedCache(os.path.join(directory, "cache.sqlite3"))
+            cache.clear()
+            for expr in exprs:
+                cache.calculate(expr)
+            metrics = cache.metrics()
+            cache.close()
+
+            return metrics
+
+        canonical = measure(calculate_all, [None], repeat)
+        canonical["hit_percent"] = calculate_all(None)["hit_rate"] * 100
+
+    return {
+        "typed": {"hit_percent": (1 - len(set(exprs)) / len(exprs)) * 100},
+        "canonical": canonical,
+        "hash": measure(structural_hash, programs, repeat)
+    }
+
+def benchmark_programs(rand, repeat):
+    """
+    Return the results of compiling expressions the way a new process does - without stored compiled expressions,
+    loading them all from a 'ProgramCache' and, for comparison, from a cache that has already loaded them. Each op is all of them
+    """
+
+    from Cache import ProgramCache
+    from Calc import compile_expression
+
+    exprs = corpus_short(rand) + corpus_chains(rand) + corpus_functions(rand)
+
+    with TemporaryDirectory() as directory:
+        stored = ProgramCache(directory)
+        for expr in exprs:
+            stored.compile(expr)
+        stored.save()
+
+        def load(_):
+            """Open the stored compiled expressions and load every one"""
+
+            cache = ProgramCache(directory)
+            for expr in exprs:
+                cache.compile(expr)
+            cache.close()
+
+        results = {
+            "compile": measure(lambda _: [compile_expression(expr) for expr in exprs], [None], repeat),
+            "load": measure(load, [None], repeat),
+            "loaded": measure(lambda _: [stored.compile(expr) for expr in exprs], [None], repeat)
+        }
+        stored.close()
+
+    return results
+
+def benchmark_parallel(rand, repeat, workers=2):
+    """
+    Return the results of calculating an expression with independent parts that take a long time with 'calculate'
+    and with 'calculate_parallel', and of calculating short expressions with 'calculate_parallel', which should stay as fast as 'calculate'
+
+    :param workers (int): The number of worker processes. Default: 2
+    """
+
+    from Parallel import calculate_parallel, get_pool, close_pools
+
+    expr = "powmod(2^2000+1, 3^2000, 5^1500+7) + powmod(2^2000+3, 3^2000+1, 5^1500+9)"
+    exprs = corpus_short(rand)
+
+    # start the workers first so starting them isn't timed
+    get_pool(workers)
+    results = {
+        "serial": measure(calculate, [expr], repeat),
+        "parallel": measure(lambda expr: calculate_parallel(expr, workers), [expr], repeat),
+        "cheap": measure(lambda _: [calculate_parallel(expr, workers) for expr in exprs], [None], repeat)
+    }
+    close_pools()
+
+    return results
+
+def write_nested(f, rand, size, depth):
+    """
+    Write a generated expression of at least 'size' characters to the file 'f', made of blocks of 2000 terms
+    inside brackets and functions nested 'depth' deep, like the expressions generated by other programs
+
+    :return (int): The number of characters written
+    """
+
+    # a few different blocks are generated and repeated in a random order as generating them all would take longer than calculating them
+    opens = ["(", "abs(", "max(0, ", "-(", "min(1000000, ", "sum(1, ", "if(0, 0, "]
+    blocks = []
+    for _ in range(8):
+        terms = " + ".join("{} * {} - {}".format(rand.randint(1, 99), rand.randint(1, 99), rand.randint(1, 99)) for _ in range(2000))
+        blocks.append("".join(rand.choice(opens) for _ in range(depth)) + terms + ")" * depth)
+
+    written = 0
+    while written < size:
+        block = rand.choice(blocks) if written == 0 else " + " + rand.choice(blocks)
+        f.write(block)
+        written += len(block)
+
+    return written
+
+def benchmark_stream(rand, repeat, megabytes=100, depth=2000):
+    """
+    Return the results of calculating generated expressions nested 'depth' deep from files with 'calculate_file' - the time taken
+    for one of 'megabytes' MB (only timed once as it takes minutes) and the speed and memory used for ones of 1 MB, which
+    should use the same small amount of memory however big the file is. 'calculate' can't calculate them as they're nested too deep
+    """
+
+    from Stream import calculate_file
+
+    with TemporaryDirectory() as directory:
+        big = os.path.join(directory, "big.txt")
+        with open(big, "w") as f:
+            size = write_nested(f, rand, megabytes * 10 ** 6, depth)
+        small = os.path.join(directory, "small.txt")
+        with open(small, "w") as f:
+            write_nested(f, rand, 10 ** 6, depth)
+
+        start = default_timer()
+        calculate_file(big)
+        seconds = default_timer() - start
+
+        return {
+            "file": {"mb_per_sec": size / 10 ** 6 / seconds},
+            "nested": measure(calculate_file, [small], repeat)
+        }
+
+def benchmark_typing(rand, repeat):
+    """
+    Return the results of typing expressions one key at a time into text objects the way the graphical user interface does
+    Uses SDL's dummy video driver so no window is needed
+    """
+
+    # only import pygame when needed so the other benchmarks run without it
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame as pg
+    from PygameTools import COLOURS, Draw, format_text
+
+    pg.init()
+    display = pg.Surface((800, 600))
+    expressions = [expr[:200] for expr in corpus_chains(rand)[:5]]
+
+    def type_expression(expr):
+        """Type 'expr' one character at a time, updating and drawing the text objects after each keystroke"""
+
+        drawer = Draw(display, "freesansbold.ttf")
+        texts = []
+        for end in range(1, len(expr) + 1):
+
+            # the same steps as the graphical user interface's '__update_text_and_buttons' method
+            lines = format_text(expr[:end], 18, 5, True)
+            for count, line in enumerate(lines):
+                if len(texts) > count:
+                    texts[count].edit_text_message(line)
+                else:
+                    texts.append(drawer.text(line, 35, COLOURS["blue"], (300, 200 + (30 * count))))
+            texts = texts[:len(lines)]
+
+            for text in texts:
+                text.draw()
+
+    result = measure(type_expression, expressions, repeat)
+
+    # report the number of keystrokes per second rather than the number of expressions
+    result["ops_per_sec"] *= sum(len(expr) for expr in expressions) / len(expressions)
+
+    return {"keystrokes": result}
+
+def benchmark_layout(rand, repeat, length=10000):
+    """
+    Return the results of formatting long text into lines, from scratch and while typing it one character at a time
+
+    :param length (int): The number of characters in each text. Default: 10000
+    """
+
+    # only import pygame when needed so the other benchmarks run without it
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from PygameTools import TextLayout
+
+    expressions = ["".join(corpus_chains(rand))[:length] for _ in range(3)]
+    words = [" ".join(rand.choice(["the", "calculator", "answer", "memory", "expression\n"]) for _ in range(length // 6))[:length] for _ in range(3)]
+
+    def type_expression(expr):
+        """Type 'expr' one character at a time, formatting it after each keystroke the way the graphical user interface does"""
+
+        layout = TextLayout()
+        for end in range(1, len(expr) + 1):
+            layout.format(expr[:end], 18, 5, True)
+
+    results = {
+        "characters": measure(lambda text: TextLayout().format(text, 18, None, True), expressions, repeat),
+        "words": measure(lambda text: TextLayout().format(text, 75), words, repeat),
+        "typing": measure(type_expression, expressions[:1], repeat)
+    }
+
+    # report the number of keystrokes per second rather than the number of expressions
+    results["typing"]["ops_per_sec"] *= len(expressions[0])
+
+    return results
+
+def benchmark_history(rand, repeat, num_items=100000):
+    """
+    Return the results of scrolling through a long memory history in a virtualised list the way the graphical user interface does
+    Uses SDL's dummy video driver so no window is needed
+
+    :param num_items (int): The number of items in memory. Default: 100000
+    """
+
+    # only import pygame when needed so the other benchmarks run without it
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame as pg
+    from PygameTools import COLOURS, Draw, format_text
+
+    pg.init()
+    display = pg.Surface((800, 600))
+    drawer = Draw(display, "freesansbold.ttf")
+
+    calc = Interface()
+    for num in range(num_items):
+        calc.remember("{0}*{0}".format(num), str(num * num))
+
+    def format_row(index):
+        """Format the memory item the same way the graphical user interface does"""
+
+        expression, answer = calc.memory_item(index + 1)
+        return format_text("{}: {} ({})".format(index + 1, answer, expression), 15, 3, True)
+
+    history = drawer.virtual_list((600, 100, 200, 500), 100, COLOURS["black"], 20, COLOURS["white"], calc.len_memory, format_row)
+
+    # scroll mostly down with some scrolling back up, drawing after each scroll
+    scrolls = [rand.choice([30] * 3 + [-30]) for _ in range(200)]
+
+    def scroll_and_draw(pixels):
+        """Scroll the list and draw it"""
+
+        history.scroll(pixels)
+        history.draw()
+
+    return {"scrolling": measure(scroll_and_draw, scrolls, repeat)}
+
+def benchmark_startup(rand, repeat):
+    """
+    Return the time taken to start a new process and import each module (measured by 'python -X importtime')
+    and to start a new process, import 'Calc.py' and calculate an answer, as worker processes do
+    The processes are run from another directory to check the modules don't depend on being run from this one
+    """
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=directory)
+
+    def run(args):
+        """Run python with 'args' from the root directory and return what it outputs to stdout and stderr"""
+
+        process = subprocess.run([sys.executable] + args, cwd=os.path.abspath(os.sep), env=env, capture_output=True, text=True, check=True)
+        return process.stdout, process.stderr
+
+    def import_time(module):
+        """Return the number of milliseconds it took to import 'module' (including what it imports) in a new process"""
+
+        # the line for the module itself is the only one that isn't indented
+        for line in run(["-X", "importtime", "-c", "import " + module])[1].splitlines():
+            if line.startswith("import time:") and line.split("|")[2] == " " + module:
+                return int(line.split("|")[1]) / 1000
+
+        raise RuntimeError("'{}' wasn't imported".format(module))
+
+    # keep the fastest of each to reduce noise
+    results = {}
+    for module in ["Calc", "Interface", "Worker"]:
+        results[module] = {"startup_ms": min(import_time(module) for _ in range(repeat))}
+    script = "from timeit import default_timer; start = default_timer(); from Calc import calculate; calculate('1+1'); print((default_timer() - start) * 1000)"
+    results["first_answer"] = {"startup_ms": min(float(run(["-c", script])[0]) for _ in range(repeat))}
+
+    return results
+
+def load_user_interface():
+    """Return the graphical user interface module, which can't be imported normally because of its '.pyw' extension"""
+
+    loader = SourceFileLoader("UserInterface", os.path.join(os.path.dirname(os.path.abspath(__file__)), "UserInterface.pyw"))
+    module = module_from_spec(spec_from_loader(loader.name, loader))
+    loader.exec_module(module)
+
+    return module
+
+def benchmark_window(rand, repeat, duration=1):
+    """
+    Return the CPU usage of the graphical user interface, and the number of pixels it updates on the screen,
+    while it is idle and while scrolling through the instructions
+    Uses SDL's dummy video driver so no window is needed and events are posted to the window from another thread
+
+    :param duration (float): The number of seconds to measure each phase for. Default: 1
+    """
+
+    # only import pygame when needed so the other benchmarks run without it
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame as pg
+    UserInterface = load_user_interface()
+
+    # count the pixels updated on the screen as the dummy video driver makes updating the screen itself free
+    update = pg.display.update
+    updated_pixels = [0]
+
+    def counting_update(rects=None):
+        """Update the screen, counting the pixels updated"""
+
+        if rects is None:
+            updated_pixels[0] += pg.display.get_surface().get_width() * pg.display.get_surface().get_height()
+        else:
+            updated_pixels[0] += sum(pg.Rect(rect).width * pg.Rect(rect).height for rect in ([rects] if isinstance(rects, pg.Rect) else rects))
+        update(rects)
+
+    def measure_cpu(post_event=None):
+        """Return the CPU usage and pixels updated over 'duration' seconds, calling 'post_event' 60 times a second if given"""
+
+        start_cpu, start, start_pixels = process_time(), default_timer(), updated_pixels[0]
+        while default_timer() - start < duration:
+            if post_event is not None:
+                post_event()
+            sleep(1 / 60)
+        elapsed = default_timer() - start
+
+        return {"cpu_percent": 100 * (process_time() - start_cpu) / elapsed, "kpixels_per_sec": (updated_pixels[0] - start_pixels) / 1000 / elapsed}
+
+    def drive(results):
+        """Measure the window in each phase and then close it"""
+
+        # wait for the window to open
+        while pg.display.get_surface() is None:
+            sleep(0.01)
+        sleep(0.2)
+
+        results["idle"] = measure_cpu()
+
+        # the dummy video driver keeps the mouse at (0, 0), over the instructions button
+        pg.event.post(pg.event.Event(pg.MOUSEBUTTONDOWN, button=1, pos=(0, 0)))
+        scroll = [5] * 30 + [4] * 30
+        results["scrolling"] = measure_cpu(lambda: pg.event.post(pg.event.Event(pg.MOUSEBUTTONDOWN, button=scroll[rand.randrange(len(scroll))], pos=(0, 0))))
+
+        pg.event.post(pg.event.Event(pg.QUIT))
+
+    # keep the best of each metric from each run to reduce noise
+    best = {}
+    pg.display.update = counting_update
+    try:
+        for _ in range(repeat):
+            results = {}
+            driver = Thread(target=drive, args=(results,))
+            driver.start()
+            UserInterface.Window().run()
+            driver.join()
+            for phase, result in results.items():
+                for metric, value in result.items():
+                    best.setdefault(phase, {})[metric] = min(best.get(phase, {}).get(metric, value), value)
+    finally:
+        pg.display.update = update
+
+    return best
+
+# the benchmarks other than the corpora and the module each needs to be installed to run by default ('None' if none)
+SUITES = {
+    "startup": (benchmark_startup, None),
+    "session": (benchmark_session, None),
+    "preview": (benchmark_preview, None),
+    "aggregates": (benchmark_aggregates, None),
+    "definitions": (benchmark_definitions, None),
+    "matrices": (benchmark_matrices, "numpy"),
+    "calculus": (benchmark_calculus, None),
+    "derivatives": (benchmark_derivatives, None),
+    "tabulate": (benchmark_tabulate, None),
+    "integers": (benchmark_integers, None),
+    "modular": (benchmark_modular, None),
+    "constants": (benchmark_constants, None),
+    "simulate": (benchmark_simulate, None),
+    "cache": (benchmark_cache, None),
+    "canonical": (benchmark_canonical, None),
+    "programs": (benchmark_programs, None),
+    "parallel": (benchmark_parallel, None),
+    "stream": (benchmark_stream, None),
+    "typing": (benchmark_typing, "pygame"),
+    "layout": (benchmark_layout, "pygame"),
+    "history": (benchmark_history, "pygame"),
+    "window": (benchmark_window, "pygame")
+}
+
+# the benchmarks that take minutes so are only run when they're named
+NAMED_ONLY = ["stream"]
+
+# the units of each metric and whether or not higher is better
+METRICS = {
+    "ops_per_sec": ("ops/sec", True),
+    "peak_kib": ("KiB peak", False),
+    "cpu_percent": ("% CPU", False),
+    "kpixels_per_sec": ("kpx/sec", False),
+    "startup_ms": ("ms startup", False),
+    "mb_per_sec": ("MB/sec", True),
+    "hit_percent": ("% hits", True)
+}
+
+def run_benchmarks(repeat=3, names=None):
+    """
+    Run the benchmarks and return the results
+
+    :param repeat (int): The number of times to time each benchmark - the best is used. Default: 3
+    :param names (list): The names of the corpora and other benchmarks to run. 'None' means all. Default: None
+    :return (dict): The results of each benchmark with keys of the form 'corpus/phase'
+    """
+
+    results = {}
+    for name, generate in CORPORA.items():
+        if names is None or name in names:
+            for phase, result in benchmark_corpus(generate(Random(SEED)), repeat).items():
+                results["{}/{}".format(name, phase)] = result
+
+    for name, (benchmark, needs) in SUITES.items():
+
+        # the graphical benchmarks are only run by default if pygame is installed and the matrices if NumPy is
+        if names is None and name not in NAMED_ONLY and (needs is None or find_spec(needs) is not None) or names is not None and name in names:
+            for phase, result in benchmark(Random(SEED), repeat).items():
+                results["{}/{}".format(name, phase)] = result
+
+    return results
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Return a list of messages describing each benchmark that has regressed past 'threshold' compared to 'baseline'
+
+    :param results (dict): The results of the current run
+    :param baseline (dict): The results of the baseline run
+    :param threshold (float): The fraction a benchmark may get worse by before it counts as a regression
+    :return (list): The regressions - empty if there are none
+    """
+
+    regressions = []
+    for key, result in results.items():
+
+        # benchmarks added since the baseline was saved can't have regressed
+        if key not in baseline:
+            continue
+
+        for metric, value in result.items():
+            unit, higher_is_better = METRICS[metric]
+            old_value = baseline[key].get(metric)
+
+            # metrics added since the baseline was saved can't have regressed
+            if old_value is None:
+                continue
+
+            # higher is a regression if lower is better and vice versa
+            if higher_is_better and value < old_value * (1 - threshold) or not higher_is_better and value > old_value * (1 + threshold):
+                regressions.append("{}: {:.1f} {} is worse than the baseline of {:.1f} {}".format(key, value, unit, old_value, unit))
+
+    return regressions
+
+def format_result(key, result):
+    """Return a line describing the result of a benchmark"""
+
+    return "{:<24}".format(key) + "".join(" {:>14.1f} {:<8}".format(value, METRICS[metric][0]) for metric, value in result.items())
+
+def main(argv=None):
+    """Run the benchmarks from the command line and return the exit status"""
+
+    parser = ArgumentParser(description="Benchmark the calculator's calculation pipeline")
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="fail if any benchmark has regressed compared to the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="the fraction a benchmark may get worse by before it fails. Default: %(default)s")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="the baseline JSON file. Default: %(default)s")
+    parser.add_argument("--repeat", type=int, default=3, help="the number of times to time each benchmark. Default: %(default)s")
+    parser.add_argument("names", nargs="*", help="the corpora and other benchmarks to run. Default: all")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.repeat, args.names or None)
+
+    for key, result in results.items():
+        print(format_result(key, result))
+
+    status = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print("\nNo baseline to compare with - run with '--save' first")
+            return 1
+
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for message in regressions:
+                print(message)
+            status = 1
+        else:
+            print("\nNo regressions")
+
+    # save after comparing so a run can check against the old baseline and then replace it
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+        print("\nSaved the baseline to '{}'".format(args.baseline))
+
+    return status
+
+# only runs if the file is run directly (not if imported)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,645 @@
+"""
+Contains the code for caches that outlast a process: a cache of answers and a cache of compiled expressions
+
+The cache of answers is shared by every process on the same computer, such as many worker processes, so an expression
+calculated by one doesn't need to be calculated again by the others. It's stored in an SQLite file in write-ahead logging mode so any number
+of processes can read it while another writes to it. It holds a limited number of answers, forgetting the least recently used first, and
+counts how many expressions were found in it (hits) and not (misses). Only answers that are always the same are stored, so not those using 'rand'
+
+Answers are stored by a hash of the expression's canonical form (see 'structural_hash' in 'Optimiser.py'), so they're found however
+the expression is written, the precision of calculations, the calculator's code (so changing it never gives old answers)
+and, if the expression uses variables or functions defined by the user, the definitions made (see 'Definitions.py'), so expressions that
+don't use any definitions are shared by every process however different their definitions are. They're also stored by the expression
+as it was typed so an expression typed the same way again is found without compiling it
+
+Use 'open_cache' to get the cache stored in a file and give it to 'Definitions' or 'Interface' as 'shared_cache' (or use its 'calculate' method)
+If the file can't be used (for example if it's locked for too long), the cache acts as if it's empty rather than stopping answers being calculated
+
+The cache of compiled expressions ('ProgramCache') stores them in a compact binary file in a directory, so a process that starts again
+loads them instead of compiling the same expressions again. The file is memory-mapped and each expression is only decoded the first time
+it's used, so loading is fast however many there are. It starts with a hash of every operation in the registry (see 'signature' in
+'Registry.py') and the precision of calculations, so it's ignored (and replaced when saved) if either changes
+"""
+
+from Calc import compile_expression, execute, post_calc, identify
+from Datatypes import Queue, Num, Operator, FunctionInstance, Variable
+from Registry import registry
+from Optimiser import structural_hash
+from decimal import getcontext
+from hashlib import sha256
+from tempfile import gettempdir
+from time import time
+import atexit
+import mmap
+import os
+import sqlite3
+
+DEFAULT_PATH = os.path.join(gettempdir(), "calculator_cache.sqlite3")   # the file used if no other is given
+DEFAULT_MAX_ANSWERS = 100000    # the most answers stored by default
+TOUCH_SECONDS = 60              # how out of date the last time an answer was used can be before it's updated, to avoid writing on every hit
+TIMEOUT_SECONDS = 1             # how long to wait for another process to finish writing before giving up
+EVICT_FRACTION = 0.1            # the fraction of the answers forgotten when there are too many so it isn't done on every store
+SAVE_METRICS_EVERY = 100        # the most hits and misses counted in a process before they're added to the totals in the file
+SAVE_METRICS_SECONDS = 1        # the longest time before they're added, so processes that are stopped suddenly lose few
+
+DEFAULT_PROGRAMS_DIRECTORY = os.path.join(gettempdir(), "calculator")    # the directory compiled expressions are stored in if no other is given
+PROGRAMS_FILE = "programs.bin"  # the name of the file they're stored in
+PROGRAMS_MAGIC = b"CALCPRG1"    # the start of the file, which changes if the format does
+
+# the tags at the start of each token of a stored compiled expression
+TAG_INT = 1             # a whole number stored as an 'int'
+TAG_NUM = 2             # a 'Num'
+TAG_OPERATOR = 3        # an operator, followed by its position in the operator table (see 'operator_table')
+TAG_VARIABLE = 4        # a variable, followed by its name
+TAG_FUNCTION = 5        # a function, followed by its symbol, the expression with a variable bound in it if any and its operands
+TAG_PROGRAM = 6         # an operand of a function that is a compiled expression
+
+# the version of the calculator's code, found the first time it's needed by 'code_version'
+version = None
+
+def code_version():
+    """Return a hash of the calculator's code, which changes whenever any of its modules do"""
+
+    global version
+    if version is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        code = sha256()
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".py"):
+                with open(os.path.join(directory, name), "rb") as f:
+                    code.update(f.read())
+        version = code.hexdigest()
+
+    return version
+
+class SharedCache:
+    """
+    A cache of answers stored in an SQLite file that any number of processes can use at once
+    Each process has its own connection to the file, opened the first time it's needed (including after forking)
+
+    :param path (str): The path to the file, which is created if it doesn't exist. Default: 'DEFAULT_PATH'
+    :param max_answers (int): The most answers to store - the least recently used are forgotten first. An answer stored by both
+        the hash of the expression's canonical form and the expression as it was typed counts twice. Default: 'DEFAULT_MAX_ANSWERS'
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_answers=DEFAULT_MAX_ANSWERS):
+        self.path = path
+        self.max_answers = max_answers
+
+        # private attributes
+        self.__connection = None
+        self.__pid = None
+        self.__hits = 0             # the hits and misses in this process
+        self.__misses = 0
+        self.__unsaved = [0, 0]     # the hits and misses in this process not yet added to the totals in the file
+        self.__saved_time = time()
+
+    def __connect(self):
+        """Return this process's connection to the file, opening it and creating the tables if needed"""
+
+        if self.__connection is None or self.__pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=TIMEOUT_SECONDS, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, answer TEXT NOT NULL, used INTEGER NOT NULL) WITHOUT ROWID")
+            connection.execute("CREATE INDEX IF NOT EXISTS answers_by_use ON answers (used)")
+            connection.execute("CREATE TABLE IF NOT EXISTS metrics (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            connection.execute("INSERT OR IGNORE INTO metrics VALUES ('hits', 0), ('misses', 0), ('evictions', 0)")
+            self.__connection = connection
+            self.__pid = os.getpid()
+            atexit.register(self.close)
+
+        return self.__connection
+
+    def key(self, expr, definitions=""):
+        """
+        Return the key the answer to 'expr' is stored by
+
+        :param expr (str): The expression, or the hash of its canonical form
+        :param definitions (str): A hash of the definitions made if the expression uses any, otherwise ''. Default: ''
+        """
+
+        return sha256("\0".join([code_version(), str(getcontext().prec), definitions, expr.strip()]).encode()).hexdigest()
+
+    def get(self, expr, definitions="", count_miss=True):
+        """
+        Return the stored answer to 'expr' or 'None' if it isn't stored
+
+        :param expr (str): The expression, or the hash of its canonical form
+        :param definitions (str): A hash of the definitions made if the expression uses any (see 'key'). Default: ''
+        :param count_miss (bool): Whether or not to count it as a miss if it isn't stored - not when it will be looked up
+            again by the hash of its canonical form, so each expression only counts once. Default: True
+        :return ans (str): The answer to 'expr' or 'None'
+        """
+
+        key = self.key(expr, definitions)
+        try:
+            connection = self.__connect()
+            row = connection.execute("SELECT answer, used FROM answers WHERE key = ?", (key,)).fetchone()
+
+            # only update when it was last used now and then so most hits don't write to the file
+            now = int(time())
+            if row is not None and now - row[1] > TOUCH_SECONDS:
+                connection.execute("UPDATE answers SET used = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            row = None
+
+        if row is None:
+            if count_miss:
+                self.__misses += 1
+                self.__unsaved[1] += 1
+        else:
+            self.__hits += 1
+            self.__unsaved[0] += 1
+
+        if sum(self.__unsaved) >= SAVE_METRICS_EVERY or time() - self.__saved_time >= SAVE_METRICS_SECONDS:
+            try:
+                self.save_metrics()
+            except sqlite3.Error:
+                pass
+
+        return row[0] if row is not None else None
+
+    def put(self, expr, ans, definitions="", text=None):
+        """
+        Store the answer to 'expr', forgetting the least recently used answers if there are too many
+        Only store answers that are always the same for the expression, so not those that use 'rand'
+
+        :param expr (str): The expression, or the hash of its canonical form
+        :param ans (str): The answer to 'expr'
+        :param definitions (str): A hash of the definitions made if the expression uses any (see 'key'). Default: ''
+        :param text (str): The expression as it was typed if 'expr' is the hash of its canonical form, to store it by as well. Default: None
+        """
+
+        keys = {self.key(expr, definitions)}
+        if text is not None:
+            keys.add(self.key(text, definitions))
+
+        try:
+            connection = self.__connect()
+            now = int(time())
+            connection.executemany("INSERT OR REPLACE INTO answers VALUES (?, ?, ?)", [(key, ans, now) for key in keys])
+
+            # forget a batch of the least recently used answers at once when there are too many
+            excess = connection.execute("SELECT count(*) FROM answers").fetchone()[0] - self.max_answers
+            if excess > 0:
+                excess += int(self.max_answers * EVICT_FRACTION)
+                connection.execute("DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY used LIMIT ?)", (excess,))
+                connection.execute("UPDATE metrics SET value = value + ? WHERE name = 'evictions'", (excess,))
+
+            self.save_metrics()
+        except sqlite3.Error:
+            pass
+
+    def save_metrics(self):
+        """Add the hits and misses in this process since they were last saved to the totals for every process in the file"""
+
+        hits, misses = self.__unsaved
+        if hits or misses:
+            connection = self.__connect()
+            connection.execute("UPDATE metrics SET value = value + CASE name WHEN 'hits' THEN ? WHEN 'misses' THEN ? ELSE 0 END", (hits, misses))
+            self.__unsaved = [0, 0]
+        self.__saved_time = time()
+
+    def calculate(self, expr):
+        """
+        Return the answer to 'expr' (without any definitions) from the cache, or calculate it like 'calculate' in 'Calc.py' and store it
+        If CalcError is raised, it is due to an invalid expression so needs to be caught and presented as an error message
+
+        :param expr (str): The expression
+        :return ans (str): The answer to 'expr'
+        """
+
+        # only compiled (without executing its functions yet) if it hasn't been typed the same way before, to look it up by the hash of its canonical form
+        ans = self.get(expr, count_miss=False)
+        if ans is None:
+            program = compile_expression(expr, defer=True)
+            key = structural_hash(program) or expr
+            ans = self.get(key)
+            if ans is None:
+                ans = post_calc(execute(program))
+                if all(getattr(token, "pure", True) for token in program):
+                    self.put(key, ans, text=expr)
+
+        return ans
+
+    def metrics(self):
+        """
+        Return the hits, misses and hit rate in this process and for every process using the file, the number of answers
+        stored and the number forgotten because there were too many
+
+        :return (dict): The metrics, with the totals for every process keyed by 'total_hits', 'total_misses' and 'total_hit_rate'
+        """
+
+        metrics = {"hits": self.__hits, "misses": self.__misses, "hit_rate": self.__hits / max(self.__hits + self.__misses, 1)}
+        try:
+            self.save_metrics()
+            connection = self.__connect()
+            totals = dict(connection.execute("SELECT name, value FROM metrics").fetchall())
+            metrics["answers"] = connection.execute("SELECT count(*) FROM answers").fetchone()[0]
+        except sqlite3.Error:
+            return metrics
+
+        metrics["total_hits"] = totals["hits"]
+        metrics["total_misses"] = totals["misses"]
+        metrics["total_hit_rate"] = totals["hits"] / max(totals["hits"] + totals["misses"], 1)
+        metrics["evictions"] = totals["evictions"]
+
+        return metrics
+
+    def clear(self):
+        """Forget every answer stored and reset the metrics, for every process using the file"""
+
+        connection = self.__connect()
+        connection.execute("DELETE FROM answers")
+        connection.execute("UPDATE metrics SET value = 0")
+        self.__hits = self.__misses = 0
+        self.__unsaved = [0, 0]
+
+    def close(self):
+        """Save the metrics and close this process's connection to the file"""
+
+        if self.__connection is not None and self.__pid == os.getpid():
+            try:
+                self.save_metrics()
+            except sqlite3.Error:
+                pass
+            self.__connection.close()
+        self.__connection = None
+
+    def __getstate__(self):
+
+        # connections can't be sent to other processes so they open their own
+        return {"path": self.path, "max_answers": self.max_answers}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["max_answers"])
+
+    def __repr__(self):
+        return "SharedCache({})".format(self.path)
+
+# the caches opened in this process, keyed by the path to their file
+caches = {}
+
+def open_cache(path=DEFAULT_PATH, max_answers=DEFAULT_MAX_ANSWERS):
+    """
+    Return the shared cache stored in the file 'path', only opening it once in each process
+
+    :param path (str): The path to the file, which is created if it doesn't exist. Default: 'DEFAULT_PATH'
+    :param max_answers (int): The most answers to store. Default: 'DEFAULT_MAX_ANSWERS'
+    :return (SharedCache): The cache
+    """
+
+    if path not in caches:
+        caches[path] = SharedCache(path, max_answers)
+
+    return caches[path]
+
+def write_number(data, n):
+    """Add the whole number 'n' (0 or more) to the bytearray 'data' in as few bytes as possible, 7 bits at a time"""
+
+    while n >= 0x80:
+        data.append(n & 0x7F | 0x80)
+        n >>= 7
+    data.append(n)
+
+def write_string(data, string):
+    """Add the string 'string' to the bytearray 'data', preceded by its length"""
+
+    encoded = string.encode()
+    write_number(data, len(encoded))
+    data += encoded
+
+def read_number(data, pos):
+    """Return the whole number written by 'write_number' at 'pos' in 'data' and the position after it"""
+
+    n = shift = 0
+    while data[pos] & 0x80:
+        n |= (data[pos] & 0x7F) << shift
+        shift += 7
+        pos += 1
+
+    return n | data[pos] << shift, pos + 1
+
+def read_string(data, pos):
+    """Return the string written by 'write_string' at 'pos' in 'data' and the position after it"""
+
+    length, pos = read_number(data, pos)
+    return bytes(data[pos:pos + length]).decode(), pos + length
+
+def operator_table():
+    """
+    Return every operator in the registry, including fused operators, in an order that is the same in every process with the same
+    registry, so stored compiled expressions can refer to operators by their position in it. Loads every pack that can be loaded
+    """
+
+    tokens = registry.tokens()
+    operators = []
+    for symbol in sorted(tokens):
+        token = tokens[symbol]
+        operators += [operator for operator in [getattr(token, "unary", None), getattr(token, "binary", None), token] if isinstance(operator, Operator)]
+
+    return operators + sorted(registry.fusions(), key=lambda fused: (operators.index(fused.first), operators.index(fused.second)))
+
+def encode_program(program, positions, data):
+    """
+    Add the compiled expression 'program' to the bytearray 'data', returning whether or not it could be
+    It can't if it uses anything that isn't in the registry (such as functions defined by the user), other types of value
+    (such as arrays) or files of numbers
+
+    :param program (Queue): The compiled expression
+    :param positions (dict): The position of each operator in the operator table (see 'operator_table'), keyed by the operator
+    :param data (bytearray): The bytes to add it to
+    :return (bool): Whether or not it could be added
+    """
+
+    write_number(data, len(program))
+    return all(encode_token(token, positions, data) for token in program)
+
+def encode_token(token, positions, data):
+    """Add a token of a compiled expression to the bytearray 'data', returning whether or not it could be (see 'encode_program')"""
+
+    if type(token) is int:
+        data.append(TAG_INT)
+        encoded = token.to_bytes(token.bit_length() // 8 + 1, "little", signed=True)
+        write_number(data, len(encoded))
+        data += encoded
+
+    elif type(token) is Num:
+        data.append(TAG_NUM)
+        write_string(data, str(token))
+
+    elif isinstance(token, Operator):
+        if token not in positions:
+            return False
+        data.append(TAG_OPERATOR)
+        write_number(data, positions[token])
+
+    elif isinstance(token, Variable):
+        data.append(TAG_VARIABLE)
+        write_string(data, token.name)
+
+    # only functions from the registry, which can be looked up again by their symbol
+    elif isinstance(token, FunctionInstance):
+        if token.symbol is None or token.symbol not in registry:
+            return False
+
+        data.append(TAG_FUNCTION)
+        write_string(data, token.symbol)
+        data.append(token.bound is not None)
+        if token.bound is not None:
+            if not encode_program(token.bound[0], positions, data):
+                return False
+            write_string(data, token.bound[1])
+
+        write_number(data, len(token.operands))
+        for operand in token.operands:
+            if isinstance(operand, Queue):
+                data.append(TAG_PROGRAM)
+                if not encode_program(operand, positions, data):
+                    return False
+            elif not encode_token(operand, positions, data):
+                return False
+
+    else:
+        return False
+
+    return True
+
+def decode_program(data, pos, operators):
+    """
+    Return the compiled expression added by 'encode_program' at 'pos' in 'data' and the position after it
+
+    :param data (bytes/mmap): The stored compiled expressions
+    :param pos (int): The position of the compiled expression in 'data'
+    :param operators (list): The operator table (see 'operator_table')
+    :return (tuple): The compiled expression as a 'Queue' and the position after it
+    """
+
+    program = Queue()
+    length, pos = read_number(data, pos)
+    for _ in range(length):
+        token, pos = decode_token(data, pos, operators)
+        program.enqueue(token)
+
+    return program, pos
+
+def decode_token(data, pos, operators):
+    """Return the token added by 'encode_token' at 'pos' in 'data' and the position after it (see 'decode_program')"""
+
+    tag = data[pos]
+    pos += 1
+
+    if tag == TAG_OPERATOR:
+        position, pos = read_number(data, pos)
+        return operators[position], pos
+
+    if tag == TAG_INT:
+        length, pos = read_number(data, pos)
+        return int.from_bytes(data[pos:pos + length], "little", signed=True), pos + length
+
+    if tag == TAG_NUM:
+        value, pos = read_string(data, pos)
+        return Num(value), pos
+
+    if tag == TAG_VARIABLE:
+        name, pos = read_string(data, pos)
+        return Variable(name), pos
+
+    if tag == TAG_PROGRAM:
+        return decode_program(data, pos, operators)
+
+    # functions are made the same way as when they're tokenised, then given their operands
+    assert tag == TAG_FUNCTION, "param 'data' must be a stored compiled expression"
+    symbol, pos = read_string(data, pos)
+    function = identify("word", symbol, None)
+    bound = None
+    pos += 1
+    if data[pos - 1]:
+        program, pos = decode_program(data, pos, operators)
+        variable, pos = read_string(data, pos)
+        bound = (program, variable)
+
+    operands = []
+    num_operands, pos = read_number(data, pos)
+    for _ in range(num_operands):
+        operand, pos = decode_token(data, pos, operators)
+        operands.append(operand)
+
+    function.restore(operands, bound)
+    return function, pos
+
+class ProgramCache:
+    """
+    A cache of compiled expressions (without any definitions) stored in a file, so processes that start again don't need to compile them again
+    Use the 'compile' method instead of 'compile_expression' (or 'calculate' instead of 'calculate' in 'Calc.py') and the 'save' method to
+    store the expressions compiled since it was loaded. Saving keeps the expressions stored by other processes in the meantime
+
+    The file starts with 'PROGRAMS_MAGIC', the version (see 'version') and the position of the index. Each compiled expression is stored
+    as its number of tokens followed by each token's tag and contents (see 'encode_token'), and the index at the end is the number of
+    expressions followed by each expression and the position and length of its compiled form
+
+    :param directory (str): The directory to store the file in, which is created if it doesn't exist. Default: 'DEFAULT_PROGRAMS_DIRECTORY'
+    """
+
+    def __init__(self, directory=DEFAULT_PROGRAMS_DIRECTORY):
+        self.path = os.path.join(directory, PROGRAMS_FILE)
+        self.version = None
+
+        # private attributes
+        self.__operators = None     # the operator table (see 'operator_table') and the position of each operator in it, found when first needed
+        self.__positions = None
+        self.__programs = {}        # the compiled expressions used so far, keyed by the expression
+        self.__new = {}             # the compiled expressions not stored yet, encoded, keyed by the expression
+        self.__map, self.__index = self.__read()
+
+    def __load_operators(self):
+        """Find the operator table and the position of each operator in it if they haven't been found yet"""
+
+        if self.__operators is None:
+            self.__operators = operator_table()
+            self.__positions = {operator: position for position, operator in enumerate(self.__operators)}
+
+    def __version(self):
+        """Return the version of the stored compiled expressions, which changes when the registry or the precision of calculations does"""
+
+        if self.version is None:
+            self.version = sha256("{} {}".format(registry.signature(), getcontext().prec).encode()).digest()
+
+        return self.version
+
+    def __read(self):
+        """
+        Return the file memory-mapped (or read if it can't be) and its index - the position and length of each compiled expression
+        keyed by the expression - or 'None' and an empty index if there isn't a file for this version
+        """
+
+        try:
+            with open(self.path, "rb") as f:
+                try:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    data = f.read()
+        except OSError:
+            return None, {}
+
+        header = len(PROGRAMS_MAGIC) + 32
+        if data[:len(PROGRAMS_MAGIC)] != PROGRAMS_MAGIC or data[len(PROGRAMS_MAGIC):header] != self.__version():
+            return None, {}
+
+        index = {}
+        pos = int.from_bytes(data[header:header + 8], "little")
+        num_programs, pos = read_number(data, pos)
+        for _ in range(num_programs):
+            expr, pos = read_string(data, pos)
+            start, pos = read_number(data, pos)
+            length, pos = read_number(data, pos)
+            index[expr] = (start, length)
+
+        return data, index
+
+    def compile(self, expr):
+        """
+        Return the expression 'expr' compiled as by 'compile_expression' in 'Calc.py', loading it if it's stored
+        If CalcError is raised, it is due to an invalid expression so needs to be caught and presented as an error message
+
+        :param expr (str): The expression
+        :return (Queue): The tokens in postfix notation
+        """
+
+        expr = expr.strip()
+        program = self.__programs.get(expr)
+        if program is not None:
+            return program
+
+        self.__load_operators()
+        if expr in self.__index:
+            program = decode_program(self.__map, self.__index[expr][0], self.__operators)[0]
+        else:
+            program = compile_expression(expr)
+            data = bytearray()
+            if encode_program(program, self.__positions, data):
+                self.__new[expr] = bytes(data)
+
+        self.__programs[expr] = program
+        return program
+
+    def calculate(self, expr):
+        """
+        Calculate the answer to 'expr' like 'calculate' in 'Calc.py', using the stored compiled expression if there is one
+        If CalcError is raised, it is due to an invalid expression so needs to be caught and presented as an error message
+
+        :param expr (str): The expression
+        :return ans (str): The answer to 'expr'
+        """
+
+        return post_calc(execute(self.compile(expr)))
+
+    def save(self):
+        """Store the expressions compiled since the file was loaded, as well as those already stored (including by other processes)"""
+
+        if not self.__new:
+            return
+
+        # the file could have been replaced by another process since it was loaded, and its memory-mapping
+        # is closed straight away as the file can't be replaced while it's open on some systems (such as Windows)
+        programs = {}
+        latest = self.__read()
+        try:
+            for data, index in [latest, (self.__map, self.__index)]:
+                for expr, (start, length) in index.items():
+                    programs.setdefault(expr, bytes(data[start:start + length]))
+        finally:
+            if isinstance(latest[0], mmap.mmap):
+                latest[0].close()
+        programs.update(self.__new)
+
+        # the data, then the index
+        data = bytearray(PROGRAMS_MAGIC + self.__version() + bytes(8))
+        index = bytearray()
+        write_number(index, len(programs))
+        for expr, program in programs.items():
+            write_string(index, expr)
+            write_number(index, len(data))
+            write_number(index, len(program))
+            data += program
+        data[len(PROGRAMS_MAGIC) + 32:len(PROGRAMS_MAGIC) + 40] = len(data).to_bytes(8, "little")
+        data += index
+
+        # written to another file first and moved over the old one so other processes never see half a file
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(temporary, "wb") as f:
+            f.write(data)
+        self.close()
+        try:
+            os.replace(temporary, self.path)
+
+        # another process could have the file open, so the old file is kept and the new expressions are stored next time instead
+        except OSError:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            self.__map, self.__index = self.__read()
+            return
+
+        self.__new.clear()
+        self.__map, self.__index = self.__read()
+
+    def close(self):
+        """Close the memory-mapped file, keeping the compiled expressions already used"""
+
+        if isinstance(self.__map, mmap.mmap):
+            self.__map.close()
+        self.__map, self.__index = None, {}
+
+    def __len__(self):
+        return len(set(self.__index) | set(self.__new))
+
+    def __contains__(self, expr):
+        expr = expr.strip()
+        return expr in self.__index or expr in self.__new
+
+    def __repr__(self):
+        return "ProgramCache({})".format(self.path)
@@ -1,361 +1,677 @@
-"""
-The calculator's core functionality
-Use the 'calculate' function to calculate the answer to an expression
-"""
-
-from Datatypes import Stack, Queue, Operator, BothOperators, Num, OpenBracket, CloseBracket, valid_tokens, regex, FunctionType, FunctionInstance
-from Errors import CalcError
-from decimal import DecimalException, Overflow, InvalidOperation
-
-# instructions read from the text file for other files to import
-with open("Instructions.txt", "r") as f:
-    instructions = "".join(f.readlines())
-
-def find_matched_key(match):
-    """Return the key which was matched"""
-
-    # exactly 1 value in 'match' will not be 'None'
-    # so this will always return exactly once
-    for key in match:
-        if match[key] is not None:
-            return key
-
-def should_be_unary(prev_token):
-    """Return whether or not the current token should be a unary operator depending on the previous token"""
-
-    # if it is the first token in the expression, it should
-    if prev_token is None:
-        return True
-
-    # if it's an open bracket, it should
-    if isinstance(prev_token, OpenBracket):
-        return True
-
-    # if it's an operator, it should if it's binary or (unary and right associative)
-    if isinstance(prev_token, Operator):
-
-        # if it is binary, it should
-        if not prev_token.is_unary:
-            return True
-
-        # if it is unary and right associative, it should
-        if not prev_token.is_left_associative:
-            return True
-
-    # if none of the others are true, it shouldn't
-    return False
-
-def identify(name, value, prev_token):
-    """Return an instance of a class to identify the token"""
-
-    # if it's a number, convert my standard form notation into python's and make it an instance of 'Num'
-    if name == "number":
-        return Num(value.replace("~", "e"))
-
-    # if it's a bracket, make it an instance of one of my bracket classes
-    if value == "(":
-        return OpenBracket()
-    if value == ")":
-        return CloseBracket()
-
-    # if it's a comma, give an error message as commas can only be inside functions
-    if value == ",":
-        raise CalcError("Commas only allowed inside functions")
-
-    # if it's in 'valid_tokens', it's a valid operator so:
-    if value in valid_tokens:
-        token = valid_tokens[value]
-
-        # if it could be unary or binary, use the helper function to decide which and return that
-        if isinstance(token, BothOperators):
-            return token.unary if should_be_unary(prev_token) else token.binary
-
-        # if it's a function, create a unique instance and return that
-        if isinstance(token, FunctionType):
-            return token.create(calculate)
-
-        # otherwise just return it
-        return token
-
-    # otherwise, it is an invalid token so error
-    raise CalcError("Invalid token: '{}'".format(value))
-
-def identify_operand(operand, function):
-    """Validate and format the operand of a function and store it in the function"""
-
-    #remove whitespace at the start and end of the operand
-    operand = operand.strip()
-
-    # remove the '(' or ',' at the start of the operand or error if neither
-    if operand[0] == "(" or operand[0] == ",":
-        operand = operand[1:]
-    else:
-        raise CalcError("Functions must be immediately followed by brackets")
-
-    # remove the ',' or ')' at the end of the operand or error if neither
-    if operand[-1] == ")" or operand[-1] == ",":
-        operand = operand[:-1]
-    else:
-        raise CalcError("Functions must end with a close bracket")
-
-    # add the operand to the function object
-    function.add_operand(operand)
-
-def tokenise(expr):
-    """Split the expression up into tokens and make them instances of classes to identify them"""
-
-    # remove whitespace at the start or end of the expression and make lower case
-    expr = expr.strip().lower()
-
-    # initialise variables
-    tokens = []
-    pos = 0
-    in_func = False
-
-    while pos < len(expr):
-
-        # find a regex match with the expression 'pos' characters in
-        match = regex.match(expr, pos)
-
-        # adjust 'pos' to be the end of the last match
-        # so the next iteration doesn't match the same characters
-        pos = match.end()
-
-        # convert to a dictionary with the named patterns as keys
-        match = match.groupdict()
-
-        # find which key has been matched
-        key = find_matched_key(match)
-
-        # ignore whitespace
-        if key != "whitespace":
-
-            # if not in a function, identify the token and add it to the list of tokens
-            if not in_func:
-
-                # the previous token is the last token in the list 'tokens[-1]' but if the list is empty, it is 'None'
-                token = identify(key, match[key], tokens[-1] if tokens else None)
-                tokens.append(token)
-
-                # if the token is a function, initialise the function variables
-                if isinstance(token, FunctionInstance):
-                    in_func = True
-                    bracket_depth = 0
-                    operand_start_pos = pos
-
-            # if in a function, ignore everything except brackets and commas
-            # to get the operands as strings and add them to the function object
-            else:
-                if key == "bracket":
-
-                    # if it's an open bracket, increase the bracket depth
-                    if match[key] == "(":
-                        bracket_depth += 1
-
-                    # if it's a close bracket, decrease the bracket depth
-                    else:
-                        bracket_depth -= 1
-
-                        # if the bracket depth is now 0, add the last operand and execute the function
-                        if bracket_depth == 0:
-                            in_func = False
-                            identify_operand(expr[operand_start_pos:pos], tokens[-1])
-                            tokens[-1] = tokens[-1].execute()
-
-                # if it's a comma, add the operand to the function
-                # and update the start pos for the next operand
-                elif key == "comma" and bracket_depth == 1:
-                    identify_operand(expr[operand_start_pos:pos], tokens[-1])
-                    operand_start_pos = pos - 1
-
-                # add omitted closing brackets around functions
-                elif pos >= len(expr):
-                    expr += ")"
-
-    return tokens
-
-def should_be_executed_first(top_of_stack_token, current_token):
-    """Return whether or not the token at the top of the stack should be executed before the current token"""
-
-    # the token at the top of the stack should be executed before the current token if 1 and 2:
-    #   1) the token at the top of the stack is an operator
-    #   2) if a or b:
-    #       a) the operator at the top of the stack has better precedence than the current operator
-    #       b) i and ii:
-    #           i)  they have equal precedences
-    #           ii) the operator at the top of the stack is left associative
-
-    #      ------------------ 1 ------------------- and -------------------------------------------------------------------------------------- 2 ---------------------------------------------------------------------------
-    #                                                    --------------------------- a -------------------------- or ---------------------------------------------------- b -----------------------------------------------
-    #                                                                                                                 --------------------------- i --------------------------- and ------------------ ii ----------------
-    return isinstance(top_of_stack_token, Operator) and (top_of_stack_token.precedence < current_token.precedence or (top_of_stack_token.precedence == current_token.precedence and top_of_stack_token.is_left_associative))
-
-def convert(tokens):
-    """Convert the tokens from infix notation to postfix notation (AKA reverse polish notation) by the shunting yard algorithm"""
-
-    output_queue = Queue()      # we only ever add numbers or operators to the output queue
-    operator_stack = Stack()    # we only ever add operators and open brackets to the operator stack
-
-    for token in tokens:
-
-        # add numbers to the output queue
-        if isinstance(token, Num):
-            output_queue.enqueue(token)
-
-        # if it's an operator, add any operators on the stack that should be executed before
-        # it (using 'should_be_executed_first') to the output queue and then add it to the stack
-        elif isinstance(token, Operator):
-            while should_be_executed_first(operator_stack.peek(), token):
-                output_queue.enqueue(operator_stack.pop())
-            operator_stack.push(token)
-
-        # add open brackets to the operator stack
-        elif isinstance(token, OpenBracket):
-            operator_stack.push(token)
-
-        # otherwise, it must be a close bracket so add everything from the operator stack to the output queue
-        # until there is an open bracket, then remove this too but don't add it to the output queue
-        else:
-            while not isinstance(operator_stack.peek(), OpenBracket) and operator_stack.peek() is not None:
-                output_queue.enqueue(operator_stack.pop())
-
-            # if there is nothing left in the stack but we haven't
-            # found an open bracket, there are too few open brackets
-            if operator_stack.peek() is None:
-                raise CalcError("Too many close brackets or not enough open brackets")
-
-            # remove the open bracket from the stack and discard
-            else:
-                operator_stack.pop()
-
-    # move everything on the stack to the output queue
-    while operator_stack:
-        token = operator_stack.pop()
-
-        # if an open bracket didn't have a matching closing bracket,
-        # it could appear here but we don't want it so ignore it
-        if not isinstance(token, OpenBracket):
-            output_queue.enqueue(token)
-
-    return output_queue
-
-def execute(queue):
-    """
-    Execute the tokens to get a final answer
-    As in postfix notation, the first operator in the queue is the first operator to be executed
-    so execute this with the operands repeatedly until all of them have been executed to get a final answer
-    """
-
-    stack = Stack()
-
-    for token in queue:
-
-        # if it's a number, push it to the stack
-        if isinstance(token, Num):
-            stack.push(token)
-
-        # otherwise it must be an operator so pop its operands from the stack, execute it with them and add push the result to the stack
-        else:
-
-            # at least 1 operand is needed for all operators
-            operands = [stack.pop()]
-
-            # binary operators need another
-            if not token.is_unary:
-                operands.append(stack.pop())
-
-            # the stack returns None if empty so if 'None' is in there, there are too few operands
-            if None in operands:
-                raise CalcError("Too few operands or too many operators")
-
-            # execute the operator with its operands (reversed)
-            # catch errors raised by the 'decimal' library and convert them to my format
-            try:
-                token = token.execute(operands[::-1])
-            except InvalidOperation:
-                raise CalcError("Invalid operation")
-            except Overflow:
-                raise CalcError("Number too big")
-            except DecimalException as e:
-                raise CalcError("Error: " + str(e).split("decimal.")[1].split("'>]")[0])
-
-            # make it a 'Num' and push it to the stack
-            stack.push(Num(token))
-
-    # there should be exactly 1 number on the stack at the end - the answer
-    # if not, there are too many operands or too few operators
-    if len(stack) != 1:
-        raise CalcError("Too many operands or too few operators")
-
-    # the last item on the stack is the answer
-    return stack.pop()
-
-def post_calc(ans):
-    """Apply settings to the answer"""
-
-    # check a valid number
-    ans = float(ans)
-    if ans == float("inf"):
-        raise CalcError("Number too big")
-
-    # round all answers to 15 decimal places
-    ans = round(ans, 15)
-
-    # convert to a string so it is in an exact and built-in type
-    ans = str(ans)
-
-    # remove trailing 0s
-    while ans[-1] == "0":
-        ans = ans[:-1]
-
-    # remove the decimal point if it ends in one but nothing after that
-    if ans[-1] == ".":
-        ans = ans[:-1]
-
-    # if the number is now '-0', make '0'
-    if ans == "-0":
-        ans = "0"
-
-    # convert back to my representation of standard form
-    ans = ans.lower().replace("e", "~")
-
-    return ans
-
-def calculate(expr, debug=False):
-    """
-    Calculate the answer to 'expr'.
-    If CalcError (or it's child CalcOperationError) has been raised,
-    it is due to an invalid expression so needs to be caught and presented as an error message
-    Any other exceptions are errors in the code
-
-    :param expr (str): The expression to execute
-    :param debug (bool): Whether or not to print out extra information to check for errors. Default: False
-    :return ans (str): The answer to 'expr'
-    """
-
-    assert isinstance(expr, str), "param 'expr' must be a string"
-
-    for func in [tokenise, convert, execute, post_calc]:
-
-        # execute each function with the result from the last
-        expr = func(expr)
-
-        # output the progress if debug is on
-        if debug:
-            print(str(func).split("function ")[1].split(" at ")[0] + ":", repr(expr))
-
-    return expr
-
-# only runs if the file is run directly (not if imported)
-if __name__ == "__main__":
-
-    # quick interface to test the calculator with debug on to check it's working
-    # catches errors due to the user's input and displays them as error messages
-    # repeats until the user enters an empty expression
-    expression = input("\n>")
-    while expression != "":
-        try:
-            print(calculate(expression))
-        except CalcError as e:
-            print(e)
-        expression = input("\n>")
+"""
+The calculator's core functionality
+Use the 'calculate' function to calculate the answer to an expression
+"""
+
+from Datatypes import Stack, Queue, Operator, BothOperators, Num, OpenBracket, CloseBracket, get_regex, FunctionType, FunctionInstance, Variable, value_types, is_value, is_operand, as_value, MAX_INT_DIGITS
+from Registry import registry
+from Optimiser import optimise
+from Errors import CalcError
+from decimal import DecimalException, Overflow, InvalidOperation
+from bisect import bisect_left, bisect_right
+import os
+
+# the instructions file, next to this file so it's found wherever the calculator is run from
+INSTRUCTIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Instructions.txt")
+
+# the instructions read from the text file, only read the first time they are needed by 'load_instructions'
+instructions_text = None
+
+def load_instructions():
+    """Return the instructions for other files to present to the user, reading them from the text file the first time"""
+
+    global instructions_text
+    if instructions_text is None:
+        with open(INSTRUCTIONS_FILE, "r", encoding="utf-8") as f:
+            instructions_text = f.read()
+
+    return instructions_text
+
+def __getattr__(name):
+    """Read the instructions when the global variable 'instructions' is first used so other files can still import it"""
+
+    if name == "instructions":
+        return load_instructions()
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+def find_matched_key(match):
+    """Return the key which was matched"""
+
+    # exactly 1 value in 'match' will not be 'None'
+    # so this will always return exactly once
+    for key in match:
+        if match[key] is not None:
+            return key
+
+def should_be_unary(prev_token):
+    """Return whether or not the current token should be a unary operator depending on the previous token"""
+
+    # if it is the first token in the expression, it should
+    if prev_token is None:
+        return True
+
+    # if it's an open bracket, it should
+    if isinstance(prev_token, OpenBracket):
+        return True
+
+    # if it's an operator, it should if it's binary or (unary and right associative)
+    if isinstance(prev_token, Operator):
+
+        # if it is binary, it should
+        if not prev_token.is_unary:
+            return True
+
+        # if it is unary and right associative, it should
+        if not prev_token.is_left_associative:
+            return True
+
+    # if none of the others are true, it shouldn't
+    return False
+
+def identify(name, value, prev_token, names=None, defer=False):
+    """
+    Return an instance of a class to identify the token
+    Words that aren't in the registry are looked up in 'names' if given, an object whose 'lookup' method returns
+    the token for a name defined by the user (a value, a 'Variable' or a 'FunctionType') or 'None' if it isn't defined
+    Functions compile their operands with the same names, deferring executing the functions in them if 'defer' is true
+    """
+
+    # if it's a number, convert my standard form notation into python's and make it an instance of 'Num'
+    # whole numbers are python integers instead so they are calculated exactly
+    if name == "number":
+        if value.isdigit():
+            return int(value)
+        return Num(value.replace("~", "e"))
+
+    # if it's a bracket, make it an instance of one of my bracket classes
+    if value == "(":
+        return OpenBracket()
+    if value == ")":
+        return CloseBracket()
+
+    # if it's a comma, give an error message as commas can only be inside functions
+    if value == ",":
+        raise CalcError("Commas only allowed inside functions")
+
+    # if it's in the registry (or defined by the user), it's a valid operator so:
+    token = registry.lookup(value)
+    if token is None and names is not None and name == "word":
+        token = names.lookup(value)
+
+    # functions that can only be used with a variable bound in their first operand, such as 'integrate'
+    if token is None and name == "word" and registry.lookup_binding(value) is not None:
+        binding = registry.lookup_binding(value)
+        token = FunctionType(binding.name, None, binding.num_operands, binding.pure)
+    if token is not None:
+
+        # if it could be unary or binary, use the helper function to decide which and return that
+        if isinstance(token, BothOperators):
+            return token.unary if should_be_unary(prev_token) else token.binary
+
+        # if it's a function, create a unique instance and return that
+        # its operands are compiled with the same names (and deferring the functions in them if they are)
+        if isinstance(token, FunctionType):
+            return token.create(lambda operand, bound=(), lazy=False: compile_expression(operand, BoundNames(names, bound) if bound else names, defer or lazy),
+                                evaluate, registry.lookup_binding(value), value)
+
+        # otherwise just return it
+        return token
+
+    # otherwise, it is an invalid token so error
+    raise CalcError("Invalid token: '{}'".format(value))
+
+def identify_operand(operand, function):
+    """Validate and format the operand of a function and store it in the function"""
+
+    #remove whitespace at the start and end of the operand
+    operand = operand.strip()
+
+    # remove the '(', '[' or ',' at the start of the operand or error if none of them
+    if operand[0] in "([,":
+        operand = operand[1:]
+    else:
+        raise CalcError("Functions must be immediately followed by brackets")
+
+    # remove the ',', ')' or ']' at the end of the operand or error if none of them
+    if operand[-1] in ")],":
+        operand = operand[:-1]
+    else:
+        raise CalcError("Functions must end with a close bracket")
+
+    # add the operand to the function object
+    function.add_operand(operand)
+
+def tokenise(expr, pos=0, tokens=None, ends=None, names=None, defer=False):
+    """
+    Split the expression up into tokens and make them instances of classes to identify them
+    Can resume part way through an expression by giving the position to resume from and the tokens before it
+
+    :param expr (str): The expression to tokenise
+    :param pos (int): The position in the expression to start from - must be between tokens and not in a function. Default: 0
+    :param tokens (list): The tokens before 'pos' which the new tokens are added to. 'None' means none. Default: None
+    :param ends (list): If given, the position in the expression each new token ends at is added to it. Default: None
+    :param names (object): The names defined by the user, passed to 'identify'. 'None' means none. Default: None
+    :param defer (bool): Whether or not to leave functions (including those in the operands of functions) to be executed with the expression
+                         rather than as soon as they are tokenised, so they can be executed at the same time as other parts of the expression
+                         (see 'Parallel.py'). Default: False
+    :return tokens (list): The tokens in the expression
+    """
+
+    # remove whitespace at the start or end of the expression and make lower case,
+    # keeping the original for function operands as they can refer to files whose paths are case sensitive
+    original = expr.strip()
+    expr = original.lower()
+    if len(original) != len(expr):
+        original = expr
+
+    # initialise variables
+    if tokens is None:
+        tokens = []
+    in_func = False
+    regex = get_regex()
+
+    while pos < len(expr):
+
+        # find a regex match with the expression 'pos' characters in
+        match = regex.match(expr, pos)
+
+        # adjust 'pos' to be the end of the last match
+        # so the next iteration doesn't match the same characters
+        pos = match.end()
+
+        # convert to a dictionary with the named patterns as keys
+        match = match.groupdict()
+
+        # find which key has been matched
+        key = find_matched_key(match)
+
+        # ignore whitespace
+        if key != "whitespace":
+
+            # if not in a function, identify the token and add it to the list of tokens
+            if not in_func:
+
+                # the previous token is the last token in the list 'tokens[-1]' but if the list is empty, it is 'None'
+                token = identify(key, match[key], tokens[-1] if tokens else None, names, defer)
+                tokens.append(token)
+
+                # if the token is a function, initialise the function variables
+                # (an open square bracket starts an array, which is a function whose operands are inside the square brackets)
+                # 'close_brackets' are the close brackets needed for the open brackets in the function so far
+                if isinstance(token, FunctionInstance):
+                    in_func = True
+                    if match[key] == "[":
+                        close_brackets = ["]"]
+                        operand_start_pos = pos - 1
+                    else:
+                        close_brackets = []
+                        operand_start_pos = pos
+
+                # otherwise it has ended so record where if needed
+                elif ends is not None:
+                    ends.append(pos)
+
+            # if in a function, ignore everything except brackets and commas
+            # to get the operands as strings and add them to the function object
+            else:
+                if key == "bracket":
+
+                    # if it's an open bracket, increase the bracket depth by adding the close bracket it needs
+                    if match[key] in "([":
+                        close_brackets.append(")" if match[key] == "(" else "]")
+
+                    # if it's a close bracket, decrease the bracket depth, checking it's the right type of bracket
+                    else:
+                        if not close_brackets:
+                            raise CalcError("Functions must be immediately followed by brackets")
+                        if close_brackets.pop() != match[key]:
+                            raise CalcError("Brackets must be closed with the same type of bracket")
+
+                        # if the bracket depth is now 0, add the last operand and execute the function
+                        # (unless it uses variables or isn't pure, in which case it's executed when the expression is)
+                        if not close_brackets:
+                            in_func = False
+                            identify_operand(original[operand_start_pos:pos], tokens[-1])
+                            tokens[-1].finish()
+                            if tokens[-1].can_execute_now and not defer:
+                                try:
+                                    tokens[-1] = tokens[-1].execute()
+                                except DecimalException as e:
+                                    raise decimal_error(e)
+                            if ends is not None:
+                                ends.append(pos)
+
+                # if it's a comma, add the operand to the function
+                # and update the start pos for the next operand
+                elif key == "comma" and len(close_brackets) == 1:
+                    identify_operand(original[operand_start_pos:pos], tokens[-1])
+                    operand_start_pos = pos - 1
+
+                # add omitted closing brackets around functions
+                elif pos >= len(expr):
+                    expr += close_brackets[-1] if close_brackets else ")"
+                    original += close_brackets[-1] if close_brackets else ")"
+
+    return tokens
+
+def should_be_executed_first(top_of_stack_token, current_token):
+    """Return whether or not the token at the top of the stack should be executed before the current token"""
+
+    # the token at the top of the stack should be executed before the current token if 1 and 2:
+    #   1) the token at the top of the stack is an operator
+    #   2) if a or b:
+    #       a) the operator at the top of the stack has better precedence than the current operator
+    #       b) i and ii:
+    #           i)  they have equal precedences
+    #           ii) the operator at the top of the stack is left associative
+
+    #      ------------------ 1 ------------------- and -------------------------------------------------------------------------------------- 2 ---------------------------------------------------------------------------
+    #                                                    --------------------------- a -------------------------- or ---------------------------------------------------- b -----------------------------------------------
+    #                                                                                                                 --------------------------- i --------------------------- and ------------------ ii ----------------
+    return isinstance(top_of_stack_token, Operator) and (top_of_stack_token.precedence < current_token.precedence or (top_of_stack_token.precedence == current_token.precedence and top_of_stack_token.is_left_associative))
+
+def convert_token(token, output_queue, operator_stack):
+    """Add 'token' to the output queue or operator stack of the shunting yard algorithm"""
+
+    # add numbers (and other values such as arrays, variables and functions executed with the expression) to the output queue
+    if is_operand(token):
+        output_queue.enqueue(token)
+
+    # if it's an operator, add any operators on the stack that should be executed before
+    # it (using 'should_be_executed_first') to the output queue and then add it to the stack
+    elif isinstance(token, Operator):
+        while should_be_executed_first(operator_stack.peek(), token):
+            output_queue.enqueue(operator_stack.pop())
+        operator_stack.push(token)
+
+    # add open brackets to the operator stack
+    elif isinstance(token, OpenBracket):
+        operator_stack.push(token)
+
+    # otherwise, it must be a close bracket so add everything from the operator stack to the output queue
+    # until there is an open bracket, then remove this too but don't add it to the output queue
+    else:
+        while not isinstance(operator_stack.peek(), OpenBracket) and operator_stack.peek() is not None:
+            output_queue.enqueue(operator_stack.pop())
+
+        # if there is nothing left in the stack but we haven't
+        # found an open bracket, there are too few open brackets
+        if operator_stack.peek() is None:
+            raise CalcError("Too many close brackets or not enough open brackets")
+
+        # remove the open bracket from the stack and discard
+        else:
+            operator_stack.pop()
+
+def convert_end(output_queue, operator_stack):
+    """Finish the shunting yard algorithm once there are no more tokens"""
+
+    # move everything on the stack to the output queue
+    while operator_stack:
+        token = operator_stack.pop()
+
+        # if an open bracket didn't have a matching closing bracket,
+        # it could appear here but we don't want it so ignore it
+        if not isinstance(token, OpenBracket):
+            output_queue.enqueue(token)
+
+def convert(tokens):
+    """
+    Convert the tokens from infix notation to postfix notation (AKA reverse polish notation) by the shunting yard algorithm
+    and optimise them with 'optimise' from 'Optimiser.py'
+    """
+
+    output_queue = Queue()      # we only ever add numbers or operators to the output queue
+    operator_stack = Stack()    # we only ever add operators and open brackets to the operator stack
+
+    for token in tokens:
+        convert_token(token, output_queue, operator_stack)
+    convert_end(output_queue, operator_stack)
+
+    return optimise(output_queue)
+
+def decimal_error(error):
+    """Return the CalcError to raise in place of 'error', which was raised by the 'decimal' library, so it's in my format"""
+
+    if isinstance(error, InvalidOperation):
+        return CalcError("Invalid operation")
+    if isinstance(error, Overflow):
+        return CalcError("Number too big")
+    return CalcError("Error: " + str(error).split("decimal.")[1].split("'>]")[0])
+
+def execute(queue, variables=None):
+    """
+    Execute the tokens to get a final answer
+    As in postfix notation, the first operator in the queue is the first operator to be executed
+    so execute this with the operands repeatedly until all of them have been executed to get a final answer
+    The queue isn't changed so compiled expressions can be executed many times, with different values of their variables
+
+    :param queue (Queue): The tokens in postfix notation
+    :param variables (dict): The values of the variables in the expression, keyed by their names. Default: None
+    """
+
+    stack = Stack()
+
+    for token in queue:
+
+        # if it's a number (or another value such as an array), push it to the stack
+        if is_value(token):
+            stack.push(token)
+
+        # if it's a variable, push its value to the stack
+        elif isinstance(token, Variable):
+            stack.push(token.value(variables))
+
+        # otherwise it must be an operator so pop its operands from the stack, execute it with them and add push the result to the stack
+        # (or a function that couldn't be executed when it was tokenised, which has its own operands)
+        else:
+
+            if isinstance(token, FunctionInstance):
+                operands = None
+
+            else:
+                # at least 1 operand is needed for all operators
+                operands = [stack.pop()]
+
+                # binary operators need another (and fused operators another 2)
+                if not token.is_unary:
+                    operands.append(stack.pop())
+                    if token.num_operands == 3:
+                        operands.append(stack.pop())
+
+                # the stack returns None if empty so if 'None' is in there, there are too few operands
+                # (checked by identity as comparing arrays with 'None' compares each value)
+                if any(operand is None for operand in operands):
+                    raise CalcError("Too few operands or too many operators")
+
+            # execute the operator with its operands (reversed)
+            # catch errors raised by the 'decimal' library and convert them to my format
+            try:
+                token = token.execute(variables) if operands is None else token.execute(operands[::-1])
+            except DecimalException as e:
+                raise decimal_error(e)
+
+            # make it a 'Num' (unless it's another type of value) and push it to the stack
+            stack.push(as_value(token))
+
+    # there should be exactly 1 number on the stack at the end - the answer
+    # if not, there are too many operands or too few operators
+    if len(stack) != 1:
+        raise CalcError("Too many operands or too few operators")
+
+    # the last item on the stack is the answer
+    return stack.pop()
+
+def post_calc(ans):
+    """Apply settings to the answer"""
+
+    # other types of value, such as arrays, format themselves (formatting the numbers in them the same way as answers)
+    if type(ans) in value_types:
+        return value_types[type(ans)].format(ans, format_number)
+
+    return format_number(ans)
+
+def format_number(ans):
+    """Return the number 'ans' as a string answer"""
+
+    # whole numbers calculated exactly are shown in full
+    if type(ans) is int:
+        if ans.bit_length() > MAX_INT_DIGITS * 3.32:
+            raise CalcError("Number too big")
+        return str(ans)
+
+    # check a valid number
+    ans = float(ans)
+    if ans == float("inf"):
+        raise CalcError("Number too big")
+
+    # round all answers to 15 decimal places
+    ans = round(ans, 15)
+
+    # convert to a string so it is in an exact and built-in type
+    ans = str(ans)
+
+    # remove trailing 0s after the decimal point (not in the power of standard form, eg '1e+20')
+    if "." in ans and "e" not in ans:
+        while ans[-1] == "0":
+            ans = ans[:-1]
+
+        # remove the decimal point if it ends in one but nothing after that
+        if ans[-1] == ".":
+            ans = ans[:-1]
+
+    # if the number is now '-0', make '0'
+    if ans == "-0":
+        ans = "0"
+
+    # convert back to my representation of standard form
+    ans = ans.lower().replace("e", "~")
+
+    return ans
+
+class IncrementalCalculator:
+    """
+    Calculates the answers to expressions that are edited a bit at a time, such as while they are being typed
+    The tokens and progress through the shunting yard algorithm for the start of the last expression are reused
+    for the part of the new expression before the first change so only the rest is re-lexed and re-parsed
+    """
+
+    def __init__(self, names=None):
+
+        # the names defined by the user (see 'identify')
+        self.__names = names
+
+        # private attributes about the last expression
+        self.__expr = ""
+        self.__tokens = []      # the tokens in the expression
+        self.__ends = []        # the position in the expression each token ends at
+        self.__outputs = []     # the queue of tokens each token added to the output queue
+        self.__stacks = []      # the operator stack after each token
+
+    def calculate(self, expr):
+        """
+        Calculate the answer to 'expr' in the same way as the 'calculate' function
+
+        :param expr (str): The expression to execute
+        :return ans (str): The answer to 'expr'
+        """
+
+        # only remove whitespace as 'tokenise' makes it lower case, keeping the original case for paths to files
+        expr = expr.strip()
+
+        # find the number of characters at the start that haven't changed since the last expression
+        same = 0
+        limit = min(len(expr), len(self.__expr))
+        while same < limit and expr[same] == self.__expr[same]:
+            same += 1
+
+        # find the start of any number leading up to the first change as its tokens could merge with
+        # the change (eg '1', '.' and '5' to '1.5' or '1', '~' and '+' to '1~+5')
+        stable = same
+        while stable > 0 and (expr[stable - 1] in "0123456789.~" or expr[stable - 1] in "+-" and stable > 1 and expr[stable - 2] == "~"):
+            stable -= 1
+
+        # keep the tokens that end before the first change - a token ending at the change could be extended by it (eg '12' to '123') -
+        # and not after the start of a number leading up to it. The ends are in ascending order so this is the number of ends before that point
+        keep = bisect_right(self.__ends, stable) if stable < same else bisect_left(self.__ends, same)
+        tokens = self.__tokens[:keep]
+        ends = self.__ends[:keep]
+
+        # re-lex from the end of the last token kept, storing what has been done even if there is an error
+        # the outputs and operator stacks after the tokens that weren't kept are no longer valid
+        self.__expr = expr
+        self.__outputs = outputs = self.__outputs[:keep]
+        self.__stacks = stacks = self.__stacks[:keep]
+        try:
+            tokenise(expr, ends[-1] if ends else 0, tokens, ends, self.__names)
+        finally:
+            self.__tokens = tokens
+            self.__ends = ends
+
+        # re-parse from the last token with a valid output, storing each token's output and the operator stack after it
+        operator_stack = stacks[-1].copy() if stacks else Stack()
+        for token in tokens[len(outputs):]:
+            output = Queue()
+            convert_token(token, output, operator_stack)
+            outputs.append(output)
+            stacks.append(operator_stack.copy())
+
+        # join the outputs together and finish the shunting yard algorithm
+        output_queue = Queue()
+        for output in outputs:
+            for token in output:
+                output_queue.enqueue(token)
+        convert_end(output_queue, operator_stack)
+
+        return post_calc(execute(optimise(output_queue)))
+
+# the incremental calculator used to preview answers, separate for each process
+preview_calculator = IncrementalCalculator()
+
+def preview(expr):
+    """
+    Return the answer to 'expr' to show as a preview while it is being typed, or 'None' if it is incomplete or invalid
+    Reuses the work done on the last expression previewed (in this process) for the part of 'expr' that hasn't changed
+
+    :param expr (str): The expression to execute
+    :return ans (str): The answer to 'expr' or 'None'
+    """
+
+    try:
+        return preview_calculator.calculate(expr)
+    except (CalcError, ArithmeticError, ValueError):
+        return None
+
+def calculate(expr, debug=False):
+    """
+    Calculate the answer to 'expr'.
+    If CalcError (or it's child CalcOperationError) has been raised,
+    it is due to an invalid expression so needs to be caught and presented as an error message
+    Any other exceptions are errors in the code
+
+    :param expr (str): The expression to execute
+    :param debug (bool): Whether or not to print out extra information to check for errors. Default: False
+    :return ans (str): The answer to 'expr'
+    """
+
+    assert isinstance(expr, str), "param 'expr' must be a string"
+
+    for func in [tokenise, convert, execute, post_calc]:
+
+        # execute each function with the result from the last
+        expr = func(expr)
+
+        # output the progress if debug is on
+        if debug:
+            print(str(func).split("function ")[1].split(" at ")[0] + ":", repr(expr))
+
+    return expr
+
+class BoundNames:
+    """
+    The names that can be used in an expression with variables bound in it by a function, such as 'x' in 'integrate(x^2, x, 0, 1)'
+    The bound variables are used before any names defined by the user
+
+    :param names (object): The names defined by the user (see 'identify'). 'None' means none
+    :param variables (list): The names of the bound variables
+    """
+
+    def __init__(self, names, variables):
+        self.__names = names
+        self.__variables = variables
+
+    def lookup(self, name):
+        """Return a 'Variable' for bound variables, otherwise the token defined by the user for 'name' or 'None' if there isn't one"""
+
+        if name in self.__variables:
+            return Variable(name)
+        return self.__names.lookup(name) if self.__names is not None else None
+
+def compile_expression(expr, names=None, defer=False):
+    """
+    Return the expression 'expr' compiled into postfix notation, ready to be executed (many times) with 'execute' or 'evaluate'
+
+    :param expr (str): The expression to compile
+    :param names (object): The names defined by the user (see 'identify'). 'None' means none. Default: None
+    :param defer (bool): Whether or not to leave functions to be executed with the expression (see 'tokenise'). Default: False
+    :return (Queue): The tokens in postfix notation
+    """
+
+    return convert(tokenise(expr, names=names, defer=defer))
+
+def evaluate(program, variables=None, round_answer=True):
+    """
+    Return the value of a compiled expression, as used for the operands of functions
+    Numbers are rounded the same way as answers so functions give the same answers as if their operands' answers were typed in
+
+    :param program (Queue): The compiled expression, from 'compile_expression'
+    :param variables (dict): The values of the variables in the expression, keyed by their names. Default: None
+    :param round_answer (bool): Whether or not to round numbers the same way as answers, which is slower. Default: True
+    :return (Num): The value of the expression (or another type of value such as an array)
+    """
+
+    ans = execute(program, variables)
+    if not round_answer:
+        return ans
+    return round_value(ans)
+
+def round_value(ans):
+    """Return the value 'ans' rounded the same way as answers, unless it's a whole number stored exactly as an 'int' or another type of value"""
+
+    # converting my standard form notation back into python's
+    return ans if type(ans) is int or type(ans) in value_types else Num(post_calc(ans).replace("~", "e"))
+
+# only runs if the file is run directly (not if imported)
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Calculate the answer to an expression, or with no expression, enter expressions one at a time")
+    parser.add_argument("expression", nargs="?", help="the expression to calculate")
+    parser.add_argument("--table", metavar="RANGE", help="write the answer for each value of a variable as CSV, with the range written as 'variable=start:stop:step', eg 'x=0:100:0.001'")
+    parser.add_argument("--output", metavar="FILE", help="the file to write the table to. Default: standard output")
+    parser.add_argument("--simulate", metavar="N", type=int, help="calculate an expression using 'rand' N times and summarise the answers")
+    parser.add_argument("--seed", type=int, help="the seed of the random numbers when simulating, to get the same answers again. Default: random")
+    parser.add_argument("--workers", type=int, default=1, help="the number of processes to calculate the parts of an expression that take a long time or to simulate in. Default: 1")
+    parser.add_argument("--file", help="calculate the expression in FILE a chunk at a time, for very big expressions")
+    args = parser.parse_args()
+
+    # the user is typing the expressions so any file of numbers can be read
+    import Datatypes
+    Datatypes.number_files_directory = ""
+
+    # calculate a single expression (or the one in a file), simulate it or tabulate it, giving the error message and failing if it's invalid
+    if args.expression is not None or args.file is not None:
+        try:
+            if args.file is not None:
+                from Stream import calculate_file
+                print(calculate_file(args.file))
+            elif args.simulate is not None:
+                from Simulate import simulate
+                print(simulate(args.expression, args.simulate, args.seed, args.workers))
+            elif args.table is None and args.workers > 1:
+                from Parallel import calculate_parallel
+                print(calculate_parallel(args.expression, args.workers))
+            elif args.table is None:
+                print(calculate(args.expression))
+            else:
+                from Tabulate import parse_range, tabulate
+                variable, start, stop, step = parse_range(args.table)
+                if args.output is None:
+                    tabulate(args.expression, variable, start, stop, step)
+                else:
+                    with open(args.output, "w", newline="", buffering=1 << 16) as f:
+                        tabulate(args.expression, variable, start, stop, step, f)
+        except CalcError as e:
+            parser.exit(1, "{}\n".format(e))
+
+    # quick interface to test the calculator with debug on to check it's working
+    # catches errors due to the user's input and displays them as error messages
+    # repeats until the user enters an empty expression
+    else:
+        expression = input("\n>")
+        while expression != "":
+            try:
+                print(calculate(expression))
+            except CalcError as e:
+                print(e)
+            expression = input("\n>")
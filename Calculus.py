@@ -0,0 +1,317 @@
+"""
+Contains the code for solving equations, integrating and summing expressions in the calculator, which are given an expression
+and the name of a variable in it followed by the bounds, eg 'solve(x^2 - 2, x, 0, 2)', 'integrate(x^2, x, 0, 1)', 'sum(1/i^2, i, 1, 100)'
+and 'prod(i, i, 1, 10)'. The expression is compiled once with the variable bound in it and evaluated at as many values as needed
+If NumPy is installed and every operation in the expression works element-wise on arrays, it is evaluated at many values at once
+This is a pack of bindings, added to the registry in 'Registry.py' with the 'register' function the first time one is used
+"""
+
+from Datatypes import Num, BothOperators, is_number
+from Registry import registry
+from Errors import CalcError, CalcOperationError
+from math import fsum, isfinite
+
+# Gauss-Kronrod nodes and weights for 7 Gauss points and 15 Kronrod points on [-1, 1] (the nodes are symmetric so only the
+# non-negative ones are stored, largest first). The Gauss points are every other Kronrod node, from the 2nd
+KRONROD_NODES = [0.991455371120812639206854697526329, 0.949107912342758524526189684047851, 0.864864423359769072789712788640926,
+                 0.741531185599394439863864773280788, 0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+                 0.207784955007898467600689403773245, 0.0]
+KRONROD_WEIGHTS = [0.022935322010529224963732008058970, 0.063092092629978553290700663189204, 0.104790010322250183839876322541518,
+                   0.140653259715525918745189590510238, 0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+                   0.204432940075298892414161999234649, 0.209482141084727828012999174891714]
+GAUSS_WEIGHTS = [0.129484966168869693270611432679082, 0.279705391489276667901467771423780, 0.381830050505118944950369775488975,
+                 0.417959183673469387755102040816327]
+
+# the points in [-1, 1] an interval is sampled at, in order, and their Kronrod and Gauss weights (0 for points that aren't Gauss points)
+POINTS = [-x for x in KRONROD_NODES[:-1]] + KRONROD_NODES[::-1]
+POINT_WEIGHTS = KRONROD_WEIGHTS[:-1] + KRONROD_WEIGHTS[::-1]
+POINT_GAUSS_WEIGHTS = [GAUSS_WEIGHTS[i // 2] if i % 2 else 0 for i in range(7)] + [GAUSS_WEIGHTS[3]] + [GAUSS_WEIGHTS[(14 - i) // 2] if i % 2 else 0 for i in range(8, 15)]
+
+TOLERANCE = 1e-14       # the relative error answers are found to
+MAX_INTERVALS = 1000    # the most intervals an integral is split into before giving up
+MAX_ITERATIONS = 200    # the most steps taken to solve an equation before giving up
+CHUNK_SIZE = 100000     # the most values an expression is evaluated at at once when summing
+MAX_VALUES = 10 ** 8    # the most whole numbers a sum or product can be over, as more would take too long
+EXACT_LIMIT = 2 ** 52   # whole numbers up to this are added exactly as floats (with room to spare below 2^53)
+
+def numpy():
+    """
+    Return NumPy if it's installed and arrays can be used in the calculator, otherwise 'None'
+    Only imported when an expression is evaluated at many values so the pack is quick to load without it
+    """
+
+    try:
+        registry.load_pack("Matrices")
+    except CalcError:
+        return None
+
+    from Matrices import np
+    return np
+
+def to_float(value, op_name):
+    """Return the value of an expression as a float, erroring if it isn't a number"""
+
+    if not is_number(value):
+        raise CalcError("The expression in {} must give a number".format(op_name))
+
+    return float(value)
+
+def evaluate_array(np, f, xs):
+    """
+    Return the values of the expression 'f' at each of the values in the array 'xs' as an array of floats,
+    evaluated all at once, or 'None' if they can't all be calculated with floats (such as when dividing by 0)
+    """
+
+    try:
+        ys = f(xs)
+    except CalcError:
+        return None
+
+    # expressions that don't use the variable give the same number for every value
+    if is_number(ys):
+        ys = np.full(xs.shape, float(ys))
+    if not isinstance(ys, np.ndarray) or ys.shape != xs.shape or not np.all(np.isfinite(ys)):
+        return None
+
+    return ys
+
+def evaluate_many(f, xs, op_name):
+    """
+    Return the values of the expression 'f' at each of the values 'xs' as floats
+    Evaluates them all at once as an array if possible, otherwise one at a time
+
+    :param f (BoundExpression): The expression
+    :param xs (list): The values of the variable, as floats
+    :param op_name (str): The name of the function, for error messages
+    :return (list): The values of the expression
+    """
+
+    np = numpy() if f.elementwise and len(xs) > 1 else None
+    if np is not None:
+        ys = evaluate_array(np, f, np.array(xs, dtype=float))
+        if ys is not None:
+            return ys.tolist()
+
+    # values that can't be calculated with floats are calculated one at a time to give the right error message
+    return [to_float(f(Num(repr(x))), op_name) for x in xs]
+
+def func_solve(f, low, high):
+    """
+    Return the value of the variable between 'low' and 'high' where the expression is 0, using Brent's method,
+    which narrows down the bounds with the secant method and inverse quadratic interpolation, falling back on bisection
+
+    :param f (BoundExpression): The expression
+    :param low (Num): The lower bound
+    :param high (Num): The upper bound
+    :return (Num): The value of the variable
+    """
+
+    a, b = float(low), float(high)
+    fa, fb = evaluate_many(f, [a, b], "solve")
+
+    # invalid case
+    if (fa > 0) == (fb > 0) and fa != 0 and fb != 0:
+        raise CalcOperationError("The expression must be 0 or change sign between the bounds", "solve", [low, high])
+
+    # 'b' is the best guess so far, 'a' is on the other side of the answer and 'c' is the previous guess
+    if abs(fa) < abs(fb):
+        a, b, fa, fb = b, a, fb, fa
+    c, fc = a, fa
+    d = e = b - a
+
+    for _ in range(MAX_ITERATIONS):
+        if fb == 0:
+            return Num(repr(b))
+
+        # finished when the answer is known to the tolerance
+        tolerance = 2 * TOLERANCE * max(abs(b), 1e-300)
+        middle = (a - b) / 2
+        if abs(middle) <= tolerance:
+            return Num(repr(b))
+
+        # try interpolating if the last step got closer fast enough, otherwise bisect
+        if abs(e) >= tolerance and abs(fc) > abs(fb):
+            s = fb / fc
+            if a == c:
+                p, q = 2 * middle * s, 1 - s
+            else:
+                q, r = fc / fa, fb / fa
+                p = s * (2 * middle * q * (q - r) - (b - c) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+
+            # only use the interpolation if it stays inside the bounds and halves the step
+            if 2 * p < min(3 * middle * q - abs(tolerance * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                e = d = middle
+        else:
+            e = d = middle
+
+        c, fc = b, fb
+        b += d if abs(d) > tolerance else (tolerance if middle > 0 else -tolerance)
+        fb = evaluate_many(f, [b], "solve")[0]
+
+        # keep the answer between 'a' and 'b'
+        if (fb > 0) == (fa > 0):
+            a, fa = c, fc
+            e = d = b - a
+        if abs(fa) < abs(fb):
+            a, b, fa, fb = b, a, fb, fa
+            c, fc = a, fa
+
+    raise CalcOperationError("Could not find the answer", "solve", [low, high])
+
+def func_integrate(f, low, high):
+    """
+    Return the integral of the expression from 'low' to 'high' using adaptive Gauss-Kronrod quadrature, which splits the
+    interval with the largest error in half until the total error (the difference between the Gauss and Kronrod estimates) is small enough
+
+    :param f (BoundExpression): The expression
+    :param low (Num): The lower bound
+    :param high (Num): The upper bound
+    :return (Num): The integral
+    """
+
+    a, b = float(low), float(high)
+    if a == b:
+        return Num(0)
+
+    # each interval is stored as its bounds, estimate and error
+    intervals = gauss_kronrod(f, [(a, b)])
+    while True:
+        total = fsum(interval[2] for interval in intervals)
+        error = fsum(interval[3] for interval in intervals)
+        if error <= max(TOLERANCE * abs(total), 1e-300) or error == 0:
+            break
+        if len(intervals) >= MAX_INTERVALS:
+            raise CalcOperationError("The integral could not be found accurately, it may be infinite", "integrate", [low, high])
+
+        # split the interval with the largest error in half, sampling both halves at once
+        worst = max(range(len(intervals)), key=lambda i: intervals[i][3])
+        start, end = intervals.pop(worst)[:2]
+        middle = (start + end) / 2
+        intervals.extend(gauss_kronrod(f, [(start, middle), (middle, end)]))
+
+    if not isfinite(total):
+        raise CalcError("Number too big")
+
+    return Num(repr(total))
+
+def gauss_kronrod(f, intervals):
+    """
+    Return each interval in 'intervals' with its Kronrod estimate of the integral of 'f' and its error, evaluating 'f' at all of the points at once
+
+    :param f (BoundExpression): The expression
+    :param intervals (list): The start and end of each interval
+    :return (list): The start, end, estimate and error of each interval
+    """
+
+    xs = [(start + end) / 2 + (end - start) / 2 * x for start, end in intervals for x in POINTS]
+    ys = evaluate_many(f, xs, "integrate")
+
+    results = []
+    for i, (start, end) in enumerate(intervals):
+        values = ys[i * len(POINTS):(i + 1) * len(POINTS)]
+        kronrod = fsum(w * y for w, y in zip(POINT_WEIGHTS, values)) * (end - start) / 2
+        gauss = fsum(w * y for w, y in zip(POINT_GAUSS_WEIGHTS, values)) * (end - start) / 2
+        results.append((start, end, kronrod, abs(kronrod - gauss)))
+
+    return results
+
+def whole_numbers(op_name, low, high):
+    """Return the range of whole numbers from 'low' to 'high' inclusive, erroring if they aren't whole numbers or there are too many"""
+
+    # invalid cases
+    if low % 1 != 0 or high % 1 != 0:
+        raise CalcOperationError("The bounds must be whole numbers", op_name, [low, high])
+    if high - low >= MAX_VALUES:
+        raise CalcOperationError("There can be at most {} whole numbers between the bounds".format(MAX_VALUES), op_name, [low, high])
+
+    return range(int(low), int(high) + 1)
+
+def func_sum(f, low, high):
+    """
+    Return the sum of the expression for each whole number from 'low' to 'high'
+    If possible, evaluates the expression at many values at once (as floats), otherwise one at a time with the calculator's numbers
+    Whole numbers are only added as floats if the total is exact, otherwise they are added one at a time so they are exact
+
+    :param f (BoundExpression): The expression
+    :param low (Num): The first value of the variable
+    :param high (Num): The last value of the variable
+    :return (Num): The sum (an 'int' if it's a whole number calculated exactly), which is 0 if 'low' is more than 'high'
+    """
+
+    values = whole_numbers("sum", low, high)
+    np = numpy() if f.elementwise and len(values) > 1 else None
+    if np is not None:
+
+        # evaluate the values in chunks so they don't all need to be in memory at once, adding them with pairwise summation
+        # and keeping track of whether they're all whole numbers and how big they are to know if the total is exact
+        totals = []
+        whole = True
+        size = 0
+        for i in range(0, len(values), CHUNK_SIZE):
+            ys = evaluate_array(np, f, np.arange(values[i], values[min(i + CHUNK_SIZE, len(values)) - 1] + 1, dtype=float))
+            if ys is None:
+                break
+            totals.append(float(np.sum(ys)))
+            whole = whole and bool(np.all(ys == np.floor(ys)))
+            size += float(np.sum(np.abs(ys)))
+            if whole and size > EXACT_LIMIT:
+                break
+        else:
+            total = fsum(totals)
+            if whole:
+                return int(total)
+
+            # other numbers are rounded the same way as answers
+            if isfinite(total):
+                return Num(repr(round(total, 15)))
+
+    return accumulate(f, values, 0, "+")
+
+def func_prod(f, low, high):
+    """
+    Return the product of the expression for each whole number from 'low' to 'high'
+    The expression is evaluated one at a time with the calculator's numbers as multiplying many floats loses accuracy
+
+    :param f (BoundExpression): The expression
+    :param low (Num): The first value of the variable
+    :param high (Num): The last value of the variable
+    :return (Num): The product (an 'int' if it's a whole number calculated exactly), which is 1 if 'low' is more than 'high'
+    """
+
+    return accumulate(f, whole_numbers("prod", low, high), 1, "*")
+
+def accumulate(f, values, start, symbol):
+    """
+    Return the values of the expression at each of the values combined with the binary operator 'symbol', one at a time
+    The operator is used so any type of value (such as arrays) can be combined
+    The variable is a whole number stored exactly as an 'int' so expressions of whole numbers are calculated exactly
+
+    :param f (BoundExpression): The expression
+    :param values (range): The values of the variable
+    :param start (int): The answer if there are no values
+    :param symbol (str): The symbol of the operator
+    :return (Num): The answer (or another type of value)
+    """
+
+    operator = registry.lookup(symbol)
+    if isinstance(operator, BothOperators):
+        operator = operator.binary
+    total = start
+    for x in values:
+        total = operator.execute([total, f(x)])
+
+    return total
+
+def register(registry):
+    """Add the bindings in this pack to 'registry'"""
+
+    registry.add_binding("solve", "Solve", func_solve, 4)
+    registry.add_binding("integrate", "Integral", func_integrate, 4)
+    registry.add_binding("sum", "Sum", func_sum, 4)
+    registry.add_binding("prod", "Product", func_prod, 4)
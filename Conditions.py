@@ -0,0 +1,79 @@
+"""
+Contains the code for the comparison operators and conditional functions that can be used in the calculator
+Comparisons give 1 if they are true and 0 if they aren't, so their answers can be used as conditions or in calculations
+The conditional functions are lazy - they are given their operands to evaluate only if they need them - so only the branch
+that is chosen is calculated, which is quicker and means errors in the other branches (such as 'ln' of a negative number) are ignored
+This is a pack of operators and functions, added to the registry in 'Registry.py' with the 'register' function the first time one is used
+"""
+
+from Datatypes import is_number
+from Errors import CalcError, CalcOperationError
+
+def op_less(x, y):
+    """Return 1 if x is less than y, otherwise 0"""
+    return int(x < y)
+
+def op_less_equal(x, y):
+    """Return 1 if x is less than or equal to y, otherwise 0"""
+    return int(x <= y)
+
+def op_greater(x, y):
+    """Return 1 if x is greater than y, otherwise 0"""
+    return int(x > y)
+
+def op_greater_equal(x, y):
+    """Return 1 if x is greater than or equal to y, otherwise 0"""
+    return int(x >= y)
+
+def op_equal(x, y):
+    """Return 1 if x is equal to y, otherwise 0"""
+    return int(x == y)
+
+def op_not_equal(x, y):
+    """Return 1 if x is not equal to y, otherwise 0"""
+    return int(x != y)
+
+def is_true(condition, op_name):
+    """Return whether or not the condition (a branch that gives a number) is true - not 0"""
+
+    value = condition()
+    if not is_number(value):
+        raise CalcOperationError("Conditions must be numbers", op_name, [value])
+
+    return value != 0
+
+def func_if(condition, true, false):
+    """Return the value of 'true' if the condition isn't 0, otherwise the value of 'false', only evaluating the one that is chosen"""
+    return true() if is_true(condition, "if") else false()
+
+def func_piecewise(branches):
+    """
+    Return the value after the first condition that is true, given pairs of a condition and a value followed by an optional value to use
+    if none are true, only evaluating the conditions up to the first that is true and its value
+    """
+
+    branches = list(branches)
+    for pos in range(0, len(branches) - 1, 2):
+        if is_true(branches[pos], "piecewise"):
+            return branches[pos + 1]()
+
+    # the value if none of the conditions are true
+    if len(branches) % 2:
+        return branches[-1]()
+
+    raise CalcError("None of the conditions in piecewise are true and there is no value to use otherwise")
+
+def register(registry):
+    """Add the operators and functions in this pack to 'registry'"""
+
+    # comparisons are done after all other operators, for example '2 * 3 < 7' is '6 < 7'
+    registry.add_binary_operator("<", "Less than (<)", op_less, 5, True, backends={"int": op_less}, elementwise=True)
+    registry.add_binary_operator("<=", "Less than or equal to (<=)", op_less_equal, 5, True, backends={"int": op_less_equal}, elementwise=True)
+    registry.add_binary_operator(">", "Greater than (>)", op_greater, 5, True, backends={"int": op_greater}, elementwise=True)
+    registry.add_binary_operator(">=", "Greater than or equal to (>=)", op_greater_equal, 5, True, backends={"int": op_greater_equal}, elementwise=True)
+    registry.add_binary_operator("=", "Equal to (=)", op_equal, 5, True, backends={"int": op_equal}, elementwise=True, commutative=True)
+    registry.add_binary_operator("<>", "Not equal to (<>)", op_not_equal, 5, True, backends={"int": op_not_equal}, elementwise=True, commutative=True)
+
+    # the branches are only evaluated if they are chosen
+    registry.add_function("if", "If", func_if, 3, lazy=True)
+    registry.add_function("piecewise", "Piecewise", func_piecewise, None, lazy=True)
@@ -0,0 +1,190 @@
+"""
+Contains the code for calculating the mathematical constants 'pi', 'tau', 'e' and 'phi' to any number of significant figures
+Each is calculated the first time it is needed to a number of significant figures and cached, so it's instant after that.
+Calculating one to more significant figures carries on from the most it has been calculated to, rather than starting again:
+- pi with the Chudnovsky series (and tau from pi), which gives about 14 more digits for each term
+- e with the series of 1 over each factorial
+- phi (and the square root in the Chudnovsky series) with Newton's method, which doubles the number of correct digits each step
+Both series are summed by binary splitting - as fractions of whole numbers, combining halves of the terms - which is much
+faster than adding the terms one at a time with decimals when there are thousands of digits
+
+Use the 'constant' function (or the function for each constant) from code. The registry calculates them to
+more significant figures than the precision numbers are calculated to (see 'add_constant' in 'Registry.py')
+"""
+
+from Datatypes import Num
+from decimal import Context, localcontext
+from math import lgamma, log, sqrt
+
+GUARD_DIGITS = 10       # the extra digits calculated before rounding so the last digit is right
+
+# the Chudnovsky series' constants
+CHUDNOVSKY_C3_OVER_24 = 640320 ** 3 // 24
+CHUDNOVSKY_DIGITS_PER_TERM = log(CHUDNOVSKY_C3_OVER_24 * 24 / 1728, 10)
+
+# the values calculated so far, keyed by the name of the constant and the number of significant figures
+cache = {}
+
+# the sums of the terms of the series calculated so far, keyed by the name of the constant (see 'extend')
+series = {}
+
+def pi_terms(a, b):
+    """Return P, Q and T of the terms 'a' (inclusive) to 'b' (exclusive) of the Chudnovsky series, splitting them in half until there is 1"""
+
+    if b - a == 1:
+        if a == 0:
+            p = q = 1
+        else:
+            p = (6 * a - 5) * (2 * a - 1) * (6 * a - 1)
+            q = a * a * a * CHUDNOVSKY_C3_OVER_24
+        t = p * (13591409 + 545140134 * a)
+        return p, q, -t if a % 2 else t
+
+    middle = (a + b) // 2
+    p1, q1, t1 = pi_terms(a, middle)
+    p2, q2, t2 = pi_terms(middle, b)
+
+    return p1 * p2, q1 * q2, t1 * q2 + p1 * t2
+
+def e_terms(a, b):
+    """Return P, Q and T of the terms 'a' (exclusive) to 'b' (inclusive) of the series of 1 over each factorial, where P is unused"""
+
+    if b - a == 1:
+        return 1, b, 1
+
+    middle = (a + b) // 2
+    _, q1, t1 = e_terms(a, middle)
+    _, q2, t2 = e_terms(middle, b)
+
+    return 1, q1 * q2, t1 * q2 + t2
+
+def extend(name, terms, num_terms):
+    """
+    Return P, Q and T of the first 'num_terms' terms of the series of the constant 'name', only calculating the ones after
+    those already summed and combining them in the same way as the halves in binary splitting
+
+    :param name (str): The name of the constant
+    :param terms (function): The function to calculate P, Q and T of a range of terms (see 'pi_terms' and 'e_terms')
+    :param num_terms (int): The number of terms
+    :return (tuple): P, Q and T
+    """
+
+    done, p1, q1, t1 = series.get(name, (None, None, None, None))
+    if done is None:
+        p1, q1, t1 = terms(0, num_terms)
+    elif done < num_terms:
+        p2, q2, t2 = terms(done, num_terms)
+        p1, q1, t1 = p1 * p2, q1 * q2, t1 * q2 + p1 * t2
+
+    if done is None or done < num_terms:
+        series[name] = (num_terms, p1, q1, t1)
+
+    return p1, q1, t1
+
+def newton(step, x, correct, digits):
+    """
+    Return 'x' improved by Newton's method until it has at least 'digits' correct significant figures, calculating each step to only as
+    many as it can get right, which is much faster than the 'decimal' library's square root when there are thousands of digits
+
+    :param step (function): Return the next value given the current one, with each step doubling the number of correct digits
+    :param x (Num): The value to start from
+    :param correct (int): The number of correct significant figures in 'x'
+    :param digits (int): The number of correct significant figures needed
+    :return (Num): The value (unrounded)
+    """
+
+    with localcontext() as context:
+        while correct < digits:
+            correct = min(2 * correct, digits)
+            context.prec = correct + GUARD_DIGITS
+            x = step(x)
+
+    return x
+
+def calculate_pi(digits):
+    """Return pi calculated to at least 'digits' significant figures (unrounded)"""
+
+    _, q, t = extend("pi", pi_terms, int(digits / CHUDNOVSKY_DIGITS_PER_TERM) + 2)
+    root = newton(lambda x: (x + 10005 / x) / 2, Num(repr(sqrt(10005))), 15, digits + GUARD_DIGITS)
+
+    with localcontext() as context:
+        context.prec = digits + GUARD_DIGITS
+        return 426880 * root * q / t
+
+def calculate_e(digits):
+    """Return e calculated to at least 'digits' significant figures (unrounded)"""
+
+    # enough terms that the last is less than 10 to the power of -digits
+    num_terms = 2
+    while lgamma(num_terms + 1) / log(10) < digits + GUARD_DIGITS:
+        num_terms *= 2
+
+    # the series only ever grows so the terms already summed are reused
+    num_terms = max(num_terms, series.get("e", (0,))[0])
+    _, q, t = extend("e", e_terms, num_terms)
+
+    with localcontext() as context:
+        context.prec = digits + GUARD_DIGITS
+        return 1 + context.divide(t, q)
+
+def calculate_phi(digits):
+    """Return phi calculated to at least 'digits' significant figures (unrounded) by Newton's method, starting from the most accurate value cached"""
+
+    known = max([cached for name, cached in cache if name == "phi"], default=None)
+    x, correct = (cache[("phi", known)], known) if known is not None else (Num(repr((1 + sqrt(5)) / 2)), 15)
+
+    # each step solves x^2 - x - 1 = 0 to twice as many digits
+    return newton(lambda x: (x * x + 1) / (2 * x - 1), x, correct, digits + GUARD_DIGITS)
+
+def round_to(value, digits):
+    """Return 'value' rounded to 'digits' significant figures as a 'Num'"""
+    return Num(Context(prec=digits).plus(value))
+
+def pi(digits):
+    """Return pi to 'digits' significant figures"""
+
+    if ("pi", digits) not in cache:
+        cache[("pi", digits)] = round_to(calculate_pi(digits), digits)
+
+    return cache[("pi", digits)]
+
+def tau(digits):
+    """Return tau (2 pi) to 'digits' significant figures"""
+
+    if ("tau", digits) not in cache:
+        cache[("tau", digits)] = round_to(Context(prec=digits + GUARD_DIGITS).multiply(calculate_pi(digits), 2), digits)
+
+    return cache[("tau", digits)]
+
+def e(digits):
+    """Return e to 'digits' significant figures"""
+
+    if ("e", digits) not in cache:
+        cache[("e", digits)] = round_to(calculate_e(digits), digits)
+
+    return cache[("e", digits)]
+
+def phi(digits):
+    """Return phi (the golden ratio) to 'digits' significant figures"""
+
+    if ("phi", digits) not in cache:
+        cache[("phi", digits)] = round_to(calculate_phi(digits), digits)
+
+    return cache[("phi", digits)]
+
+# the functions to calculate each constant, keyed by its name
+CONSTANTS = {"pi": pi, "tau": tau, "e": e, "phi": phi}
+
+def constant(name, digits):
+    """
+    Return the constant 'name' to 'digits' significant figures, calculating it the first time it's needed to that many
+
+    :param name (str): The name of the constant - 'pi', 'tau', 'e' or 'phi'
+    :param digits (int): The number of significant figures
+    :return (Num): The value of the constant
+    """
+
+    assert name in CONSTANTS, "param 'name' must be 'pi', 'tau', 'e' or 'phi'"
+    assert isinstance(digits, int) and digits >= 1, "param 'digits' must be a positive integer"
+
+    return CONSTANTS[name](digits)
@@ -1,333 +1,814 @@
-"""
-Contains datatypes the calculator needs to function as part of its internal operation
-as well as the list of all valid tokens and the regex pattern to tokenise expressions
-"""
-
-from re import VERBOSE, compile as compile_regex
-from collections import deque
-from Operations import op_pos, op_add, op_neg, op_sub, op_mul, op_true_div, op_floor_div, op_mod, op_exp, op_root, op_permutations, op_combinations, op_factorial, func_ln, func_log, func_abs, func_lcm, func_hcf, func_rand, func_quadp, func_quadn, func_sin, func_cos, func_tan, func_arsin, func_arcos, func_artan, func_sinh, func_cosh, func_tanh, func_arsinh, func_arcosh, func_artanh
-from decimal import Decimal
-from Errors import CalcError
-
-class Stack:
-    """Represents a stack - a LIFO data structure similar to a list/array with only access to the top"""
-
-    def __init__(self):
-        # private attribute denoted by the double underscore prefix
-        self.__stack = deque()
-
-    def push(self, item):
-        """Add 'item' to the top of the stack"""
-        self.__stack.append(item)
-
-    def pop(self):
-        """Remove and return the item on the top of the stack. Return 'None' if the stack is empty"""
-        return self.__stack.pop() if self else None
-
-    def peek(self):
-        """Return the item on the top of the stack without removing it from the stack. Return 'None' if the stack is empty"""
-        return self.__stack[-1] if self else None
-
-    def __bool__(self):
-        return bool(self.__stack)
-
-    def __len__(self):
-        return len(self.__stack)
-
-    def __repr__(self):
-        return "Stack({})".format(str(list(self.__stack)).replace("[", "").replace("]", ""))
-
-    def __iter__(self):
-
-        # need to copy it because the variable is a pointer to where the actual stack is so
-        # creating a new variable will mean they both reference the same thing whereas now
-        # they reference identical but different stacks which is what I want because I am removing
-        # items from the copy which I don't want to happen to the real stack
-        temp = self.__stack.copy()
-
-        while temp:
-            yield temp.pop()
-
-    def __contains__(self, item):
-
-        for i in self:
-            if i == item:
-                return True
-
-        return False
-
-class Queue:
-    """Represents a queue - a FIFO data structure similar to a list/array with only access to the head and tail"""
-
-    def __init__(self):
-        # private attribute denoted by the double underscore prefix
-        self.__queue = deque()
-
-    def enqueue(self, item):
-        """Add 'item' to the tail of the queue"""
-        self.__queue.appendleft(item)
-
-    def dequeue(self):
-        """Remove and return the item at the head of the queue. Return 'None' if the queue is empty"""
-        return self.__queue.pop() if self else None
-
-    def peek(self):
-        """Return the item at the head of the queue without removing it from the queue. Return 'None' if the queue is empty"""
-        return self.__queue[-1] if self else None
-
-    def __bool__(self):
-        return bool(self.__queue)
-
-    def __len__(self):
-        return len(self.__queue)
-
-    def __repr__(self):
-        return "Queue({})".format(str([item for item in self]).replace("[", "").replace("]", ""))
-
-    def __iter__(self):
-
-        # need to copy it because the variable is a pointer to where the actual queue is so
-        # creating a new variable will mean they both reference the same thing whereas now
-        # they reference identical but different queues which is what I want because I am removing
-        # items from the copy which I don't want to happen to the real queue
-        temp = self.__queue.copy()
-
-        while temp:
-            yield temp.pop()
-
-    def __contains__(self, item):
-
-        for i in self:
-            if i == item:
-                return True
-
-        return False
-
-class Operator:
-    """
-    Represents an operator and stores information about it
-
-    :param name (str): The name of the operator
-    :param func (identifier): The identifier of the function to execute the operation
-    :param precedence (int/float): The precedence of the operation compared to other operations. Lower numbers means executed first
-    :param is_left_associative (bool): Whether or not the operator is left (-to-right) associative (right (-to-left) associative otherwise)
-    :param is_unary (bool): Whether or not the operator is a unary operator (takes only 1 operand) or otherwise it is binary (takes 2 operands)
-    """
-
-    def __init__(self, name, func, precedence, is_left_associative, is_unary):
-        self.name = name
-        self.func = func
-        self.precedence = precedence
-        self.is_left_associative = is_left_associative
-        self.is_unary = is_unary
-
-    def execute(self, operands):
-        """
-        Return the answer when the operator is executed with its operands
-
-        :param operands (list): The operands to execute the operator with
-        :return answer (int/float): The answer when the operator is executed with the operands
-        """
-
-        # the star splits the 'operands' list out into individual parameters
-        return self.func(*operands)
-
-    def __repr__(self):
-        return "UnaryOperator({})".format(self.name) if self.is_unary else "BinaryOperator({})".format(self.name)
-
-class BinaryOperator(Operator):
-    """
-    Represents a binary operator and stores information about it
-
-    :param name (str): The name of the operator
-    :param func (identifier): The identifier of the function to execute the operation
-    :param precedence (int/float): The precedence of the operation compared to other operations. Lower numbers means executed first
-    :param is_left_associative (bool): Whether or not the operator is left (-to-right) associative (alternative is right (-to-left) associative)
-    """
-
-    def __init__(self, name, func, precedence, is_left_associative):
-        super().__init__(name, func, precedence, is_left_associative, False)
-
-class UnaryOperator(Operator):
-    """
-    Represents a unary operator and stores information about it
-
-    :param name (str): The name of the operator
-    :param func (identifier): The identifier of the function to execute the operation
-    :param is_left_associative (bool): Whether or not the operand is on the left side of the operator (alternative is on the right)
-    """
-
-    def __init__(self, name, func, is_left_associative):
-        super().__init__(name, func, 1, is_left_associative, True)
-
-class BothOperators:
-    """
-    Represents a symbol that could represent a binary operator or a unary operator.
-
-    :param unary (UnaryOperator): The unary operator that it could be
-    :param binary (BinaryOperator): The binary operator that it could be
-    """
-
-    def __init__(self, unary, binary):
-        assert isinstance(unary, Operator) and unary.is_unary, "Must be an instance of 'Operator' and be unary"
-        assert isinstance(binary, Operator) and not binary.is_unary, "must be an instance of 'Operator' and be binary"
-        self.unary = unary
-        self.binary = binary
-
-    def __repr__(self):
-        return "BothOperators({}, {})".format(self.unary, self.binary)
-
-class FunctionType:
-    """
-    Represents a type of function and stores information about it
-
-    :param name (str): The name of the type of function
-    :param func (identifier): The identifier of the function to execute the operation
-    :param num_operands (int): The number of operands the function takes
-    """
-
-    def __init__(self, name, func, num_operands):
-        self.__name = name
-        self.__func = func
-        self.__num_operands = num_operands
-
-    def create(self, calc):
-        """
-        Return a new object which has the same properties as this object
-        but is unique for all instances of the function in the expression
-
-        :param calc (function): The calculate function from the main calculator
-        :return (object): An instance of the 'FunctionInstance' class
-        """
-
-        return FunctionInstance(self.__name, self.__func, self.__num_operands, calc)
-
-    def __repr__(self):
-        return "FunctionType({})".format(self.__name)
-
-class FunctionInstance:
-    """
-    Represents a function instance and stores information about it
-
-    :param name (str): The name of the type of function
-    :param func (function): The function to execute the operation
-    :param num_operands (int): The number of operands the function takes
-    :param calc (function): The calculate function from the main calculator
-    """
-
-    def __init__(self, name, func, num_operands, calc):
-        self.__name = name
-        self.__func = func
-        self.__num_operands = num_operands
-        self.__calc = calc
-        self.__operands = []
-
-    def add_operand(self, operand):
-        """
-        Execute the operand with the calculator to simplify it and then add it to the stored operands
-
-        :param operand (num): The operand to add
-        """
-
-        self.__operands.append(Num(self.__calc(operand)))
-
-    def execute(self):
-        """
-        Recursively execute all operands using the calculator and then
-        return the answer when the function is executed with its operands
-
-        :return (Num): The answer to the function when executed on its operands
-        """
-
-        if len(self.__operands) != self.__num_operands:
-            raise CalcError("{} operands required in {} function call".format(self.__num_operands, self.__name))
-
-        # execute the function with its operands and return it
-        # the star splits the list out into individual arguments
-        return Num(self.__func(*self.__operands))
-
-    def __repr__(self):
-        return "{}({})".format(self.__name, ", ".join([str(operand) for operand in self.__operands]))
-
-class Num(Decimal):
-    """Represents a number"""
-    # inherits all methods from Decimal but overrides representation method
-    def __repr__(self):
-        return "Num({})".format(self)
-
-class Bracket:
-    """
-    Represents a bracket
-
-    :param is_open (bool): Whether or not the bracket is an open bracket (alternative is a close bracket)
-    """
-
-    def __init__(self, is_open):
-        self.is_open = is_open
-
-    def __repr__(self):
-        return "OpenBracket" if self.is_open else "CloseBracket"
-
-class OpenBracket(Bracket):
-    """Represents an open bracket"""
-
-    def __init__(self):
-        super().__init__(True)
-
-class CloseBracket(Bracket):
-    """Represents a close bracket"""
-
-    def __init__(self):
-        super().__init__(False)
-
-# create the tokens that can be used in the calculator with the classes above and the operations in 'Operations.py'
-# the key is the symbol that will be in expressions and the value is an instance of one of the following classes:
-# UnaryOperator, BinaryOperator, Operator, or BothOperators
-valid_tokens = {
-    "+": BothOperators(UnaryOperator("Positive (+)", op_pos, False), BinaryOperator("Addition (+)", op_add, 4, True)),
-    "-": BothOperators(UnaryOperator("Negative (-)", op_neg, False), BinaryOperator("Subtraction (-)", op_sub, 4, True)),
-    "*": BinaryOperator("Multiplication (*)", op_mul, 3, True),
-    "/": BinaryOperator("Division (/)", op_true_div, 3, True),
-    "\\": BinaryOperator("Floor division (\\)", op_floor_div, 3, True),
-    "%": BinaryOperator("Mod (%)", op_mod, 3, True),
-    "^": BinaryOperator("Exponentiation (^)", op_exp, 2, False),
-    "¬": BinaryOperator("Root (¬)", op_root, 2, False),
-    "p": BinaryOperator("Permutations (P)", op_permutations, 0, True),
-    "c": BinaryOperator("Combinations (C)", op_combinations, 0, True),
-    "!": UnaryOperator("Factorial (!)", op_factorial, True),
-    "ln": FunctionType("Natural log (ln)", func_ln, 1),
-    "log": FunctionType("Logarithm (log)", func_log, 2),
-    "abs": FunctionType("Absolute value (abs)", func_abs, 1),
-    "lcm": FunctionType("Lowest common multiple", func_lcm, 2),
-    "hcf": FunctionType("Highest common factor", func_hcf, 2),
-    "rand": FunctionType("Random number generator", func_rand, 2),
-    "quadp": FunctionType("Quadratic equation solver (postive square root)", func_quadp, 3),
-    "quadn": FunctionType("Quadratic equation solver (negative square root)", func_quadn, 3),
-    "sin": FunctionType("Sin (sin)", func_sin, 1),
-    "cos": FunctionType("Cosine (cos)", func_cos, 1),
-    "tan": FunctionType("Tangent (tan)", func_tan, 1),
-    "arsin": FunctionType("Inverse sine (arsin)", func_arsin, 1),
-    "arcos": FunctionType("Inverse cosine (arcos)", func_arcos, 1),
-    "artan": FunctionType("Inverse tangent (artan)", func_artan, 1),
-    "sinh": FunctionType("Hyperbolic sin (sinh)", func_sinh, 1),
-    "cosh": FunctionType("Hyperbolic cosine (cosh)", func_cosh, 1),
-    "tanh": FunctionType("Hyperbolic tangent (tanh)", func_tanh, 1),
-    "arsinh": FunctionType("Inverse hyperbolic sine (arsinh)", func_arsinh, 1),
-    "arcosh": FunctionType("Inverse hyperbolic cosine (arcosh)", func_arcosh, 1),
-    "artanh": FunctionType("Inverse hyperbolic tangent (artanh)", func_artanh, 1),
-    "pi": Num("3.14159265358979323846264338327950288"),
-    "tau": Num("6.28318530717958647692528676655900576"),
-    "e": Num("2.71828182845904523536028747135266249"),
-    "g": Num("9.80665"),
-    "phi": Num("1.61803398874989484820458683436563811")
-}
-
-# compile the regex pattern that will be used to check for tokens
-regex = compile_regex(r"""
-    (?P<whitespace>\s+)
-    |(?P<number>(\d*\.)?\d+(~[+-]?\d+)?)
-    |(?P<word>[a-z]+)
-    |(?P<bracket>[()])
-    |(?P<comma>,)
-    |(?P<other>.)
-""", VERBOSE)
+"""
+Contains datatypes the calculator needs to function as part of its internal operation
+as well as the regex pattern to tokenise expressions, which is only compiled the first time it is needed (with 'get_regex') so importing this is quick
+The tokens that can be used in the calculator are in the registry in 'Registry.py'
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from decimal import Decimal
+import os
+from Errors import CalcError
+
+class Stack:
+    """Represents a stack - a LIFO data structure similar to a list/array with only access to the top"""
+
+    def __init__(self):
+        # private attribute denoted by the double underscore prefix
+        self.__stack = deque()
+
+    def push(self, item):
+        """Add 'item' to the top of the stack"""
+        self.__stack.append(item)
+
+    def pop(self):
+        """Remove and return the item on the top of the stack. Return 'None' if the stack is empty"""
+        return self.__stack.pop() if self else None
+
+    def peek(self):
+        """Return the item on the top of the stack without removing it from the stack. Return 'None' if the stack is empty"""
+        return self.__stack[-1] if self else None
+
+    def copy(self):
+        """Return a new stack with the same items as this one"""
+        stack = Stack()
+        stack.__stack = self.__stack.copy()
+        return stack
+
+    def __bool__(self):
+        return bool(self.__stack)
+
+    def __len__(self):
+        return len(self.__stack)
+
+    def __repr__(self):
+        return "Stack({})".format(str(list(self.__stack)).replace("[", "").replace("]", ""))
+
+    def __iter__(self):
+
+        # need to copy it because the variable is a pointer to where the actual stack is so
+        # creating a new variable will mean they both reference the same thing whereas now
+        # they reference identical but different stacks which is what I want because I am removing
+        # items from the copy which I don't want to happen to the real stack
+        temp = self.__stack.copy()
+
+        while temp:
+            yield temp.pop()
+
+    def __contains__(self, item):
+
+        for i in self:
+            if i == item:
+                return True
+
+        return False
+
+class Queue:
+    """Represents a queue - a FIFO data structure similar to a list/array with only access to the head and tail"""
+
+    def __init__(self):
+        # private attribute denoted by the double underscore prefix
+        self.__queue = deque()
+
+    def enqueue(self, item):
+        """Add 'item' to the tail of the queue"""
+        self.__queue.appendleft(item)
+
+    def dequeue(self):
+        """Remove and return the item at the head of the queue. Return 'None' if the queue is empty"""
+        return self.__queue.pop() if self else None
+
+    def peek(self):
+        """Return the item at the head of the queue without removing it from the queue. Return 'None' if the queue is empty"""
+        return self.__queue[-1] if self else None
+
+    def __bool__(self):
+        return bool(self.__queue)
+
+    def __len__(self):
+        return len(self.__queue)
+
+    def __repr__(self):
+        return "Queue({})".format(str([item for item in self]).replace("[", "").replace("]", ""))
+
+    def __iter__(self):
+
+        # need to copy it because the variable is a pointer to where the actual queue is so
+        # creating a new variable will mean they both reference the same thing whereas now
+        # they reference identical but different queues which is what I want because I am removing
+        # items from the copy which I don't want to happen to the real queue
+        temp = self.__queue.copy()
+
+        while temp:
+            yield temp.pop()
+
+    def __contains__(self, item):
+
+        for i in self:
+            if i == item:
+                return True
+
+        return False
+
+class ValueType:
+    """
+    Represents a type of value other than 'Num' that can be used in the calculator, such as arrays
+
+    :param backend (str): The key of the functions in operators' and functions' backends that execute them with values of this type
+    :param format (function): Return a value of this type as a string answer, given the value and the function to format numbers with
+    """
+
+    def __init__(self, backend, format):
+        self.backend = backend
+        self.format = format
+
+    def __repr__(self):
+        return "ValueType({})".format(self.backend)
+
+# the types of value other than 'Num' that can be used in the calculator, keyed by their class
+# these are added by packs (with the registry's 'add_value_type' method) so are only here once a pack that uses them is loaded
+value_types = {}
+
+def is_value(token):
+    """Return whether or not 'token' is a value - a number or a value of one of the other types of value"""
+    return is_number(token) or type(token) in value_types
+
+def is_number(value):
+    """Return whether or not 'value' is a number - a 'Num' or a whole number stored exactly as an 'int'"""
+    return isinstance(value, Num) or type(value) is int
+
+def as_value(answer):
+    """Return the answer to an operation as a value - unchanged if it's an 'int' or one of the other types of value, otherwise as a 'Num'"""
+    return answer if type(answer) is int or type(answer) in value_types else Num(answer)
+
+# the most digits whole numbers are calculated exactly with - bigger answers are too big to show
+MAX_INT_DIGITS = 4000
+
+def to_decimals(operands):
+    """Return the operands with whole numbers stored as 'int's converted to 'Num's, for operations that aren't exact with 'int's"""
+    return [Num(operand) if type(operand) is int else operand for operand in operands]
+
+def is_operand(token):
+    """Return whether or not 'token' is an operand in a compiled expression - a value, a variable or a function executed when the expression is"""
+    return is_value(token) or isinstance(token, (Variable, FunctionInstance))
+
+def find_backend(name, operands, backends):
+    """
+    Return the function to execute an operation with the operands if any are one of the other types of value or 'None' if they are all numbers
+
+    :param name (str): The name of the operation, for the error message if it can't be used with the operands
+    :param operands (list): The operands the operation will be executed with
+    :param backends (dict): The functions to execute the operation with other types of value, keyed by the backend's name
+    """
+
+    found = None
+    for operand in operands:
+        value_type = value_types.get(type(operand))
+
+        # each backend only knows about numbers and its own type of value
+        if value_type is not None and found is not None and value_type is not found:
+            raise CalcError("{} can't be used with both {} and {}".format(name, found.backend, value_type.backend))
+        if value_type is not None:
+            found = value_type
+
+    if found is None:
+        return None
+    if found.backend not in backends:
+        raise CalcError("{} can't be used with {}".format(name, found.backend))
+
+    return backends[found.backend]
+
+class Operator:
+    """
+    Represents an operator and stores information about it
+
+    :param name (str): The name of the operator
+    :param func (identifier): The identifier of the function to execute the operation
+    :param precedence (int/float): The precedence of the operation compared to other operations. Lower numbers means executed first
+    :param is_left_associative (bool): Whether or not the operator is left (-to-right) associative (right (-to-left) associative otherwise)
+    :param is_unary (bool): Whether or not the operator is a unary operator (takes only 1 operand) or otherwise it is binary (takes 2 operands)
+    :param pure (bool): Whether or not the operator always gives the same answer for the same operands. Default: True
+    :param backends (dict): The functions to execute the operation on other types of number, keyed by the name of the type. Default: None
+    :param elementwise (bool): Whether or not the operator works on each number in arrays separately. Default: False
+    :param commutative (bool): Whether or not swapping the operands always gives exactly the same answer. Default: False
+    """
+
+    def __init__(self, name, func, precedence, is_left_associative, is_unary, pure=True, backends=None, elementwise=False, commutative=False):
+        self.name = name
+        self.func = func
+        self.precedence = precedence
+        self.is_left_associative = is_left_associative
+        self.is_unary = is_unary
+        self.num_operands = 1 if is_unary else 2
+        self.pure = pure
+        self.backends = backends if backends is not None else {}
+        self.elementwise = elementwise
+        self.commutative = commutative
+
+    def execute(self, operands):
+        """
+        Return the answer when the operator is executed with its operands
+
+        :param operands (list): The operands to execute the operator with
+        :return answer (int/float): The answer when the operator is executed with the operands
+        """
+
+        # whole numbers are calculated exactly with python's integers by operators that can, otherwise as 'Num's
+        if type(operands[0]) is int or len(operands) == 2 and type(operands[1]) is int:
+            if "int" in self.backends and all(type(operand) is int for operand in operands):
+                return self.backends["int"](*operands)
+
+        # values other than numbers are executed by the function for their type of value
+        if value_types:
+            func = find_backend(self.name, operands, self.backends)
+            if func is not None:
+                return func(*operands)
+
+        # the star splits the 'operands' list out into individual parameters
+        return self.func(*to_decimals(operands))
+
+    def implementation(self, backend):
+        """Return the function to execute the operation on the type of number 'backend' or 'None' if there isn't one"""
+        return self.backends.get(backend)
+
+    def __repr__(self):
+        return "UnaryOperator({})".format(self.name) if self.is_unary else "BinaryOperator({})".format(self.name)
+
+class BinaryOperator(Operator):
+    """
+    Represents a binary operator and stores information about it
+
+    :param name (str): The name of the operator
+    :param func (identifier): The identifier of the function to execute the operation
+    :param precedence (int/float): The precedence of the operation compared to other operations. Lower numbers means executed first
+    :param is_left_associative (bool): Whether or not the operator is left (-to-right) associative (alternative is right (-to-left) associative)
+    :param pure (bool): Whether or not the operator always gives the same answer for the same operands. Default: True
+    :param backends (dict): The functions to execute the operation on other types of number, keyed by the name of the type. Default: None
+    :param elementwise (bool): Whether or not the operator works on each number in arrays separately. Default: False
+    :param commutative (bool): Whether or not swapping the operands always gives exactly the same answer. Default: False
+    """
+
+    def __init__(self, name, func, precedence, is_left_associative, pure=True, backends=None, elementwise=False, commutative=False):
+        super().__init__(name, func, precedence, is_left_associative, False, pure, backends, elementwise, commutative)
+
+class UnaryOperator(Operator):
+    """
+    Represents a unary operator and stores information about it
+
+    :param name (str): The name of the operator
+    :param func (identifier): The identifier of the function to execute the operation
+    :param is_left_associative (bool): Whether or not the operand is on the left side of the operator (alternative is on the right)
+    :param pure (bool): Whether or not the operator always gives the same answer for the same operand. Default: True
+    :param backends (dict): The functions to execute the operation on other types of number, keyed by the name of the type. Default: None
+    :param elementwise (bool): Whether or not the operator works on each number in arrays separately. Default: False
+    """
+
+    def __init__(self, name, func, is_left_associative, pure=True, backends=None, elementwise=False):
+        super().__init__(name, func, 1, is_left_associative, True, pure, backends, elementwise)
+
+class FusedOperator(Operator):
+    """
+    Represents 2 binary operators executed as 1 - the first is the left operand of the second - which compiled expressions
+    use instead of them so they can be calculated together, such as '^' then '%' with modular exponentiation
+    It takes 3 operands - the first operator's 2 operands and the second operator's right operand
+
+    :param name (str): The name of the operation
+    :param func (identifier): The identifier of the function to execute the operation when all the operands are whole numbers stored as 'int's
+    :param first (BinaryOperator): The operator executed first
+    :param second (BinaryOperator): The operator executed with the answer of the first as its left operand
+    """
+
+    def __init__(self, name, func, first, second):
+        super().__init__(name, func, second.precedence, second.is_left_associative, False, first.pure and second.pure, {"int": func}, first.elementwise and second.elementwise)
+        self.num_operands = 3
+        self.first = first
+        self.second = second
+
+    def execute(self, operands):
+        """
+        Return the answer when the operators are executed with their operands
+
+        :param operands (list): The first operator's operands followed by the second operator's right operand
+        :return answer (int/float): The answer when the operators are executed with the operands
+        """
+
+        if all(type(operand) is int for operand in operands):
+            return self.func(*operands)
+
+        # other numbers and types of value are calculated by each operator in turn, exactly the same as if they weren't fused
+        return self.second.execute([as_value(self.first.execute(operands[:2])), operands[2]])
+
+    def __repr__(self):
+        return "FusedOperator({})".format(self.name)
+
+class BothOperators:
+    """
+    Represents a symbol that could represent a binary operator or a unary operator.
+
+    :param unary (UnaryOperator): The unary operator that it could be
+    :param binary (BinaryOperator): The binary operator that it could be
+    """
+
+    def __init__(self, unary, binary):
+        assert isinstance(unary, Operator) and unary.is_unary, "Must be an instance of 'Operator' and be unary"
+        assert isinstance(binary, Operator) and not binary.is_unary, "must be an instance of 'Operator' and be binary"
+        self.unary = unary
+        self.binary = binary
+
+    def __repr__(self):
+        return "BothOperators({}, {})".format(self.unary, self.binary)
+
+class FunctionType:
+    """
+    Represents a type of function and stores information about it
+
+    :param name (str): The name of the type of function
+    :param func (identifier): The identifier of the function to execute the operation. 'None' if it can only be used with a
+                              variable bound in its first operand (see 'FunctionInstance')
+    :param num_operands (int): The number of operands the function takes. 'None' means any number (at least 1), in which case
+                               'func' is given an iterator of the values rather than separate operands
+    :param pure (bool): Whether or not the function always gives the same answer for the same operands. Default: True
+    :param backends (dict): The functions to execute the operation on other types of number, keyed by the name of the type. Default: None
+    :param elementwise (bool): Whether or not the function works on each number in arrays separately (like 'sin' but not 'sum'). Default: False
+    :param lazy (bool): Whether or not the function is given its operands as 'Branch'es to evaluate only if it needs them (like 'if'). Default: False
+    """
+
+    def __init__(self, name, func, num_operands, pure=True, backends=None, elementwise=False, lazy=False):
+        self.__name = name
+        self.__func = func
+        self.__num_operands = num_operands
+        self.pure = pure
+        self.backends = backends if backends is not None else {}
+        self.elementwise = elementwise
+        self.lazy = lazy
+
+    @property
+    def name(self):
+        """Return the name of the type of function"""
+        return self.__name
+
+    @property
+    def func(self):
+        """Return the function to execute the operation"""
+        return self.__func
+
+    @property
+    def num_operands(self):
+        """Return the number of operands the function takes"""
+        return self.__num_operands
+
+    def create(self, compile, evaluate, binding=None, symbol=None):
+        """
+        Return a new object which has the same properties as this object
+        but is unique for all instances of the function in the expression
+
+        :param compile (function): The function from the main calculator that compiles an expression into its postfix form, given the
+                                   expression, the names of any variables bound in it and whether or not to defer executing its functions
+        :param evaluate (function): The function from the main calculator that returns the value of a compiled expression
+        :param binding (FunctionType): The type of function to use instead if it's given an expression and the name of a variable to bind in it
+                                       (see 'FunctionInstance'). 'None' means it can't be. Default: None
+        :param symbol (str): The symbol the function was written with in the expression. Default: None
+        :return (object): An instance of the 'FunctionInstance' class
+        """
+
+        return FunctionInstance(self.__name, self.__func, self.__num_operands, compile, evaluate, self.pure, self.backends, self.elementwise, binding, symbol, self.lazy)
+
+    def __repr__(self):
+        return "FunctionType({})".format(self.__name)
+
+class FunctionInstance:
+    """
+    Represents a function instance and stores information about it
+    Its operands are compiled when they are added and evaluated straight away unless they use variables (such as the parameters
+    of a user-defined function) or aren't pure, in which case they are evaluated each time the function is executed
+
+    Functions with a binding (such as 'integrate') can instead be given an expression and the name of a variable as their first 2 operands,
+    for example 'integrate(x^2, x, 0, 1)'. The expression is compiled with the variable bound in it and the binding's function is given
+    it as a 'BoundExpression' to evaluate as many times as it needs, followed by the rest of the operands
+
+    Lazy functions (such as 'if') are given their operands as 'Branch'es to evaluate only if they need them, so their operands are
+    compiled without evaluating them or executing the functions in them, which would raise errors in branches that aren't chosen
+
+    :param name (str): The name of the type of function
+    :param func (function): The function to execute the operation
+    :param num_operands (int): The number of operands the function takes. 'None' means any number (at least 1)
+    :param compile (function): The function from the main calculator that compiles an expression into its postfix form
+    :param evaluate (function): The function from the main calculator that returns the value of a compiled expression
+    :param pure (bool): Whether or not the function always gives the same answer for the same operands. Default: True
+    :param backends (dict): The functions to execute the operation on other types of number, keyed by the name of the type. Default: None
+    :param elementwise (bool): Whether or not the function works on each number in arrays separately. Default: False
+    :param binding (FunctionType): The type of function to use if it's given an expression and the name of a variable. Default: None
+    :param symbol (str): The symbol the function was written with in the expression, so it can be stored (see 'ProgramCache' in 'Cache.py'). Default: None
+    :param lazy (bool): Whether or not the function is given its operands as 'Branch'es to evaluate only if it needs them. Default: False
+    """
+
+    def __init__(self, name, func, num_operands, compile, evaluate, pure=True, backends=None, elementwise=False, binding=None, symbol=None, lazy=False):
+        self.symbol = symbol
+        self.lazy = lazy
+        self.__name = name
+        self.__func = func
+        self.__num_operands = num_operands
+        self.__compile = compile
+        self.__evaluate = evaluate
+        self.__operands = []
+        self.__is_constant = True
+        self.__binding = binding
+        self.__unfinished = [] if binding is not None else None     # the operands kept until it's known whether or not to use the binding
+        self.__bound = None                                         # the compiled expression and its variable if the binding is used
+        self.pure = pure
+        self.backends = backends if backends is not None else {}
+        self.elementwise = elementwise
+
+    @property
+    def can_execute_now(self):
+        """Return whether or not the function can be executed as soon as it has been tokenised - it's pure and its operands don't use variables"""
+        return self.pure and self.__is_constant
+
+    def add_operand(self, operand):
+        """
+        Compile the operand with the calculator and add it to the stored operands, evaluating it straight away if it can be
+        Functions that take any number of operands can also be given a reference to a file of numbers - '@' followed by its path
+
+        :param operand (str): The operand to add
+        """
+
+        operand = operand.strip()
+
+        # functions with a binding keep their operands until they have them all and know whether or not to use it
+        if self.__unfinished is not None:
+            self.__unfinished.append(operand)
+            return
+
+        if operand.startswith("@"):
+            if self.__num_operands is not None or self.lazy:
+                raise CalcError("Files of numbers can only be used in functions that take any number of operands, not {}".format(self.__name))
+
+            # the file could change so the answer could be different next time
+            self.__operands.append(NumberFile(operand[1:].strip()))
+            self.pure = False
+            self.elementwise = False
+            return
+
+        # operands with variables or functions that couldn't be executed yet are kept compiled to be evaluated each time
+        # (and all of the operands of lazy functions, whose functions aren't executed until they are evaluated)
+        self.__operands.append(self.__add_program(self.__compile(operand, lazy=self.lazy)))
+
+    def __add_program(self, program, bound=None):
+        """
+        Return the value of a compiled operand, or the compiled operand itself if it uses variables (other than 'bound'), functions
+        that couldn't be executed yet or the function is lazy, updating whether or not the function is pure, constant and element-wise
+        """
+
+        self.pure = self.pure and all(getattr(token, "pure", True) for token in program)
+        self.elementwise = self.elementwise and is_elementwise(program)
+        if any(isinstance(token, FunctionInstance) or isinstance(token, Variable) and token.name != bound for token in program):
+            self.__is_constant = False
+            return program
+
+        return program if bound is not None or self.lazy else self.__evaluate(program)
+
+    def finish(self):
+        """
+        Finish adding operands, using the binding if the function has been given an expression and the name of a variable,
+        and raise 'CalcError' if the function has the wrong number of operands
+        """
+
+        if self.__unfinished is not None:
+            operands, self.__unfinished = self.__unfinished, None
+            binding = self.__binding
+
+            # the second operand must be a name that isn't already used by the calculator to be a variable
+            variable = self.__bound_variable(operands[1]) if len(operands) == binding.num_operands else None
+            if variable is not None:
+                self.__name, self.__func, self.__num_operands = binding.name, binding.func, binding.num_operands - 2
+                self.pure, self.backends, self.elementwise = binding.pure, {}, False
+                self.__bound = (self.__add_program(self.__compile(operands[0], [variable]), variable), variable)
+                operands = operands[2:]
+
+            # functions that can only be used with a variable
+            elif self.__func is None:
+                raise CalcError("{} must be given an expression, the name of its variable and {} more operands".format(binding.name, binding.num_operands - 2))
+
+            for operand in operands:
+                self.add_operand(operand)
+
+        self.check_num_operands()
+
+    @property
+    def name(self):
+        """Return the name of the type of function"""
+        return self.__name
+
+    @property
+    def num_operands(self):
+        """Return the number of operands the function takes. 'None' means any number (at least 1)"""
+        return self.__num_operands
+
+    @property
+    def operands(self):
+        """Return the operands - values, compiled operands (as 'Queue's) that use variables or impure functions, or files of numbers"""
+        return list(self.__operands)
+
+    @property
+    def bound(self):
+        """Return the compiled expression and the name of the variable bound in it if the binding is used, otherwise 'None'"""
+        return self.__bound
+
+    def restore(self, operands, bound=None):
+        """
+        Give the function operands that were already compiled, such as when loading a stored compiled expression, instead of adding them
+
+        :param operands (list): The operands, as from the 'operands' property
+        :param bound (tuple): The compiled expression and the name of the variable bound in it to use the binding, as from 'bound'. Default: None
+        """
+
+        self.__unfinished = None
+        if bound is not None:
+            binding = self.__binding
+            self.__name, self.__func, self.__num_operands = binding.name, binding.func, binding.num_operands - 2
+            self.pure, self.backends, self.elementwise = binding.pure, {}, False
+            self.__bound = (self.__add_program(bound[0], bound[1]), bound[1])
+
+        for operand in operands:
+            self.__operands.append(self.__add_program(operand) if isinstance(operand, Queue) else operand)
+
+        self.check_num_operands()
+
+    def __bound_variable(self, operand):
+        """Return the name of the variable if 'operand' could be bound as one (a name not already used by the calculator), otherwise 'None'"""
+
+        operand = operand.lower()
+        if not (operand.isascii() and operand.isalpha()):
+            return None
+
+        # names used by the calculator, such as 'e', are still what they normally are when compiled
+        program = self.__compile(operand, [operand])
+        return operand if len(program) == 1 and isinstance(program.peek(), Variable) else None
+
+    def check_num_operands(self):
+        """Raise 'CalcError' if the function has the wrong number of operands"""
+
+        if self.__num_operands is None:
+            if not self.__operands:
+                raise CalcError("At least 1 operand required in {} function call".format(self.__name))
+        elif len(self.__operands) != self.__num_operands:
+            raise CalcError("{} operands required in {} function call".format(self.__num_operands, self.__name))
+
+    def execute(self, variables=None):
+        """
+        Return the answer when the function is executed with its operands, evaluating the operands that couldn't be evaluated before
+
+        :param variables (dict): The values of the variables the operands use, keyed by their names. Default: None
+        :return (Num): The answer to the function when executed on its operands (or another type of value)
+        """
+
+        self.check_num_operands()
+
+        # lazy functions are given their operands to evaluate only if they need them (some may already be 'Branch'es, see 'Stream.py')
+        if self.lazy:
+            branches = [operand if isinstance(operand, Branch) else Branch(operand, self.__evaluate, variables) for operand in self.__operands]
+            return as_value(self.__func(iter(branches)) if self.__num_operands is None else self.__func(*branches))
+
+        operands = [self.__evaluate(operand, variables) if isinstance(operand, Queue) else operand for operand in self.__operands]
+
+        # functions with a variable bound in an expression are given the expression to evaluate followed by the other operands
+        if self.__bound is not None:
+            program, variable = self.__bound
+            return as_value(self.__func(BoundExpression(program, variable, self.__evaluate, variables), *operands))
+
+        # whole numbers are calculated exactly with python's integers by functions that can, otherwise as 'Num's
+        func = self.__func
+        if "int" in self.backends and all(type(operand) is int for operand in operands):
+            func = self.backends["int"]
+        else:
+
+            # values other than numbers are executed by the function for their type of value
+            backend = find_backend(self.__name, operands, self.backends) if value_types else None
+            if backend is not None:
+                func = backend
+            else:
+                operands = to_decimals(operands)
+
+        # functions that take any number of operands are given an iterator of all of the values
+        if self.__num_operands is None:
+            return as_value(func(values(operands)))
+
+        # execute the function with its operands and return it
+        # the star splits the list out into individual arguments
+        return as_value(func(*operands))
+
+    def __repr__(self):
+        return "{}({})".format(self.__name, ", ".join([str(operand) for operand in self.__operands]))
+
+class BoundExpression:
+    """
+    Represents a compiled expression with a variable bound in it by a function, such as 'x^2' in 'integrate(x^2, x, 0, 1)'
+    Call it with a value of the variable to evaluate the expression, which doesn't re-parse it so it can be evaluated many times quickly
+
+    :param program (Queue): The compiled expression
+    :param variable (str): The name of the bound variable
+    :param evaluate (function): The function from the main calculator that returns the value of a compiled expression
+    :param variables (dict): The values of the other variables in the expression, keyed by their names. Default: None
+    """
+
+    def __init__(self, program, variable, evaluate, variables=None):
+        self.__program = program
+        self.__variable = variable
+        self.__evaluate = evaluate
+        self.__variables = dict(variables) if variables is not None else {}
+
+    @property
+    def elementwise(self):
+        """
+        Return whether or not the expression works on each number in arrays separately, so can be evaluated at many values at once
+        Expressions that aren't pure (such as those using 'rand') can't be as they would give the same random numbers for every value
+        """
+        return is_elementwise(self.__program) and all(getattr(token, "pure", True) for token in self.__program)
+
+    def __call__(self, value):
+        """Return the value of the expression when the variable is 'value' (a 'Num', or an array if it's element-wise)"""
+
+        self.__variables[self.__variable] = value
+        return self.__evaluate(self.__program, self.__variables, False)
+
+    def __repr__(self):
+        return "BoundExpression({})".format(self.__variable)
+
+class Branch:
+    """
+    Represents an operand of a lazy function, such as a branch of 'if', which is only evaluated if the function needs it
+    Call it to evaluate it
+
+    :param operand (object): The compiled operand, or its value if it was known when it was compiled
+    :param evaluate (function): The function from the main calculator that returns the value of a compiled expression
+    :param variables (dict): The values of the variables in the operand, keyed by their names. Default: None
+    """
+
+    def __init__(self, operand, evaluate, variables=None):
+        self.__operand = operand
+        self.__evaluate = evaluate
+        self.__variables = variables
+
+    def __call__(self):
+        """Return the value of the operand"""
+        return self.__evaluate(self.__operand, self.__variables) if isinstance(self.__operand, Queue) else self.__operand
+
+    def __repr__(self):
+        return "Branch({})".format(self.__operand)
+
+def is_elementwise(program):
+    """Return whether or not every operation in the compiled expression 'program' works on each number in arrays separately"""
+    return all(getattr(token, "elementwise", is_value(token) or isinstance(token, Variable)) for token in program)
+
+def values(operands):
+    """Yield the value of each operand in turn, yielding each number in files of numbers"""
+
+    for operand in operands:
+        if isinstance(operand, NumberFile):
+            yield from operand
+        else:
+            yield operand
+
+class Variable:
+    """
+    Represents a variable in a compiled expression, such as a parameter of a user-defined function, whose value is given when it is executed
+
+    :param name (str): The name of the variable
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def value(self, variables):
+        """Return the value of the variable from 'variables', the values of the variables keyed by their names"""
+
+        if variables is None or self.name not in variables:
+            raise CalcError("'{}' has no value".format(self.name))
+
+        return variables[self.name]
+
+    def __repr__(self):
+        return "Variable({})".format(self.name)
+
+# where files of numbers can be read from: '' for anywhere, the real path of a directory for only files inside it or 'None' for nowhere
+# none can be read unless allowed (with 'number_files') as expressions may come from someone who shouldn't be able to read every file,
+# so only the user interfaces, where the user is typing the expressions, allow any file
+number_files_directory = None
+
+@contextmanager
+def number_files(directory):
+    """
+    Only allow files of numbers to be read from inside 'directory' until the end of the 'with' block
+    If 'directory' is '' they can be read from anywhere and if it's 'None' they can't be read at all
+
+    :param directory (str): The directory files of numbers can be read from, '' for anywhere or 'None' for nowhere
+    """
+
+    global number_files_directory
+    previous = number_files_directory
+    number_files_directory = directory if not directory else os.path.realpath(directory)
+    try:
+        yield
+    finally:
+        number_files_directory = previous
+
+class NumberFile:
+    """
+    Represents a reference to a text file of numbers separated by commas, spaces or new lines
+    Iterating over it reads the numbers one line at a time so big files don't need to fit in memory
+    The file is only read if 'number_files' allows it at the time
+
+    :param path (str): The path to the file, relative to the allowed directory if there is one
+    """
+
+    def __init__(self, path):
+        self.__path = path
+
+    def __real_path(self):
+        """Return the path to open the file with, raising CalcError if files of numbers can't be read from there"""
+
+        if number_files_directory is None:
+            raise CalcError("Files of numbers cannot be used here")
+        if not number_files_directory:
+            return self.__path
+
+        # symbolic links and '..' are resolved so they can't lead outside the directory
+        path = os.path.realpath(os.path.join(number_files_directory, self.__path))
+        try:
+            inside = os.path.commonpath([number_files_directory, path]) == number_files_directory
+        except ValueError:
+            # on a different drive
+            inside = False
+        if not inside:
+            raise CalcError("Files of numbers must be in the directory '{}'".format(number_files_directory))
+        return path
+
+    def __iter__(self):
+        path = self.__real_path()
+
+        # the same error is given whether the file doesn't exist, can't be read or isn't only numbers
+        # so nothing about a file can be found out by an expression that isn't meant to read it
+        try:
+            with open(path, "r") as f:
+                for line in f:
+                    for value in line.replace(",", " ").split():
+                        yield Num(value.replace("~", "e"))
+        except (OSError, ValueError, ArithmeticError):
+            raise CalcError("Cannot read numbers from the file '{}'".format(self.__path))
+
+    def __str__(self):
+        return "@" + self.__path
+
+    def __repr__(self):
+        return "NumberFile({})".format(self.__path)
+
+class Num(Decimal):
+    """Represents a number"""
+    # inherits all methods from Decimal but overrides representation method
+    def __repr__(self):
+        return "Num({})".format(self)
+
+class Bracket:
+    """
+    Represents a bracket
+
+    :param is_open (bool): Whether or not the bracket is an open bracket (alternative is a close bracket)
+    """
+
+    def __init__(self, is_open):
+        self.is_open = is_open
+
+    def __repr__(self):
+        return "OpenBracket" if self.is_open else "CloseBracket"
+
+class OpenBracket(Bracket):
+    """Represents an open bracket"""
+
+    def __init__(self):
+        super().__init__(True)
+
+class CloseBracket(Bracket):
+    """Represents a close bracket"""
+
+    def __init__(self):
+        super().__init__(False)
+
+# the regex pattern that will be used to check for tokens, compiled the first time it is needed by 'get_regex'
+regex = None
+
+def get_regex():
+    """Return the compiled regex pattern to tokenise expressions with, only importing 're' and compiling it the first time"""
+
+    global regex
+    if regex is None:
+        from re import VERBOSE, compile as compile_regex
+        regex = compile_regex(r"""
+            (?P<whitespace>\s+)
+            |(?P<number>(\d*\.)?\d+(~[+-]?\d+)?)
+            |(?P<word>[a-z]+)
+            |(?P<bracket>[()\[\]])
+            |(?P<comma>,)
+            |(?P<other><[=>]|>=|.)
+        """, VERBOSE)
+
+    return regex
@@ -0,0 +1,403 @@
+"""
+Contains the definitions of named variables and functions that can be used in later expressions in a session, such as with 'Interface'
+
+Variables are defined with 'let', for example 'let r = 6371', and functions with their name and parameters, for example 'f(x, y) = x^2 + y'.
+Definitions are compiled once into the calculator's internal (postfix) form so using them doesn't re-parse them, with the values of the
+variables they use compiled in. The answers to expressions that always give the same answer are cached and, when a definition changes,
+the definitions that use it are made again and the cached answers that use it are forgotten. The answers can also be shared with other
+processes through a shared cache (see 'Cache.py'), which is checked after this process's own cache. Answers are cached by the hash of the
+expression's canonical form (see 'structural_hash' in 'Optimiser.py') so they're found however the expression is written
+
+Instantiate the 'Definitions' class and use the 'calculate' method to calculate the answer to an expression or make a definition
+"""
+
+from Calc import compile_expression, evaluate, execute, post_calc, IncrementalCalculator
+from Datatypes import FunctionType, Variable, is_elementwise
+from Optimiser import structural_hash
+from Registry import registry
+from Errors import CalcError
+from collections import OrderedDict
+
+def is_definition(expr):
+    """
+    Return whether or not 'expr' is a definition of a variable ('let name = expression') or function ('name(parameters) = expression')
+    rather than an expression comparing with '=', such as 'sin(pi) = 0' or 'f(2) = 4', where the name is already a function of the
+    calculator or the parameters aren't names
+    """
+
+    expr = expr.strip().lower()
+    if expr.startswith("let ") and "=" in expr:
+        return True
+
+    left = expr.split("=", 1)[0].strip()
+    if "=" not in expr or not left.endswith(")"):
+        return False
+
+    name, params = [part.strip() for part in left[:-1].split("(", 1)]
+    if isinstance(registry.lookup(name), FunctionType) or registry.lookup_binding(name) is not None:
+        return False
+
+    return is_name(name) and all(is_name(param.strip()) for param in params.split(","))
+
+def is_name(name):
+    """Return whether or not 'name' could be the name of a variable, function or parameter - it's only made of letters"""
+    return name.isascii() and name.isalpha() and name.islower()
+
+def parse_definition(expr):
+    """
+    Split a definition into its parts, checking the names are valid
+
+    :param expr (str): The definition
+    :return (tuple): The name, the names of the parameters ('None' for variables) and the expression
+    """
+
+    left, body = expr.strip().lower().split("=", 1)
+    left, body = left.strip(), body.strip()
+
+    # variables start with 'let'
+    if left.startswith("let "):
+        name, params = left[4:].strip(), None
+
+    # functions have their parameters separated by commas in brackets
+    else:
+        name, params = left[:-1].split("(", 1)
+        name, params = name.strip(), [param.strip() for param in params.split(",")]
+        for param in params:
+            if not is_name(param) or param in registry:
+                raise CalcError("'{}' can't be the name of a parameter".format(param))
+        if len(set(params)) != len(params):
+            raise CalcError("Each parameter must have a different name")
+
+    if not is_name(name) or name == "let" or name in registry:
+        raise CalcError("'{}' can't be defined as it isn't only letters or is already used by the calculator".format(name))
+    if body == "":
+        raise CalcError("Definitions must have an expression after the '='")
+
+    return name, params, body
+
+class Definition:
+    """
+    Represents a definition of a variable or function
+
+    :param source (str): The definition as it was typed
+    :param name (str): The name of the variable or function
+    :param params (list): The names of the function's parameters or 'None' if it's a variable
+    :param uses (set): The names of the other definitions it uses
+    :param token (object): The value of the variable or the 'FunctionType' of the function
+    :param program (Queue): The compiled expression of the function or 'None' if it's a variable
+    """
+
+    def __init__(self, source, name, params, uses, token, program=None):
+        self.source = source
+        self.name = name
+        self.params = params
+        self.uses = uses
+        self.token = token
+        self.program = program
+
+    def call(self, args):
+        """Return the answer to the function with the values of its parameters 'args'"""
+        return execute(self.program, dict(zip(self.params, args)))
+
+    def __repr__(self):
+        return "Definition({})".format(self.source)
+
+class AnyBackend(dict):
+    """The backends of a user-defined function, which executes its expression in the same way whatever the type of its operands"""
+
+    def __init__(self, func):
+        super().__init__()
+        self.__func = func
+
+    def __contains__(self, backend):
+        return True
+
+    def __missing__(self, backend):
+        return self.__func
+
+class Scope:
+    """
+    The names that can be used in an expression being compiled, recording which definitions it uses
+    An instance is given to the calculator's 'tokenise' function as 'names'
+
+    :param definitions (dict): The definitions, keyed by their names
+    :param params (list): The names of the parameters of the function being compiled, which are variables. Default: None
+    """
+
+    def __init__(self, definitions, params=None):
+        self.__definitions = definitions
+        self.__params = params or []
+        self.uses = set()
+
+    def lookup(self, name):
+        """Return the token for 'name' - a 'Variable' for parameters, the value of variables and the 'FunctionType' of functions"""
+
+        if name in self.__params:
+            return Variable(name)
+
+        definition = self.__definitions.get(name)
+        if definition is None:
+            return None
+
+        self.uses.add(name)
+        return definition.token
+
+class Definitions:
+    """
+    Stores the variables and functions defined in a session and caches the answers to expressions that use them
+
+    :param max_cached_answers (int): The most answers to keep in the cache - the least recently used are forgotten first. Default: 1024
+    :param shared_cache (SharedCache): A cache shared with other processes (see 'Cache.py'), which can be changed later. Default: None
+    """
+
+    def __init__(self, max_cached_answers=1024, shared_cache=None):
+        self.shared_cache = shared_cache
+
+        # private attributes
+        self.__definitions = {}         # the definitions, keyed by their names
+        self.__sources = []             # every definition made, in order, so they can be made again in another process
+        self.__pending = []             # definitions made elsewhere that are only made here when they are next needed
+        self.__cache = OrderedDict()    # the answer to each expression and the definitions it uses keyed by its hash, least recently used first
+        self.__keys = OrderedDict()     # the hash of each expression and the definitions it uses keyed by the expression as it was typed
+        self.__max_cached_answers = max_cached_answers
+        self.__sources_hash = None      # a hash of the definitions made, found when it's first needed after they change
+        self.__preview_calculator = None
+
+    def calculate(self, expr):
+        """
+        Calculate the answer to 'expr' using the definitions, or make the definition if 'expr' is one
+        If CalcError is raised, it is due to an invalid expression so needs to be caught and presented as an error message
+
+        :param expr (str): The expression or definition
+        :return ans (str): The answer to 'expr' - the value of a variable or the name and parameters of a function for definitions
+        """
+
+        self.__make_pending()
+        if is_definition(expr):
+            return self.define(expr)
+
+        # use the cached answer if the same expression has been calculated before
+        text = expr.strip()
+        if text in self.__keys:
+            key = self.__keys[text][0]
+            if key in self.__cache:
+                self.__keys.move_to_end(text)
+                self.__cache.move_to_end(key)
+                return self.__cache[key][0]
+
+        # then the shared cache, where answers that don't use any definitions are stored for every process to use
+        if self.shared_cache is not None:
+            ans = self.shared_cache.get(text, count_miss=False)
+            uses = set()
+            if ans is None and self.__definitions:
+                ans = self.shared_cache.get(text, self.__hash_sources(), False)
+                uses = set(self.__definitions)
+            if ans is not None:
+                self.__remember_key(text, text, uses)
+                self.__cache_answer(text, ans, uses)
+                return ans
+
+        # otherwise compile it without executing its functions yet and use the cached answer to the same calculation written differently
+        # (or the expression itself if it can't be put in canonical form)
+        scope = Scope(self.__definitions)
+        program = compile_expression(expr, scope, defer=True)
+        key = structural_hash(program) or text
+        self.__remember_key(text, key, scope.uses)
+        if key in self.__cache:
+            self.__cache.move_to_end(key)
+            return self.__cache[key][0]
+
+        if self.shared_cache is not None:
+            ans = self.shared_cache.get(key, self.__hash_sources() if scope.uses else "")
+            if ans is not None:
+                self.__cache_answer(key, ans, scope.uses)
+                return ans
+
+        ans = post_calc(execute(program))
+
+        # only cache the answer if it will always be the same - functions that aren't pure (such as 'rand')
+        # make the functions that use them not pure as well
+        if all(getattr(token, "pure", True) for token in program):
+            self.__cache_answer(key, ans, scope.uses)
+            if self.shared_cache is not None:
+                self.shared_cache.put(key, ans, self.__hash_sources() if scope.uses else "", text)
+
+        return ans
+
+    def __remember_key(self, text, key, uses):
+        """Keep the key 'key' the answer to the expression 'text', which uses the definitions 'uses', is cached by"""
+
+        self.__keys[text] = (key, uses)
+        if len(self.__keys) > self.__max_cached_answers:
+            self.__keys.popitem(last=False)
+
+    def __cache_answer(self, key, ans, uses):
+        """Keep the answer to the expression with the hash 'key', which uses the definitions 'uses', in the cache"""
+
+        self.__cache[key] = (ans, uses)
+        if len(self.__cache) > self.__max_cached_answers:
+            self.__cache.popitem(last=False)
+
+    def __hash_sources(self):
+        """
+        Return a hash of every definition made, in order, which the answers to expressions using them are stored by in the shared cache
+        It's of every definition rather than the ones used as a variable can be defined using its previous value
+        """
+
+        if self.__sources_hash is None:
+            from hashlib import sha256
+            self.__sources_hash = sha256("\n".join(self.__sources).encode()).hexdigest()
+
+        return self.__sources_hash
+
+    def preview(self, expr):
+        """
+        Return the answer to 'expr' to show as a preview while it is being typed, or 'None' if it is incomplete, invalid or a definition
+        Like the 'preview' function in 'Calc.py', reuses the work done on the last expression previewed for the part that hasn't changed
+
+        :param expr (str): The expression
+        :return ans (str): The answer to 'expr' or 'None'
+        """
+
+        try:
+            self.__make_pending()
+            if is_definition(expr):
+                return None
+            if self.__preview_calculator is None:
+                self.__preview_calculator = IncrementalCalculator(Scope(self.__definitions))
+            return self.__preview_calculator.calculate(expr)
+        except (CalcError, ArithmeticError, ValueError):
+            return None
+
+    def define(self, expr):
+        """
+        Make the definition 'expr', making the definitions that use it again and forgetting the cached answers that use it
+        If any of them can't be made, none of them are changed and CalcError is raised
+
+        :param expr (str): The definition
+        :return ans (str): The value of the variable or the name and parameters of the function
+        """
+
+        self.__make_pending()
+        return self.__define(expr)
+
+    def __define(self, expr):
+        """Make the definition 'expr' (see 'define')"""
+
+        definition = self.__compile(expr.strip())
+        definitions = dict(self.__definitions)
+        definitions[definition.name] = definition
+
+        # find the definitions that use it, directly or through others
+        changed = {definition.name}
+        while True:
+            users = [name for name, other in definitions.items() if name not in changed and other.uses & changed]
+            if not users:
+                break
+            changed.update(users)
+
+        # make them again once the definitions they use have been made again
+        remaining = changed - {definition.name}
+        while remaining:
+            for name in [name for name in definitions if name in remaining and not definitions[name].uses & remaining]:
+                try:
+                    definitions[name] = self.__compile(definitions[name].source, definitions)
+                except CalcError as e:
+                    raise CalcError("Can't change '{}' as '{}' uses it: {}".format(definition.name, name, e))
+                remaining.discard(name)
+
+        # only change anything once everything has been made
+        self.__definitions = definitions
+        self.__sources.append(definition.source)
+        self.__sources_hash = None
+        for key in [key for key, (ans, uses) in self.__cache.items() if uses & changed]:
+            del self.__cache[key]
+        for text in [text for text, (key, uses) in self.__keys.items() if uses & changed]:
+            del self.__keys[text]
+        self.__preview_calculator = None
+
+        if definition.params is None:
+            return post_calc(definition.token)
+        return "{}({})".format(definition.name, ", ".join(definition.params))
+
+    def __compile(self, source, definitions=None):
+        """
+        Return the definition 'source' compiled with the definitions 'definitions' (by default the current ones)
+        A definition can't use a function that uses it as that would go round in circles forever
+        """
+
+        if definitions is None:
+            definitions = self.__definitions
+        name, params, body = parse_definition(source)
+
+        # variables are evaluated straight away, using the previous value of the variable if it uses itself
+        scope = Scope(definitions, params)
+        if params is None:
+            value = evaluate(compile_expression(body, scope))
+            scope.uses.discard(name)
+            return Definition(source, name, None, scope.uses, value)
+
+        program = compile_expression(body, scope)
+        if name in scope.uses or any(self.__uses(other, name, definitions) for other in scope.uses):
+            raise CalcError("'{}' can't use itself, directly or through other definitions".format(name))
+
+        # functions that aren't pure (such as those using 'rand') weren't executed while compiling the expression
+        pure = all(getattr(token, "pure", True) for token in program)
+        definition = Definition(source, name, params, scope.uses, None, program)
+        definition.token = FunctionType(name, lambda *args: definition.call(args), len(params), pure,
+                                        AnyBackend(lambda *args: definition.call(args)), is_elementwise(program))
+
+        return definition
+
+    def __uses(self, name, other, definitions):
+        """Return whether or not the definition 'name' uses the definition 'other', directly or through others"""
+
+        uses = definitions[name].uses if name in definitions else set()
+        return other in uses or any(self.__uses(used, other, definitions) for used in uses)
+
+    def record(self, source):
+        """
+        Record a definition made elsewhere, such as in a worker process, which is only made here when it's next needed
+
+        :param source (str): The definition
+        """
+
+        self.__pending.append(source)
+
+    def __make_pending(self):
+        """Make the definitions that were recorded but not made yet"""
+
+        while self.__pending:
+            self.__define(self.__pending.pop(0))
+
+    def sources(self):
+        """Return every definition made (or recorded), in order, so they can be made again in the same order elsewhere"""
+        return self.__sources + self.__pending
+
+    def scope(self):
+        """Return the names defined, to compile expressions that use them with (see 'compile_expression' in 'Calc.py')"""
+        self.__make_pending()
+        return Scope(self.__definitions)
+
+    def names(self):
+        """Return the names of the variables and functions that have been defined"""
+        self.__make_pending()
+        return sorted(self.__definitions)
+
+    def clear(self):
+        """Forget all definitions and cached answers"""
+
+        self.__definitions.clear()
+        self.__sources.clear()
+        self.__pending.clear()
+        self.__cache.clear()
+        self.__keys.clear()
+        self.__sources_hash = None
+        self.__preview_calculator = None
+
+    def __contains__(self, name):
+        self.__make_pending()
+        return name in self.__definitions
+
+    def __repr__(self):
+        return "Definitions({})".format(", ".join(self.sources()))
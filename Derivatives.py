@@ -0,0 +1,271 @@
+"""
+Contains the code for finding derivatives in the calculator with forward-mode automatic differentiation
+'diff(expr, x, at)' is the derivative of the expression with respect to the variable 'x' when 'x' is 'at', for example 'diff(x^2, x, 3)' is 6
+The variable is given a dual number - its value and its derivative (1) - which every operation carries through with the chain rule,
+so the value and the derivative are found together in a single evaluation of the expression, exactly rather than by estimating
+This is a pack, added to the registry in 'Registry.py' with the 'register' function the first time 'diff' is used, which also adds the
+functions to execute the existing operations with dual numbers. Use the 'value_and_derivative' function to use it from code
+"""
+
+from Datatypes import Num, is_number
+from Registry import registry
+from Calc import compile_expression, evaluate, post_calc, BoundNames
+from Errors import CalcError, CalcOperationError
+from math import sin, cos, tan, sinh, cosh, tanh, log, sqrt, copysign
+import Operations
+import Trigonometry
+import Aggregates
+import Conditions
+
+class Dual:
+    """
+    Represents a dual number - the value of an expression and its derivative with respect to the variable being differentiated
+
+    :param value (Num): The value, calculated exactly as without differentiating
+    :param derivative (float): The derivative
+    """
+
+    def __init__(self, value, derivative):
+        self.value = value
+        self.derivative = derivative
+
+    def __repr__(self):
+        return "Dual({}, {})".format(self.value, self.derivative)
+
+def split(operands, op_name):
+    """Return the values and derivatives of the operands, which are dual numbers or numbers (whose derivatives are 0)"""
+
+    values, derivatives = [], []
+    for operand in operands:
+        if isinstance(operand, Dual):
+            values.append(operand.value)
+            derivatives.append(operand.derivative)
+        elif is_number(operand):
+            values.append(Num(operand))
+            derivatives.append(0.0)
+        else:
+            raise CalcError("Only numbers can be used in {} when differentiating".format(op_name))
+
+    return values, derivatives
+
+def dual_operation(op_name, func, partials):
+    """
+    Return a function to execute 'func' with dual numbers, finding the derivative of the answer with the chain rule
+
+    :param op_name (str): The name of the operation, for error messages
+    :param func (function): The function to execute the operation with numbers
+    :param partials (list): A function for each operand returning the (partial) derivative of the answer with respect to it,
+                            given the values of the operands as floats. 'None' if the answer can't be differentiated with respect to it
+    """
+
+    def execute(*operands):
+        values, derivatives = split(operands, op_name)
+        value = func(*values)
+
+        # only find the partial derivatives of the operands that depend on the variable,
+        # so, for example, 'ln' of the base isn't needed to differentiate 'x^2'
+        derivative = 0.0
+        floats = [float(value) for value in values]
+        for partial, operand_derivative in zip(partials, derivatives):
+            if operand_derivative == 0:
+                continue
+            if partial is None:
+                raise CalcOperationError("Can't be differentiated", op_name, values)
+            try:
+                derivative += partial(*floats) * operand_derivative
+            except (ZeroDivisionError, ValueError, OverflowError):
+                raise CalcOperationError("Can't be differentiated at this value", op_name, values)
+
+        return Dual(Num(value), derivative)
+
+    return execute
+
+def quadratic_partials(sign):
+    """Return the partial derivatives of the solution of 'ax^2 + bx + c = 0' with the square root added ('sign' 1) or subtracted ('sign' -1)"""
+
+    def root(a, b, c):
+        return (-b + sign * sqrt(b ** 2 - 4 * a * c)) / (2 * a)
+
+    return [
+        lambda a, b, c: -2 * c * sign / sqrt(b ** 2 - 4 * a * c) / (2 * a) - root(a, b, c) / a,
+        lambda a, b, c: (-1 + sign * b / sqrt(b ** 2 - 4 * a * c)) / (2 * a),
+        lambda a, b, c: -sign / sqrt(b ** 2 - 4 * a * c)
+    ]
+
+def abs_derivative(x):
+    """Return the derivative of abs(x), which has a corner at 0 so has no derivative there"""
+
+    if x == 0:
+        raise ValueError("abs has no derivative at 0")
+
+    return copysign(1, x)
+
+def dual_comparison(op_name, func):
+    """Return a function to compare dual numbers with 'func' by their values, giving a number (1 or 0) rather than a dual number as it has no derivative"""
+
+    def execute(x, y):
+        values, _ = split([x, y], op_name)
+        return func(*values)
+
+    return execute
+
+def dual_aggregate(op_name, combine):
+    """
+    Return a function to execute an aggregate function with dual numbers
+
+    :param op_name (str): The name of the function, for error messages
+    :param combine (function): Return the value and derivative of the answer, given the values and derivatives of all of the operands
+    """
+
+    def execute(operands):
+        values, derivatives = split(list(operands), op_name)
+        return combine(values, derivatives)
+
+    return execute
+
+def aggregate_sum(values, derivatives):
+    """Return the sum of the values and its derivative"""
+    return Dual(Aggregates.func_sum(iter(values)), sum(derivatives))
+
+def aggregate_mean(values, derivatives):
+    """Return the mean of the values and its derivative"""
+    return Dual(Aggregates.func_mean(iter(values)), sum(derivatives) / len(derivatives))
+
+def aggregate_prod(values, derivatives):
+    """Return the product of the values and its derivative - the sum of the derivative of each value multiplied by the others"""
+
+    derivative = 0.0
+    for i, operand_derivative in enumerate(derivatives):
+        if operand_derivative != 0:
+            others = 1.0
+            for j, value in enumerate(values):
+                if j != i:
+                    others *= float(value)
+            derivative += others * operand_derivative
+
+    return Dual(Aggregates.func_prod(iter(values)), derivative)
+
+def aggregate_extreme(op_name, func):
+    """Return a function to find the smallest or largest value with 'func' and its derivative - the derivative of that value"""
+
+    def combine(values, derivatives):
+        index = func(range(len(values)), key=lambda i: values[i], default=None)
+        if index is None:
+            raise CalcOperationError("Must have at least 1 value", op_name, [])
+        return Dual(values[index], derivatives[index])
+
+    return combine
+
+def derivative_to_num(derivative):
+    """
+    Return the derivative (a float) as a 'Num' rounded to the 15 significant figures floats hold accurately,
+    rather than with every binary digit of the float, so, for example, -6.249999999999999 is -6.25
+    """
+
+    return Num("{:.15g}".format(derivative))
+
+def func_diff(f, at):
+    """
+    Return the derivative of the expression with respect to its variable when the variable is 'at'
+
+    :param f (BoundExpression): The expression
+    :param at (Num): The value of the variable
+    :return (Num): The derivative
+    """
+
+    # the value must be a number - a dual number would need the second derivative, which dual numbers don't carry
+    if isinstance(at, Dual):
+        raise CalcError("diff can't be used inside another diff with the other's variable")
+    if not is_number(at):
+        raise CalcError("diff can only find derivatives at numbers")
+
+    answer = f(Dual(Num(at), 1.0))
+
+    # expressions that don't use the variable don't change
+    if is_number(answer):
+        return Num(0)
+    if not isinstance(answer, Dual):
+        raise CalcError("The expression in diff must give a number")
+
+    return derivative_to_num(answer.derivative)
+
+def value_and_derivative(expr, variable, at, names=None):
+    """
+    Return the answer to the expression and its derivative with respect to 'variable' when it's 'at', found together in a single evaluation
+    If CalcError is raised, it is due to an invalid expression so needs to be caught and presented as an error message
+
+    :param expr (str): The expression
+    :param variable (str): The name of the variable
+    :param at (str/int/float): The value of the variable
+    :param names (object): The names defined by the user, such as a 'Scope' from 'Definitions.py'. Default: None
+    :return (tuple): The answer and its derivative as strings, formatted the same way as answers
+    """
+
+    registry.load_pack("Derivatives")
+    variable = variable.strip().lower()
+    program = compile_expression(expr, BoundNames(names, [variable]))
+    answer = evaluate(program, {variable: Dual(Num(str(at).replace("~", "e")), 1.0)}, False)
+
+    if is_number(answer):
+        return post_calc(answer), post_calc(Num(0))
+    if not isinstance(answer, Dual):
+        raise CalcError("Only numbers can be differentiated")
+
+    return post_calc(answer.value), post_calc(derivative_to_num(answer.derivative))
+
+def register(registry):
+    """Add dual numbers, 'diff' and the functions to execute the existing operations with dual numbers to 'registry'"""
+
+    registry.add_value_type(Dual, "diff", lambda dual, format_number: format_number(dual.value))
+    registry.add_binding("diff", "Derivative", func_diff, 3)
+
+    # operators
+    registry.add_backend("+", "diff", dual_operation("+", Operations.op_add, [lambda x, y: 1, lambda x, y: 1]))
+    registry.add_backend("+", "diff", dual_operation("+", Operations.op_pos, [lambda x: 1]), is_unary=True)
+    registry.add_backend("-", "diff", dual_operation("-", Operations.op_sub, [lambda x, y: 1, lambda x, y: -1]))
+    registry.add_backend("-", "diff", dual_operation("-", Operations.op_neg, [lambda x: -1]), is_unary=True)
+    registry.add_backend("*", "diff", dual_operation("*", Operations.op_mul, [lambda x, y: y, lambda x, y: x]))
+    registry.add_backend("/", "diff", dual_operation("/", Operations.op_true_div, [lambda x, y: 1 / y, lambda x, y: -x / y ** 2]))
+    registry.add_backend("\\", "diff", dual_operation("\\", Operations.op_floor_div, [lambda x, y: 0, lambda x, y: 0]))
+    registry.add_backend("%", "diff", dual_operation("%", Operations.op_mod, [lambda x, y: 1, lambda x, y: -int(x / y)]))
+    registry.add_backend("^", "diff", dual_operation("^", Operations.op_exp, [lambda x, y: y * x ** (y - 1), lambda x, y: x ** y * log(x)]))
+    registry.add_backend("¬", "diff", dual_operation("¬", Operations.op_root, [None, lambda root, x: x ** (1 / root) / (root * x)]))
+    registry.add_backend("p", "diff", dual_operation("P", Operations.op_permutations, [None, None]))
+    registry.add_backend("c", "diff", dual_operation("C", Operations.op_combinations, [None, None]))
+    registry.add_backend("!", "diff", dual_operation("!", Operations.op_factorial, [None]))
+
+    # comparisons
+    for symbol, func in [("<", Conditions.op_less), ("<=", Conditions.op_less_equal), (">", Conditions.op_greater),
+                         (">=", Conditions.op_greater_equal), ("=", Conditions.op_equal), ("<>", Conditions.op_not_equal)]:
+        registry.add_backend(symbol, "diff", dual_comparison(symbol, func))
+
+    # functions
+    registry.add_backend("ln", "diff", dual_operation("ln", Operations.func_ln, [lambda x: 1 / x]))
+    registry.add_backend("log", "diff", dual_operation("log", Operations.func_log, [lambda x, base: 1 / (x * log(base)), lambda x, base: -log(x) / (base * log(base) ** 2)]))
+    registry.add_backend("abs", "diff", dual_operation("abs", Operations.func_abs, [abs_derivative]))
+    registry.add_backend("lcm", "diff", dual_operation("lcm", Operations.func_lcm, [None, None]))
+    registry.add_backend("hcf", "diff", dual_operation("hcf", Operations.func_hcf, [None, None]))
+    registry.add_backend("rand", "diff", dual_operation("rand", Operations.func_rand, [None, None]))
+    registry.add_backend("quadp", "diff", dual_operation("quadp", Operations.func_quadp, quadratic_partials(1)))
+    registry.add_backend("quadn", "diff", dual_operation("quadn", Operations.func_quadn, quadratic_partials(-1)))
+
+    # trigonometric and hyperbolic functions
+    registry.add_backend("sin", "diff", dual_operation("sin", Trigonometry.func_sin, [lambda x: cos(x)]))
+    registry.add_backend("cos", "diff", dual_operation("cos", Trigonometry.func_cos, [lambda x: -sin(x)]))
+    registry.add_backend("tan", "diff", dual_operation("tan", Trigonometry.func_tan, [lambda x: 1 + tan(x) ** 2]))
+    registry.add_backend("arsin", "diff", dual_operation("arsin", Trigonometry.func_arsin, [lambda x: 1 / sqrt(1 - x ** 2)]))
+    registry.add_backend("arcos", "diff", dual_operation("arcos", Trigonometry.func_arcos, [lambda x: -1 / sqrt(1 - x ** 2)]))
+    registry.add_backend("artan", "diff", dual_operation("artan", Trigonometry.func_artan, [lambda x: 1 / (1 + x ** 2)]))
+    registry.add_backend("sinh", "diff", dual_operation("sinh", Trigonometry.func_sinh, [lambda x: cosh(x)]))
+    registry.add_backend("cosh", "diff", dual_operation("cosh", Trigonometry.func_cosh, [lambda x: sinh(x)]))
+    registry.add_backend("tanh", "diff", dual_operation("tanh", Trigonometry.func_tanh, [lambda x: 1 - tanh(x) ** 2]))
+    registry.add_backend("arsinh", "diff", dual_operation("arsinh", Trigonometry.func_arsinh, [lambda x: 1 / sqrt(x ** 2 + 1)]))
+    registry.add_backend("arcosh", "diff", dual_operation("arcosh", Trigonometry.func_arcosh, [lambda x: 1 / sqrt(x ** 2 - 1)]))
+    registry.add_backend("artanh", "diff", dual_operation("artanh", Trigonometry.func_artanh, [lambda x: 1 / (1 - x ** 2)]))
+
+    # aggregate functions
+    registry.add_backend("sum", "diff", dual_aggregate("sum", aggregate_sum))
+    registry.add_backend("prod", "diff", dual_aggregate("prod", aggregate_prod))
+    registry.add_backend("mean", "diff", dual_aggregate("mean", aggregate_mean))
+    registry.add_backend("min", "diff", dual_aggregate("min", aggregate_extreme("min", min)))
+    registry.add_backend("max", "diff", dual_aggregate("max", aggregate_extreme("max", max)))
@@ -1,190 +1,304 @@
-"""
-Contains the interface between a user interface and the calculator
-
-User interfaces should use the calculator via this to record and provide access to memory by instantiating the 'Interface' class and:
-- if the user wants to calculate the answer to an expression, use the 'calculate' method
-- if the user wants to view instructions, use the 'instructions' attribute
-- if the user wants to view memory, use the 'recent_memory' method
-- if the user wants to clear memory, use the 'clear_memory' method
-- if the user wants to insert a specific memory answer into their expression:
-    1) get which memory item is being requested
-    2) use the 'memory_item' method to get the original expression and answer of interest
-    3) it may be best to re-calculate the answer using the original expression and the 'calculate' method
-    4) insert the answer from memory or the re-calculated answer into the expression
-
-Before calling the 'recent_memory' or 'memory_item' methods with a number from the user,
-the interface should call 'len_memory' to check how many items are in memory and verify the number wanted
-is a valid number and equal to or less than the number of items in memory. If not, display the relevant error message
-If either of these methods are called with invalid parameters, they will raise 'IndexError'
-"""
-
-from Calc import calculate, instructions
-from Errors import CalcError
-
-class Interface:
-    """
-    The interface between a user interface and the calculator
-    Stores and allows access to memory
-    """
-
-    def __init__(self):
-
-        # private attributes
-        self.__memory = []
-        self.__instructions = instructions
-
-    @property
-    def instructions(self):
-        """Return the instructions without being able to change it"""
-        return self.__instructions
-
-    def calculate(self, expr):
-        """
-        Calculate the answer to 'expr', storing the expression and answer in memory for later recall
-        If CalcError (or it's child CalcOperationError) has been raised,
-        it is due to an invalid expression so needs to be caught and presented as an error message
-        Any other exceptions are errors in the code
-
-        :param expr (str): The expression to execute
-        :return ans (str): The answer to 'expr'
-        """
-
-        # calculate the answer with the calculator
-        ans = calculate(expr)
-
-        # add the expression and answer to the front of the list
-        self.__memory.insert(0, (expr, ans))
-
-        return ans
-
-    def len_memory(self):
-        """
-        Return the number of items in memory
-
-        :return (int): The number of items in memory
-        """
-
-        return len(self.__memory)
-
-    def memory_item(self, num_calculations_ago=1):
-        """
-        Retrieve an answer from memory along with the expression that resulted in it
-        Will raise 'IndexError' if 'num_calculations_ago' isn't an integer between 1 and the number of items in memory
-
-        :param num_calculations_ago (int): The item to retrieve from memory: 1 is the most recent calculation, ascending from there. Default: None
-        :return (tuple): A 2-value tuple where the 0th index is the string expression and the 1st is the string answer
-        """
-
-        # invalid cases
-        if not isinstance(num_calculations_ago, int):
-            raise IndexError("Must be an integer")
-        if self.len_memory() < num_calculations_ago:
-            raise IndexError("There aren't that many items saved in memory")
-        if num_calculations_ago < 1:
-            raise IndexError("Must be greater than or equal to 1")
-
-        # typical cases
-        return self.__memory[num_calculations_ago - 1]
-
-    def recent_memory(self, num_to_retrieve=None):
-        """
-        Retrieve a list of answers from memory along with the expressions that resulted in each of them
-        Will raise IndexError if 'num_to_retrieve' isn't an integer greater than or equal to 1
-
-        :param num_to_retrieve (int): The number of answers to retrieve. 'None' means all. Default: None
-        :return (list): The memory items (most recent first) which are each a 2-value tuple where the 0th
-                        index is the string expression and the 1st is the string answer
-        """
-
-        # make 'None' mean all and if there are less than asked for, just return the number available
-        if num_to_retrieve is None or num_to_retrieve > self.len_memory():
-            num_to_retrieve = self.len_memory()
-
-        # invalid cases
-        if not isinstance(num_to_retrieve, int):
-            raise IndexError("Must be an integer (whole number")
-        if num_to_retrieve < 0:
-            raise IndexError("Must be greater than or equal to 0")
-
-        # typical cases
-        # the slice selects the first 'num_to_retrieve' items in the list 'self.__memory'
-        return self.__memory[:num_to_retrieve]
-
-    def clear_memory(self):
-        """Clear the calculator's memory"""
-
-        self.__memory.clear()
-
-# only runs if the file is run directly (not if imported)
-if __name__ == "__main__":
-
-    # instantiate the class
-    calc = Interface()
-
-    # extend instructions
-    new_instructions = calc.instructions + "\n\nType 'memory' to view previous calculations, 'instructions' to view instructions, 'clear' to clear the memory, 'ans' in place of the previous answer and 'Mx' where x is a number in place of the xth previous answer"
-
-    # quick user interface to test the calculator through the interface and memory access
-    # repeats until the user enters an empty expression
-    expression = input("\n>").lower()
-    while expression != "":
-
-        # typing 'instructions' will output the general instructions
-        if "instructions" in expression:
-            print(new_instructions)
-
-        # typing 'clear' will clear the memory
-        elif "clear" in expression:
-            calc.clear_memory()
-            print("Memory cleared")
-
-        # typing 'memory' will output all previous calculations
-        elif "memory" in expression:
-            count = 1
-            for expr, ans in calc.recent_memory():
-                print("{}: {} = {}".format(count, expr, ans))
-                count += 1
-            if count == 1:
-                print("Memory is empty")
-
-        else:
-            try:
-                # including 'ans' will replace it with the previous answer
-                if "ans" in expression:
-                    if calc.len_memory() == 0:
-                        raise CalcError("Memory is empty")
-                    else:
-                        expression = expression.replace("ans", calc.memory_item()[1])
-
-                # including 'Mx' will replace it with the xth previous answer
-                while "m" in expression:
-
-                    # take all digits between the 'M' and the first non-digit
-                    index = expression.split("m")[1]
-                    pos = 0
-                    while pos < len(index) and index[pos] in "0123456789":
-                        pos += 1
-                    index = index[:pos]
-
-                    if index == "":
-                        raise CalcError("You must give a memory reference after 'm'")
-
-                    try:
-                        index = int(index)
-                    except ValueError:
-                        raise CalcError("Memory references must be whole numbers")
-                    else:
-                        if index > calc.len_memory():
-                            raise CalcError("Not enough items in memory")
-                        elif index < 1:
-                            raise CalcError("Memory references must be greater than or equal to 1")
-                    expression = expression.replace("m{}".format(index), calc.memory_item(index)[1])
-
-                # calculate the answer
-                print(calc.calculate(expression))
-
-            # catch and output errors
-            except CalcError as e:
-                print(e)
-
-        expression = input("\n>").lower()
+"""
+Contains the interface between a user interface and the calculator
+
+User interfaces should use the calculator via this to record and provide access to memory by instantiating the 'Interface' class and:
+- if the user wants to calculate the answer to an expression, use the 'calculate' method
+  (or if it was calculated elsewhere, for example by 'Worker.py' in another process, store it with the 'remember' method)
+- if the user wants to view instructions, use the 'instructions' attribute
+- if the user wants to view memory, use the 'recent_memory' method
+- if the user wants to clear memory, use the 'clear_memory' method
+- if the user wants to define a variable ('let r = 6371') or function ('f(x, y) = x^2 + y'), use the 'calculate' method as
+  with expressions - the definitions are used by later expressions and can be cleared with the 'clear_definitions' method
+- if the user wants to insert memory answers into their expression by typing 'ans' or 'Mx', use the 'insert_answers' method, or
+  if the user wants to insert a specific memory answer into their expression another way:
+    1) get which memory item is being requested
+    2) use the 'memory_item' method to get the original expression and answer of interest
+    3) it may be best to re-calculate the answer using the original expression and the 'calculate' method
+    4) insert the answer from memory or the re-calculated answer into the expression
+
+Before calling the 'recent_memory' or 'memory_item' methods with a number from the user,
+the interface should call 'len_memory' to check how many items are in memory and verify the number wanted
+is a valid number and equal to or less than the number of items in memory. If not, display the relevant error message
+If either of these methods are called with invalid parameters, they will raise 'IndexError'
+
+To calculate in another process with 'Worker.py', use 'Worker(calculate_with_definitions)' (or 'Worker(preview_with_definitions)' to preview answers)
+and submit each expression with the 'definition_sources' so the definitions are made in the worker process too
+To share answers between processes, such as a fleet of workers, give 'Interface' a shared cache from 'open_cache' in 'Cache.py'
+or submit each expression with the path to the cache's file as well, for example 'worker.submit(expr, sources, cache_path)'
+
+Expressions can only read files of numbers ('sum(@numbers.txt)') if allowed, as they may come from someone who shouldn't read every file:
+give 'Interface' (or submit with) a 'files_directory' to only allow files inside it, or '' to allow any file when the user is at the keyboard
+"""
+
+from Calc import load_instructions
+from Datatypes import number_files
+from Definitions import Definitions, is_definition
+from Errors import CalcError
+
+class Interface:
+    """
+    The interface between a user interface and the calculator
+    Stores and allows access to memory
+
+    :param shared_cache (SharedCache): A cache of answers shared with other processes (see 'Cache.py'). Default: None
+    :param files_directory (str): The directory files of numbers can be read from, '' for anywhere. Default: None (files can't be read)
+    """
+
+    def __init__(self, shared_cache=None, files_directory=None):
+
+        # private attributes
+        # memory is stored oldest first so adding to it is fast however big it gets
+        self.__memory = []
+        self.__definitions = Definitions(shared_cache=shared_cache)
+        self.__files_directory = files_directory
+
+    @property
+    def instructions(self):
+        """Return the instructions without being able to change it (they are only read from the file the first time)"""
+        return load_instructions()
+
+    def calculate(self, expr):
+        """
+        Calculate the answer to 'expr', storing the expression and answer in memory for later recall
+        If CalcError (or it's child CalcOperationError) has been raised,
+        it is due to an invalid expression so needs to be caught and presented as an error message
+        Any other exceptions are errors in the code
+
+        :param expr (str): The expression to execute or definition to make
+        :return ans (str): The answer to 'expr'
+        """
+
+        # calculate the answer with the calculator (using the definitions) and store it
+        with number_files(self.__files_directory):
+            ans = self.__definitions.calculate(expr)
+        self.__memory.append((expr, ans))
+
+        return ans
+
+    def remember(self, expr, ans):
+        """
+        Store an expression and its answer in memory for later recall
+        Use this when the answer has been calculated without the 'calculate' method, such as in another process
+
+        :param expr (str): The expression that was executed
+        :param ans (str): The answer to 'expr'
+        """
+
+        # definitions made elsewhere are recorded so they are made here too when they are next needed
+        if is_definition(expr):
+            self.__definitions.record(expr)
+
+        # add the expression and answer to the end of the list
+        self.__memory.append((expr, ans))
+
+    def len_memory(self):
+        """
+        Return the number of items in memory
+
+        :return (int): The number of items in memory
+        """
+
+        return len(self.__memory)
+
+    def memory_item(self, num_calculations_ago=1):
+        """
+        Retrieve an answer from memory along with the expression that resulted in it
+        Will raise 'IndexError' if 'num_calculations_ago' isn't an integer between 1 and the number of items in memory
+
+        :param num_calculations_ago (int): The item to retrieve from memory: 1 is the most recent calculation, ascending from there. Default: None
+        :return (tuple): A 2-value tuple where the 0th index is the string expression and the 1st is the string answer
+        """
+
+        # invalid cases
+        if not isinstance(num_calculations_ago, int):
+            raise IndexError("Must be an integer")
+        if self.len_memory() < num_calculations_ago:
+            raise IndexError("There aren't that many items saved in memory")
+        if num_calculations_ago < 1:
+            raise IndexError("Must be greater than or equal to 1")
+
+        # typical cases
+        # the most recent calculation is at the end of the list
+        return self.__memory[-num_calculations_ago]
+
+    def insert_answers(self, expr):
+        """
+        Return 'expr' with each memory reference ('ans' for the previous answer or 'Mx' for the xth previous answer) replaced with the answer in brackets
+        References must be whole words so the names of functions (such as 'sum' and 'mean') are left alone, as are the paths of files of numbers
+        Will raise CalcError if a reference is to an item that isn't in memory
+
+        :param expr (str): The expression as the user typed it
+        :return (str): The expression with the answers in place of the memory references
+        """
+
+        # only imported when needed so importing this is quick
+        from re import IGNORECASE, sub
+
+        def replace(match):
+            """Return the answer the memory reference matched refers to, or the path of a file of numbers as it is"""
+
+            path, index = match.group(1, 2)
+            if path is not None:
+                return path
+
+            index = 1 if index is None else int(index)
+            if not 1 <= index <= self.len_memory():
+                raise CalcError("Memory references must be between 1 and the number of items in memory")
+            return "(" + self.memory_item(index)[1] + ")"
+
+        # paths go from '@' to the end of the operand and are matched first so memory references in them are skipped
+        return sub(r"(@[^,)\]]*)|\bm(\d+)\b|\bans\b", replace, expr, flags=IGNORECASE)
+
+    def recent_memory(self, num_to_retrieve=None):
+        """
+        Retrieve a list of answers from memory along with the expressions that resulted in each of them
+        Will raise IndexError if 'num_to_retrieve' isn't an integer greater than or equal to 1
+
+        :param num_to_retrieve (int): The number of answers to retrieve. 'None' means all. Default: None
+        :return (list): The memory items (most recent first) which are each a 2-value tuple where the 0th
+                        index is the string expression and the 1st is the string answer
+        """
+
+        # make 'None' mean all and if there are less than asked for, just return the number available
+        if num_to_retrieve is None or num_to_retrieve > self.len_memory():
+            num_to_retrieve = self.len_memory()
+
+        # invalid cases
+        if not isinstance(num_to_retrieve, int):
+            raise IndexError("Must be an integer (whole number")
+        if num_to_retrieve < 0:
+            raise IndexError("Must be greater than or equal to 0")
+
+        # typical cases
+        # the slice selects the last 'num_to_retrieve' items in the list 'self.__memory', which are reversed so the most recent is first
+        return self.__memory[len(self.__memory) - num_to_retrieve:][::-1]
+
+    def clear_memory(self):
+        """Clear the calculator's memory"""
+
+        self.__memory.clear()
+
+    def definition_sources(self):
+        """
+        Return every definition made, in order, to give to 'calculate_with_definitions' or 'preview_with_definitions' in another process
+
+        :return (tuple): The definitions as they were typed
+        """
+
+        return tuple(self.__definitions.sources())
+
+    def clear_definitions(self):
+        """Forget all variables and functions that have been defined"""
+
+        self.__definitions.clear()
+
+# the definitions made in this process by 'calculate_with_definitions' and 'preview_with_definitions', which run in worker processes
+process_definitions = Definitions()
+
+def sync_definitions(sources):
+    """
+    Return the definitions in this process after making the definitions in 'sources' that haven't been made yet,
+    starting again if the definitions made so far aren't the start of 'sources' (such as when they have been cleared)
+
+    :param sources (tuple): Every definition made, in order, from 'Interface.definition_sources'
+    """
+
+    global process_definitions
+    made = process_definitions.sources()
+    if list(sources[:len(made)]) != made:
+        process_definitions = Definitions()
+        made = []
+
+    for source in sources[len(made):]:
+        process_definitions.record(source)
+
+    return process_definitions
+
+def calculate_with_definitions(expr, sources=(), cache_path=None, files_directory=None):
+    """
+    Calculate the answer to 'expr' (or make the definition) with the definitions 'sources', for use as the target of a worker
+
+    :param expr (str): The expression to execute or definition to make
+    :param sources (tuple): Every definition made, in order, from 'Interface.definition_sources'. Default: ()
+    :param cache_path (str): The path to the file of a cache of answers shared with other processes (see 'Cache.py'). Default: None (no shared cache)
+    :param files_directory (str): The directory files of numbers can be read from, '' for anywhere. Default: None (files can't be read)
+    :return ans (str): The answer to 'expr'
+    """
+
+    definitions = sync_definitions(sources)
+    definitions.shared_cache = None
+    if cache_path is not None:
+
+        # only imported when needed as SQLite is slow to import
+        from Cache import open_cache
+        definitions.shared_cache = open_cache(cache_path)
+
+    with number_files(files_directory):
+        return definitions.calculate(expr)
+
+def preview_with_definitions(expr, sources=(), files_directory=None):
+    """
+    Return the answer to 'expr' to show as a preview while it is being typed, or 'None' if it is incomplete, invalid or a definition,
+    using the definitions 'sources', for use as the target of a worker
+
+    :param expr (str): The expression to preview
+    :param sources (tuple): Every definition made, in order, from 'Interface.definition_sources'. Default: ()
+    :param files_directory (str): The directory files of numbers can be read from, '' for anywhere. Default: None (files can't be read)
+    :return ans (str): The answer to 'expr' or 'None'
+    """
+
+    try:
+        definitions = sync_definitions(sources)
+    except CalcError:
+        return None
+
+    with number_files(files_directory):
+        return definitions.preview(expr)
+
+# only runs if the file is run directly (not if imported)
+if __name__ == "__main__":
+
+    # instantiate the class, allowing any file of numbers as the user is typing the expressions
+    calc = Interface(files_directory="")
+
+    # extend instructions
+    new_instructions = calc.instructions + "\n\nType 'memory' to view previous calculations, 'instructions' to view instructions, 'clear' to clear the memory, 'ans' in place of the previous answer and 'Mx' where x is a number in place of the xth previous answer"
+
+    # quick user interface to test the calculator through the interface and memory access
+    # repeats until the user enters an empty expression
+    # (the expression isn't made lower case as the paths of files of numbers are case sensitive, only the commands are compared in lower case)
+    expression = input("\n>")
+    while expression != "":
+        command = expression.lower()
+
+        # typing 'instructions' will output the general instructions
+        if "instructions" in command:
+            print(new_instructions)
+
+        # typing 'clear' will clear the memory
+        elif "clear" in command:
+            calc.clear_memory()
+            print("Memory cleared")
+
+        # typing 'memory' will output all previous calculations
+        elif "memory" in command:
+            count = 1
+            for expr, ans in calc.recent_memory():
+                print("{}: {} = {}".format(count, expr, ans))
+                count += 1
+            if count == 1:
+                print("Memory is empty")
+
+        else:
+            try:
+                # including 'ans' will replace it with the previous answer and 'Mx' with the xth previous answer
+                expression = calc.insert_answers(expression)
+
+                # calculate the answer
+                print(calc.calculate(expression))
+
+            # catch and output errors
+            except CalcError as e:
+                print(e)
+
+        expression = input("\n>")
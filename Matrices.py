@@ -0,0 +1,232 @@
+"""
+Contains the code for vectors and matrices (arrays) in the calculator, which are stored and executed with NumPy
+An array is written as its values separated by commas inside square brackets, eg '[1, 2, 3]', and a matrix as an array of
+rows, eg '[[1, 2], [3, 4]]'. The operators work element-wise on arrays, also combining arrays with numbers (broadcasting),
+and the functions 'dot', 'det', 'inv', 'solve' and 'reshape' do linear algebra with them
+This is a pack, added to the registry in 'Registry.py' with the 'register' function the first time an array is used,
+which also adds the functions to execute the existing operations with arrays. It needs NumPy to be installed
+"""
+
+import numpy as np
+from itertools import chain
+from Errors import CalcError, CalcOperationError
+
+def to_array(x):
+    """Return the operand 'x' as something NumPy can execute - arrays unchanged and numbers as floats"""
+    return x if isinstance(x, np.ndarray) else np.float64(x)
+
+def describe(operands):
+    """Return the operands to show in error messages, with arrays (which could be very big) described by their shape"""
+    return ["array with shape {}".format(x.shape) if isinstance(x, np.ndarray) else x for x in operands]
+
+def numpy_operation(op_name, func):
+    """
+    Return a function to execute 'func' with arrays, converting numbers to floats and NumPy's errors to my format
+
+    :param op_name (str): The name of the operation, for error messages
+    :param func (function): The NumPy function to execute the operation with
+    """
+
+    def execute(*operands):
+
+        # make NumPy raise errors rather than give infinity or 'nan' so they are the same as with numbers
+        try:
+            with np.errstate(all="raise"):
+                return func(*[to_array(operand) for operand in operands])
+        except FloatingPointError as e:
+            if "divide" in str(e) and op_name in ("/", "\\", "%"):
+                raise CalcOperationError("Cannot divide by 0", op_name, describe(operands))
+            if "overflow" in str(e):
+                raise CalcError("Number too big")
+            raise CalcError("Invalid operation")
+
+        # linear algebra with matrices that don't have an answer
+        except np.linalg.LinAlgError as e:
+            if "singular" in str(e).lower():
+                raise CalcOperationError("The matrix is singular (its determinant is 0)", op_name, describe(operands))
+            raise CalcOperationError("Must be a square matrix", op_name, describe(operands))
+
+        # arrays of different shapes that can't be combined
+        except ValueError:
+            raise CalcError("Arrays with shapes {} can't be used in {}".format(
+                " and ".join([str(np.shape(operand)) for operand in operands]), op_name))
+
+    return execute
+
+def floor_div(x, y):
+    """Return x divided by y, rounded towards 0 the same as with numbers"""
+
+    # check for dividing by 0 first as 'trunc' of infinity doesn't raise an error
+    if np.any(y == 0):
+        raise FloatingPointError("divide by zero")
+
+    return np.trunc(x / y)
+
+def root(root, x):
+    """Return the root th root of x"""
+
+    # invalid cases
+    if np.any(root <= 0) or np.any(root % 1 != 0):
+        raise CalcOperationError("The root must be a positive whole number", "¬", describe([root, x]))
+
+    return x ** (1 / root)
+
+def comparison(func):
+    """Return a function to compare arrays with 'func', giving 1 for each number where the comparison is true and 0 where it isn't"""
+    return lambda x, y: func(x, y).astype(float)
+
+def func_array(values):
+    """
+    Return an array of the values, which can be numbers (a vector) or arrays of the same shape (a matrix or higher)
+
+    :param values (iterator): The values in the array
+    :return (ndarray): The array
+    """
+
+    # files of numbers could be empty so there might not be a first value
+    first = next(values, None)
+    if first is None:
+        raise CalcError("Arrays must have at least 1 value")
+
+    # an array of numbers, converted one at a time so big files of numbers don't need to be in memory as 'Num's
+    if not isinstance(first, np.ndarray):
+        return np.fromiter(numbers(chain([first], values)), float)
+
+    # an array of arrays, which must all be the same shape
+    values = [first] + list(values)
+    if not all(isinstance(value, np.ndarray) for value in values):
+        raise CalcError("Arrays can't contain both numbers and arrays")
+    if len({value.shape for value in values}) != 1:
+        raise CalcError("The rows of a matrix must all be the same length")
+
+    return np.stack(values)
+
+def numbers(values):
+    """Yield each of the values as a float, erroring if any are arrays"""
+
+    for value in values:
+        if isinstance(value, np.ndarray):
+            raise CalcError("Arrays can't contain both numbers and arrays")
+        yield float(value)
+
+def func_dot(x, y):
+    """Return the dot product of 2 numbers - they are multiplied"""
+    return x * y
+
+def func_det(x):
+    """Return the determinant of a number - the number itself"""
+    return x
+
+def func_inv(x):
+    """Return the inverse of a number - 1 divided by it"""
+
+    # invalid case
+    if x == 0:
+        raise CalcOperationError("0 has no inverse", "inv", [x])
+
+    return 1 / x
+
+def func_solve(a, b):
+    """Return x where ax = b with numbers"""
+
+    # invalid case
+    if a == 0:
+        raise CalcOperationError("Cannot divide by 0", "solve", [a, b])
+
+    return b / a
+
+def func_reshape(x, rows, columns):
+    """Error as only arrays can be reshaped"""
+    raise CalcOperationError("Can only reshape arrays", "reshape", describe([x, rows, columns]))
+
+def reshape(x, rows, columns):
+    """Return the array 'x' with its values rearranged into a matrix with 'rows' rows and 'columns' columns"""
+
+    # invalid cases
+    if not isinstance(x, np.ndarray):
+        raise CalcOperationError("Can only reshape arrays", "reshape", describe([x, rows, columns]))
+    if rows % 1 != 0 or columns % 1 != 0 or rows <= 0 or columns <= 0:
+        raise CalcOperationError("The number of rows and columns must be positive whole numbers", "reshape", [rows, columns])
+    if int(rows) * int(columns) != x.size:
+        raise CalcOperationError("The array has {} values, not {}".format(x.size, int(rows) * int(columns)), "reshape", [rows, columns])
+
+    return x.reshape(int(rows), int(columns))
+
+def aggregate(op_name, func):
+    """
+    Return a function to execute the aggregate function 'func' with all of the values in arrays and numbers
+
+    :param op_name (str): The name of the function, for error messages
+    :param func (function): The NumPy function to execute with a single array of all of the values
+    """
+
+    def execute(values):
+        values = np.concatenate([np.ravel(to_array(value)) for value in values])
+        if values.size < (2 if op_name in ("var", "stdev") else 1):
+            raise CalcOperationError("Must have at least {} values".format(2 if op_name in ("var", "stdev") else 1), op_name, [])
+        return numpy_operation(op_name, func)(values)
+
+    return execute
+
+def format_array(array, format_number):
+    """
+    Return the array as a string answer in the same way it is written in expressions, eg '[[1, 2], [3, 4]]'
+
+    :param array (ndarray): The array
+    :param format_number (function): The function to format each number in the array with
+    """
+
+    if array.ndim == 0:
+        return format_number(array.item())
+
+    return "[" + ", ".join([format_array(row, format_number) for row in array]) + "]"
+
+def register(registry):
+    """Add arrays, the functions in this pack and the functions to execute the existing operations with arrays to 'registry'"""
+
+    registry.add_value_type(np.ndarray, "array", format_array)
+
+    # '[' starts an array, which is a function whose operands are inside the square brackets
+    registry.add_function("[", "Array", func_array, None, backends={"array": func_array})
+    registry.add_function("dot", "Dot product", func_dot, 2, backends={"array": numpy_operation("dot", np.dot)})
+    registry.add_function("det", "Determinant", func_det, 1, backends={"array": numpy_operation("det", np.linalg.det)})
+    registry.add_function("inv", "Inverse", func_inv, 1, backends={"array": numpy_operation("inv", np.linalg.inv)})
+    registry.add_function("solve", "Solve linear equations", func_solve, 2, backends={"array": numpy_operation("solve", np.linalg.solve)})
+    registry.add_function("reshape", "Reshape", func_reshape, 3, backends={"array": reshape})
+
+    # the operators work element-wise
+    registry.add_backend("+", "array", numpy_operation("+", np.add))
+    registry.add_backend("+", "array", numpy_operation("+", np.positive), is_unary=True)
+    registry.add_backend("-", "array", numpy_operation("-", np.subtract))
+    registry.add_backend("-", "array", numpy_operation("-", np.negative), is_unary=True)
+    registry.add_backend("*", "array", numpy_operation("*", np.multiply))
+    registry.add_backend("/", "array", numpy_operation("/", np.divide))
+    registry.add_backend("\\", "array", numpy_operation("\\", floor_div))
+    registry.add_backend("%", "array", numpy_operation("%", np.fmod))
+    registry.add_backend("^", "array", numpy_operation("^", np.power))
+    registry.add_backend("¬", "array", numpy_operation("¬", root))
+
+    # comparisons work element-wise too
+    registry.add_backend("<", "array", numpy_operation("<", comparison(np.less)))
+    registry.add_backend("<=", "array", numpy_operation("<=", comparison(np.less_equal)))
+    registry.add_backend(">", "array", numpy_operation(">", comparison(np.greater)))
+    registry.add_backend(">=", "array", numpy_operation(">=", comparison(np.greater_equal)))
+    registry.add_backend("=", "array", numpy_operation("=", comparison(np.equal)))
+    registry.add_backend("<>", "array", numpy_operation("<>", comparison(np.not_equal)))
+
+    # functions of 1 number work element-wise
+    registry.add_backend("abs", "array", numpy_operation("abs", np.abs))
+    registry.add_backend("ln", "array", numpy_operation("ln", np.log))
+    registry.add_backend("sin", "array", numpy_operation("sin", np.sin))
+    registry.add_backend("cos", "array", numpy_operation("cos", np.cos))
+    registry.add_backend("tan", "array", numpy_operation("tan", np.tan))
+
+    # aggregate functions use all of the values in the arrays
+    registry.add_backend("sum", "array", aggregate("sum", np.sum))
+    registry.add_backend("prod", "array", aggregate("prod", np.prod))
+    registry.add_backend("mean", "array", aggregate("mean", np.mean))
+    registry.add_backend("min", "array", aggregate("min", np.min))
+    registry.add_backend("max", "array", aggregate("max", np.max))
+    registry.add_backend("var", "array", aggregate("var", lambda values: np.var(values, ddof=1)))
+    registry.add_backend("stdev", "array", aggregate("stdev", lambda values: np.std(values, ddof=1)))
+    registry.add_backend("median", "array", aggregate("median", np.median))
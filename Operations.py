@@ -1,382 +1,475 @@
-"""
-Contains the code for the operations that can be used in the calculator
-"""
-
-from Errors import CalcOperationError
-from math import log, sin, cos, tan, asin, acos, atan, sinh, cosh, tanh, asinh, acosh, atanh
-from random import randint
-
-def op_add(x, y):
-    """Return x add y"""
-
-    # typical cases
-    return x + y
-
-def op_sub(x, y):
-    """Return x subtract y"""
-
-    # typical cases
-    return x - y
-
-def op_mul(x, y):
-    """Return x multiplied by y"""
-
-    # typical cases
-    return x * y
-
-def op_true_div(x, y):
-    """Return x divided by y"""
-
-    # invalid case
-    if y == 0:
-        raise CalcOperationError("Cannot divide by 0", "/", [x, y])
-
-    # typical cases
-    return x / y
-
-def op_floor_div(x, y):
-    """Return x divided by y, rounded down"""
-
-    # invalid case
-    if y == 0:
-        raise CalcOperationError("Cannot divide by 0", "\\", [x, y])
-
-    # typical cases
-    return x // y
-
-def op_mod(x, y):
-    """Return x mod y - the remainder when x is divided by y"""
-
-    # invalid case
-    if y == 0:
-        raise CalcOperationError("Cannot divide by 0", "%", [x, y])
-
-    # typical cases
-    return x % y
-
-def op_exp(x, y):
-    """Return x to the power of y"""
-
-    # invalid case
-    if x == 0 and y == 0:
-        raise CalcOperationError("0 to the power of 0 is undefined", "^", [x, y])
-
-    # typical cases
-    return x ** y
-
-def op_root(root, x):
-    """Return the root th root of x"""
-
-    # invalid cases
-    if root <= 0 or root % 1 != 0:
-        raise CalcOperationError("The root must be a positive whole number", "¬", [root, x])
-
-    # specific case of power
-    return x ** (1 / root)
-
-def op_permutations(n, r):
-    """Return the number of ways there are to arrange r things in n places, counting all orders"""
-
-    # invalid cases
-    if n % 1 != 0 or r % 1 != 0 or n < 0 or r < 0:
-        raise CalcOperationError("Both must be whole numbers and cannot be negative", "P", [n, r])
-    if r > n:
-        raise CalcOperationError("r ({}) cannot be greater than n ({})".format(r, n), "P", [n, r])
-
-    # use the factorial operation already defined
-    return op_factorial(n) / op_factorial(n - r)
-
-def op_combinations(n, r):
-    """Return the number of ways there are to arrange r things in n places, only counting 1 order"""
-
-    # invalid cases
-    if n % 1 != 0 or r % 1 != 0 or n < 0 or r < 0:
-        raise CalcOperationError("Both must be whole numbers and cannot be negative", "C", [n, r])
-    if r > n:
-        raise CalcOperationError("r ({}) cannot be greater than n ({})".format(r, n), "C", [n, r])
-
-    # use the factorial operation already defined
-    return op_factorial(n) / (op_factorial(r) * op_factorial(n - r))
-
-def op_pos(x):
-    """Return the positive of x"""
-
-    # typical cases
-    return +x
-
-def op_neg(x):
-    """Return the negative of x"""
-
-    # typical cases
-    return -x
-
-def op_factorial(x):
-    """Return x factorial"""
-
-    # invalid cases
-    if x < 0 or x % 1 != 0:
-        raise CalcOperationError("Must be whole number and cannot be negative", "!", [x])
-
-    # multiply all numbers between 1 and x together
-    product = 1
-    while x > 1:
-        product *= x
-        x -= 1
-
-    return product
-
-def func_ln(x):
-    """Return ln(x)"""
-
-    # invalid cases
-    if x <= 0:
-        raise CalcOperationError("Can only find the natural log of positive numbers", "ln", [x])
-
-    # use the function from the 'math' library
-    return log(x)
-
-def func_log(x, base):
-    """Return log of x to the base 'base'"""
-
-    # invalid cases
-    if x <= 0 or base <= 0:
-        raise CalcOperationError("Can only find the log of a positive number with a positive base", "log", [base, x])
-
-    # use the function from the 'math' library
-    return log(x, base)
-
-def func_abs(x):
-    """Return the absolute value of x"""
-
-    # use the built-in function
-    return abs(x)
-
-def prime_factors(x):
-    """Return a list of all of x's prime factors"""
-
-    # invalid cases
-    if x % 1 != 0 or x < 1:
-        raise CalcOperationError("Must be a positive whole number", "LCM or HCF", [x])
-
-    # typical cases
-    factors = []
-    i = 2
-
-    # for each possible factor
-    while i ** 2 <= x:
-
-        # if it is a factor, add it and adjust x to prevent repeats
-        # don't increment i as more than 1 of the same factor is possible
-        if x % i == 0:
-            x //= i
-            factors.append(i)
-
-        # if it's not a factor, increment it to find the next
-        else:
-            i += 1
-
-    # add the last factor if x isn't 1
-    if x > 1:
-        factors.append(x)
-
-    return factors
-
-def to_dict(factors):
-    """Gets a dictionary of all numbers and the number of times they occur"""
-
-    factors_dict = {}
-    for factor in factors:
-
-        # if that prime factor is already in the dictionary, increment the count
-        if factor in factors_dict:
-            factors_dict[factor] += 1
-
-        # otherwise, add it with an initial count of 1
-        else:
-            factors_dict[factor] = 1
-
-    return factors_dict
-
-def product_dict(dictionary):
-
-    # the number of times each key appears is the value corresponding to that key
-    # so the product is the product of all keys each to the power of their value
-    product = 1
-    for key in dictionary:
-        product *= key ** dictionary[key]
-
-    return product
-
-def func_lcm(x, y):
-    """Return the lowest common multiple of x and y"""
-
-    # gets dictionaries for each input with the prime factors
-    # as the key and the number of occurances as the value
-    prime_factors_x = to_dict(prime_factors(x))
-    prime_factors_y = to_dict(prime_factors(y))
-
-    # the prime factors of the LCM of x and y starts as those of x
-    prime_factors_lcm = prime_factors_x.copy()
-
-    for factor in prime_factors_y:
-
-        # if the factor is not in LCM or it is in LCM but y has more, add the number y has
-        if factor not in prime_factors_lcm or prime_factors_y[factor] > prime_factors_lcm[factor]:
-            prime_factors_lcm[factor] = prime_factors_y[factor]
-
-    # multiply all the prime factors together to get the LCM
-    return product_dict(prime_factors_lcm)
-
-def func_hcf(x, y):
-    """Return the highest common factor of x and y"""
-
-    # gets dictionaries for each input with the prime factors
-    # as the key and the number of occurances as the value
-    prime_factors_x = to_dict(prime_factors(x))
-    prime_factors_y = to_dict(prime_factors(y))
-
-    prime_factors_hcf = {}
-
-    # the prime factors of the HCF are the minimum number that are in both x and y
-    for factor in prime_factors_x:
-        if factor in prime_factors_y:
-            prime_factors_hcf[factor] = min(prime_factors_x[factor], prime_factors_y[factor])
-
-    # multiply all the prime factors together to get the HCF
-    return product_dict(prime_factors_hcf)
-
-def func_quadp(a, b, c):
-    """Return the positive square root answer of the quadratic equation ax^2 + bx + c = 0"""
-
-    from Datatypes import Num
-
-    discriminant = b**2 - 4*a*c
-
-    # invalid cases
-    if discriminant < 0:
-        raise CalcOperationError("No real solutions", "quadp", [a, b, c])
-
-    # quadratic formula with positive square root
-    return (-b + discriminant**Num("0.5")) / (2 * a)
-
-def func_quadn(a, b, c):
-    """Return the positive square root answer of the quadratic equation ax^2 + bx + c = 0"""
-
-    from Datatypes import Num
-
-    discriminant = b**2 - 4*a*c
-
-    # invalid cases
-    if discriminant < 0:
-        raise CalcOperationError("No real solutions", "quadn", [a, b, c])
-
-    # quadratic formula with negative square root
-    return (-b - discriminant**Num("0.5")) / (2 * a)
-
-def func_rand(low, high):
-    """Return a random integer between 'low' and 'high'"""
-
-    # invalid cases
-    if low % 1 != 0 or high % 1 != 0:
-        raise CalcOperationError("Must be whole numbers", "rand", [low, high])
-
-    # if the wrong way around, swap them
-    if low > high:
-        low, high = high, low
-
-    # use the function from the 'random' library
-    return randint(low, high)
-
-def func_sin(x):
-    """Return sin(x) where x is in radians"""
-
-    # use the function from the 'math' library
-    return sin(x)
-
-def func_cos(x):
-    """Return cos(x) where x is in radians"""
-
-    # use the function from the 'math' library
-    return cos(x)
-
-def func_tan(x):
-    """Return tan(x) where x is in radians"""
-
-    from Datatypes import valid_tokens, Num
-
-    # invalid cases
-    if x % valid_tokens["pi"] == Num("0.5") * valid_tokens["pi"]:
-        raise CalcOperationError("Tangent is undefined for values half way between multiples of pi", "tan", [x])
-
-    # use the function from the 'math' library
-    return tan(x)
-
-def func_arsin(x):
-    """Return arsin(x) where the answer is in radians"""
-
-    # invalid cases
-    if x < -1 or x > 1:
-        raise CalcOperationError("Inverse sine is only defined for values between -1 and 1 inclusive", "arsin", [x])
-
-    # use the function from the 'math' library
-    return asin(x)
-
-def func_arcos(x):
-    """Return arcos(x) where the answer is in radians"""
-
-    # invalid cases
-    if x < -1 or x > 1:
-        raise CalcOperationError("Inverse cosine is only defined for values between -1 and 1 inclusive", "arcos", [x])
-
-    # use the function from the 'math' library
-    return acos(x)
-
-def func_artan(x):
-    """Return artan(x) where the answer is in radian"""
-
-    # use the function from the 'math' library
-    return atan(x)
-
-def func_sinh(x):
-    """Return sinh(x) where x is in radians"""
-
-    # use the function from the 'math' library
-    return sinh(x)
-
-def func_cosh(x):
-    """Return cosh(x) where x is in radians"""
-
-    # use the function from the 'math' library
-    return cosh(x)
-
-def func_tanh(x):
-    """Return tanh(x) where x is in radians"""
-
-    # use the function from the 'math' library
-    return tanh(x)
-
-def func_arsinh(x):
-    """Return arsinh(x) where the answer is in radians"""
-
-    # use the function from the 'math' library
-    return asinh(x)
-
-def func_arcosh(x):
-    """Return arcosh(x) where the answer is in radians"""
-
-    # invalid cases
-    if x < 1:
-        raise CalcOperationError("Inverse hyperbolic cosine is undefined for values less than 1", "arcosh", [x])
-
-    # use the function from the 'math' library
-    return acosh(x)
-
-def func_artanh(x):
-    """Return artanh(x) where the answer is in radian"""
-
-    # invalid cases
-    if x <= -1 or x >= 1:
-        raise CalcOperationError("Inverse hyperbolic tangent is only defined for values between -1 and 1 exclusive", "artanh", [x])
-
-    # use the function from the 'math' library
-    return atanh(x)
+"""
+Contains the code for the operations that can be used in the calculator
+This is the core pack of operators, functions and constants, added to the registry in 'Registry.py' with the 'register' function
+"""
+
+from Datatypes import Num, MAX_INT_DIGITS
+import Constants
+from Errors import CalcOperationError
+from math import log, log10, lgamma, factorial, gcd, isqrt
+
+# the random number generator 'rand' uses - python's shared one unless it's set to another with a 'randint' method, such as by 'Simulate.py'
+generator = None
+
+def op_add(x, y):
+    """Return x add y"""
+
+    # typical cases
+    return x + y
+
+def op_sub(x, y):
+    """Return x subtract y"""
+
+    # typical cases
+    return x - y
+
+def op_mul(x, y):
+    """Return x multiplied by y"""
+
+    # typical cases
+    return x * y
+
+def op_true_div(x, y):
+    """Return x divided by y"""
+
+    # invalid case
+    if y == 0:
+        raise CalcOperationError("Cannot divide by 0", "/", [x, y])
+
+    # typical cases
+    return x / y
+
+def op_floor_div(x, y):
+    """Return x divided by y, rounded down"""
+
+    # invalid case
+    if y == 0:
+        raise CalcOperationError("Cannot divide by 0", "\\", [x, y])
+
+    # typical cases
+    return x // y
+
+def op_mod(x, y):
+    """Return x mod y - the remainder when x is divided by y"""
+
+    # invalid case
+    if y == 0:
+        raise CalcOperationError("Cannot divide by 0", "%", [x, y])
+
+    # typical cases
+    return x % y
+
+def op_exp(x, y):
+    """Return x to the power of y"""
+
+    # invalid case
+    if x == 0 and y == 0:
+        raise CalcOperationError("0 to the power of 0 is undefined", "^", [x, y])
+
+    # typical cases
+    return x ** y
+
+def op_root(root, x):
+    """Return the root th root of x"""
+
+    # invalid cases
+    if root <= 0 or root % 1 != 0:
+        raise CalcOperationError("The root must be a positive whole number", "¬", [root, x])
+
+    # specific case of power
+    return x ** (1 / root)
+
+def int_floor_div(x, y):
+    """Return x divided by y, rounded towards 0 the same as with 'Num's, exactly with whole numbers"""
+
+    # invalid case
+    if y == 0:
+        raise CalcOperationError("Cannot divide by 0", "\\", [x, y])
+
+    # python's integer division rounds down rather than towards 0
+    quotient = abs(x) // abs(y)
+    return quotient if (x < 0) == (y < 0) else -quotient
+
+def int_mod(x, y):
+    """Return x mod y, with the sign of x the same as with 'Num's, exactly with whole numbers"""
+
+    # invalid case
+    if y == 0:
+        raise CalcOperationError("Cannot divide by 0", "%", [x, y])
+
+    return x - y * int_floor_div(x, y)
+
+def int_exp(x, y):
+    """Return x to the power of y exactly with whole numbers, unless y is negative or the answer would be too big to show"""
+
+    # invalid case
+    if x == 0 and y == 0:
+        raise CalcOperationError("0 to the power of 0 is undefined", "^", [x, y])
+
+    # answers that aren't whole numbers or are too big are calculated as 'Num's
+    if y < 0 or abs(x) > 1 and y * log10(abs(x)) > MAX_INT_DIGITS:
+        return op_exp(Num(x), Num(y))
+
+    return x ** y
+
+def int_powmod(x, y, m):
+    """Return x to the power of y mod m exactly with whole numbers, the same as 'x ^ y % m' but without calculating x to the power of y"""
+
+    # answers that aren't whole numbers are calculated as 'Num's
+    if y < 0:
+        return op_mod(int_exp(x, y), Num(m))
+
+    # invalid cases
+    if x == 0 and y == 0:
+        raise CalcOperationError("0 to the power of 0 is undefined", "^", [x, y])
+    if m == 0:
+        raise CalcOperationError("Cannot divide by 0", "%", [x, y, m])
+
+    # the answer has the sign of x to the power of y the same as with '%'
+    answer = pow(abs(x), y, abs(m))
+    return -answer if x < 0 and y % 2 == 1 else answer
+
+def op_permutations(n, r):
+    """Return the number of ways there are to arrange r things in n places, counting all orders"""
+
+    # invalid cases
+    if n % 1 != 0 or r % 1 != 0 or n < 0 or r < 0:
+        raise CalcOperationError("Both must be whole numbers and cannot be negative", "P", [n, r])
+    if r > n:
+        raise CalcOperationError("r ({}) cannot be greater than n ({})".format(r, n), "P", [n, r])
+
+    # use the factorial operation already defined
+    return op_factorial(n) / op_factorial(n - r)
+
+def op_combinations(n, r):
+    """Return the number of ways there are to arrange r things in n places, only counting 1 order"""
+
+    # invalid cases
+    if n % 1 != 0 or r % 1 != 0 or n < 0 or r < 0:
+        raise CalcOperationError("Both must be whole numbers and cannot be negative", "C", [n, r])
+    if r > n:
+        raise CalcOperationError("r ({}) cannot be greater than n ({})".format(r, n), "C", [n, r])
+
+    # use the factorial operation already defined
+    return op_factorial(n) / (op_factorial(r) * op_factorial(n - r))
+
+def op_pos(x):
+    """Return the positive of x"""
+
+    # typical cases
+    return +x
+
+def op_neg(x):
+    """Return the negative of x"""
+
+    # typical cases
+    return -x
+
+def op_factorial(x):
+    """Return x factorial"""
+
+    # invalid cases
+    if x < 0 or x % 1 != 0:
+        raise CalcOperationError("Must be whole number and cannot be negative", "!", [x])
+
+    # multiply all numbers between 1 and x together
+    product = 1
+    while x > 1:
+        product *= x
+        x -= 1
+
+    return product
+
+def int_factorial(x):
+    """Return x factorial exactly with whole numbers, unless the answer would be too big to show"""
+
+    # invalid case
+    if x < 0:
+        raise CalcOperationError("Must be whole number and cannot be negative", "!", [x])
+
+    # answers that are too big are calculated as 'Num's
+    if lgamma(x + 1) / log(10) > MAX_INT_DIGITS:
+        return op_factorial(Num(x))
+
+    # use the function from the 'math' library
+    return factorial(x)
+
+def func_ln(x):
+    """Return ln(x)"""
+
+    # invalid cases
+    if x <= 0:
+        raise CalcOperationError("Can only find the natural log of positive numbers", "ln", [x])
+
+    # use the function from the 'math' library
+    return log(x)
+
+def func_log(x, base):
+    """Return log of x to the base 'base'"""
+
+    # invalid cases
+    if x <= 0 or base <= 0:
+        raise CalcOperationError("Can only find the log of a positive number with a positive base", "log", [base, x])
+
+    # use the function from the 'math' library
+    return log(x, base)
+
+def func_abs(x):
+    """Return the absolute value of x"""
+
+    # use the built-in function
+    return abs(x)
+
+def prime_factors(x):
+    """Return a list of all of x's prime factors"""
+
+    # invalid cases
+    if x % 1 != 0 or x < 1:
+        raise CalcOperationError("Must be a positive whole number", "LCM or HCF", [x])
+
+    # typical cases
+    factors = []
+    i = 2
+
+    # for each possible factor
+    while i ** 2 <= x:
+
+        # if it is a factor, add it and adjust x to prevent repeats
+        # don't increment i as more than 1 of the same factor is possible
+        if x % i == 0:
+            x //= i
+            factors.append(i)
+
+        # if it's not a factor, increment it to find the next
+        else:
+            i += 1
+
+    # add the last factor if x isn't 1
+    if x > 1:
+        factors.append(x)
+
+    return factors
+
+def to_dict(factors):
+    """Gets a dictionary of all numbers and the number of times they occur"""
+
+    factors_dict = {}
+    for factor in factors:
+
+        # if that prime factor is already in the dictionary, increment the count
+        if factor in factors_dict:
+            factors_dict[factor] += 1
+
+        # otherwise, add it with an initial count of 1
+        else:
+            factors_dict[factor] = 1
+
+    return factors_dict
+
+def product_dict(dictionary):
+
+    # the number of times each key appears is the value corresponding to that key
+    # so the product is the product of all keys each to the power of their value
+    product = 1
+    for key in dictionary:
+        product *= key ** dictionary[key]
+
+    return product
+
+def func_lcm(x, y):
+    """Return the lowest common multiple of x and y"""
+
+    # gets dictionaries for each input with the prime factors
+    # as the key and the number of occurances as the value
+    prime_factors_x = to_dict(prime_factors(x))
+    prime_factors_y = to_dict(prime_factors(y))
+
+    # the prime factors of the LCM of x and y starts as those of x
+    prime_factors_lcm = prime_factors_x.copy()
+
+    for factor in prime_factors_y:
+
+        # if the factor is not in LCM or it is in LCM but y has more, add the number y has
+        if factor not in prime_factors_lcm or prime_factors_y[factor] > prime_factors_lcm[factor]:
+            prime_factors_lcm[factor] = prime_factors_y[factor]
+
+    # multiply all the prime factors together to get the LCM
+    return product_dict(prime_factors_lcm)
+
+def func_hcf(x, y):
+    """Return the highest common factor of x and y"""
+
+    # gets dictionaries for each input with the prime factors
+    # as the key and the number of occurances as the value
+    prime_factors_x = to_dict(prime_factors(x))
+    prime_factors_y = to_dict(prime_factors(y))
+
+    prime_factors_hcf = {}
+
+    # the prime factors of the HCF are the minimum number that are in both x and y
+    for factor in prime_factors_x:
+        if factor in prime_factors_y:
+            prime_factors_hcf[factor] = min(prime_factors_x[factor], prime_factors_y[factor])
+
+    # multiply all the prime factors together to get the HCF
+    return product_dict(prime_factors_hcf)
+
+def whole_numbers(op_name, operands):
+    """Return the operands as python's integers, erroring if they aren't all whole numbers"""
+
+    # invalid case
+    if any(operand % 1 != 0 for operand in operands):
+        raise CalcOperationError("Must be whole numbers", op_name, operands)
+
+    return [int(operand) for operand in operands]
+
+def func_powmod(x, y, m):
+    """Return x to the power of y mod m, between 0 and m, without calculating x to the power of y"""
+
+    x, y, m = whole_numbers("powmod", [x, y, m])
+
+    # invalid cases
+    if m <= 0:
+        raise CalcOperationError("The modulus must be more than 0", "powmod", [x, y, m])
+    if x == 0 and y == 0:
+        raise CalcOperationError("0 to the power of 0 is undefined", "powmod", [x, y, m])
+    if y < 0 and gcd(x, m) != 1:
+        raise CalcOperationError("{} has no inverse mod {} so can't be raised to a negative power".format(x, m), "powmod", [x, y, m])
+
+    # negative powers are powers of the inverse
+    return pow(x, y, m)
+
+def func_modinv(x, m):
+    """Return the inverse of x mod m - the number between 0 and m that gives 1 mod m when multiplied by x"""
+
+    x, m = whole_numbers("modinv", [x, m])
+
+    # invalid cases
+    if m <= 0:
+        raise CalcOperationError("The modulus must be more than 0", "modinv", [x, m])
+    if gcd(x, m) != 1:
+        raise CalcOperationError("{} and {} must have no common factors other than 1".format(x, m), "modinv", [x, m])
+
+    return pow(x, -1, m)
+
+def func_crt(values):
+    """
+    Return the smallest number that is 0 or more and has each remainder mod each modulus, by the Chinese remainder theorem
+    The values are pairs of a remainder followed by its modulus, which don't need to have no common factors as long as there is an answer
+    """
+
+    values = whole_numbers("crt", list(values))
+
+    # invalid cases
+    if len(values) % 2 != 0:
+        raise CalcOperationError("Must be given pairs of a remainder and a modulus", "crt", values)
+    if any(modulus <= 0 for modulus in values[1::2]):
+        raise CalcOperationError("The moduli must be more than 0", "crt", values)
+
+    # combine the pairs one at a time into the answer mod the lowest common multiple of the moduli so far
+    answer, modulus = 0, 1
+    for remainder, other in zip(values[::2], values[1::2]):
+        factor = gcd(modulus, other)
+        if (remainder - answer) % factor != 0:
+            raise CalcOperationError("There is no number with all of these remainders", "crt", values)
+
+        # the multiple of 'modulus' to add to 'answer' so it has the right remainder mod 'other'
+        step = (remainder - answer) // factor * pow(modulus // factor, -1, other // factor) % (other // factor)
+        answer += modulus * step
+        modulus = modulus * other // factor
+        answer %= modulus
+
+    return answer
+
+def func_isqrt(x):
+    """Return the square root of x rounded down to a whole number, exactly however big x is"""
+
+    x, = whole_numbers("isqrt", [x])
+
+    # invalid case
+    if x < 0:
+        raise CalcOperationError("Cannot find the square root of a negative number", "isqrt", [x])
+
+    return isqrt(x)
+
+def func_quadp(a, b, c):
+    """Return the positive square root answer of the quadratic equation ax^2 + bx + c = 0"""
+
+    discriminant = b**2 - 4*a*c
+
+    # invalid cases
+    if discriminant < 0:
+        raise CalcOperationError("No real solutions", "quadp", [a, b, c])
+
+    # quadratic formula with positive square root
+    return (-b + discriminant**Num("0.5")) / (2 * a)
+
+def func_quadn(a, b, c):
+    """Return the positive square root answer of the quadratic equation ax^2 + bx + c = 0"""
+
+    discriminant = b**2 - 4*a*c
+
+    # invalid cases
+    if discriminant < 0:
+        raise CalcOperationError("No real solutions", "quadn", [a, b, c])
+
+    # quadratic formula with negative square root
+    return (-b - discriminant**Num("0.5")) / (2 * a)
+
+def func_rand(low, high):
+    """Return a random integer between 'low' and 'high'"""
+
+    # invalid cases
+    if low % 1 != 0 or high % 1 != 0:
+        raise CalcOperationError("Must be whole numbers", "rand", [low, high])
+
+    # if the wrong way around, swap them
+    if low > high:
+        low, high = high, low
+
+    # use the function from the 'random' library, only imported when needed as it's slow to import
+    if generator is None:
+        from random import randint
+        return randint(int(low), int(high))
+
+    return generator.randint(int(low), int(high))
+
+def register(registry):
+    """Add the operators, functions and constants in this pack to 'registry'"""
+
+    # the operators that give whole numbers from whole numbers have an "int" backend to calculate them exactly
+    registry.add_unary_operator("+", "Positive (+)", op_pos, False, backends={"int": op_pos}, elementwise=True)
+    registry.add_binary_operator("+", "Addition (+)", op_add, 4, True, backends={"int": op_add}, elementwise=True, commutative=True)
+    registry.add_unary_operator("-", "Negative (-)", op_neg, False, backends={"int": op_neg}, elementwise=True)
+    registry.add_binary_operator("-", "Subtraction (-)", op_sub, 4, True, backends={"int": op_sub}, elementwise=True)
+    registry.add_binary_operator("*", "Multiplication (*)", op_mul, 3, True, backends={"int": op_mul}, elementwise=True, commutative=True)
+    registry.add_binary_operator("/", "Division (/)", op_true_div, 3, True, elementwise=True)
+    registry.add_binary_operator("\\", "Floor division (\\)", op_floor_div, 3, True, backends={"int": int_floor_div}, elementwise=True)
+    registry.add_binary_operator("%", "Mod (%)", op_mod, 3, True, backends={"int": int_mod}, elementwise=True)
+    registry.add_binary_operator("^", "Exponentiation (^)", op_exp, 2, False, backends={"int": int_exp}, elementwise=True)
+    registry.add_binary_operator("¬", "Root (¬)", op_root, 2, False, elementwise=True)
+    registry.add_binary_operator("p", "Permutations (P)", op_permutations, 0, True)
+    registry.add_binary_operator("c", "Combinations (C)", op_combinations, 0, True)
+    registry.add_unary_operator("!", "Factorial (!)", op_factorial, True, backends={"int": int_factorial})
+    registry.add_function("ln", "Natural log (ln)", func_ln, 1, elementwise=True)
+    registry.add_function("log", "Logarithm (log)", func_log, 2)
+    registry.add_function("abs", "Absolute value (abs)", func_abs, 1, elementwise=True)
+    registry.add_function("lcm", "Lowest common multiple", func_lcm, 2)
+    registry.add_function("hcf", "Highest common factor", func_hcf, 2)
+    registry.add_function("rand", "Random number generator", func_rand, 2, pure=False, elementwise=True)
+    registry.add_function("powmod", "Modular exponentiation", func_powmod, 3, backends={"int": func_powmod})
+    registry.add_function("modinv", "Modular inverse", func_modinv, 2, backends={"int": func_modinv})
+    registry.add_function("crt", "Chinese remainder theorem", func_crt, None, backends={"int": func_crt})
+    registry.add_function("isqrt", "Integer square root", func_isqrt, 1, backends={"int": func_isqrt})
+    registry.add_function("quadp", "Quadratic equation solver (postive square root)", func_quadp, 3)
+    registry.add_function("quadn", "Quadratic equation solver (negative square root)", func_quadn, 3)
+
+    # 'x ^ y % m' is calculated without calculating 'x ^ y' when they are whole numbers
+    registry.add_fusion("^", "%", "Modular exponentiation (^ %)", int_powmod)
+
+    # the mathematical constants are calculated to the precision of calculations
+    registry.add_constant("pi", Constants.pi)
+    registry.add_constant("tau", Constants.tau)
+    registry.add_constant("e", Constants.e)
+    registry.add_constant("g", "9.80665")
+    registry.add_constant("phi", Constants.phi)
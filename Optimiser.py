@@ -0,0 +1,197 @@
+"""
+Contains the code for optimising compiled expressions (in postfix notation) before they are executed
+The optimised expression must always give the same answer as the original, only faster
+
+Operators that a pack has fused with the registry's 'add_fusion' method, such as '^' then '%' in 'x ^ y % m',
+are replaced by a single operator that calculates them together
+
+Compiled expressions can also be put in a canonical form, so expressions that are written differently but are the same calculation,
+such as '2*x + 1', '1 + x * 2' and '((2*x)+1)', are the same once compiled and canonicalised. Its hash ('structural_hash') is used as
+the key of cached answers instead of the expression as it was typed so they're found however the expression is written
+"""
+
+from Datatypes import Queue, Operator, FunctionInstance, Variable, Num, as_value
+from Registry import registry
+from Errors import CalcError
+
+# the operators that are executed when canonicalising if all their operands are numbers, as they're quick with any numbers written in an expression
+FOLDED_SYMBOLS = ["+", "-", "*", "/"]
+
+def optimise(queue):
+    """
+    Return the compiled expression 'queue' optimised, or 'queue' itself if there is nothing to optimise or it can't be (for example if it has too few operands)
+
+    :param queue (Queue): The tokens in postfix notation
+    :return (Queue): The optimised tokens in postfix notation
+    """
+
+    tokens = []
+    starts = []     # the index in 'tokens' each operand on the stack when executed starts at
+    changed = False
+
+    for token in queue:
+
+        # values, variables and functions are operands on their own
+        if not isinstance(token, Operator):
+            starts.append(len(tokens))
+            tokens.append(token)
+            continue
+
+        # leave expressions with too few operands for 'execute' to give the error
+        num_operands = token.num_operands
+        if len(starts) < num_operands:
+            return queue
+
+        # in postfix notation, the last token of the left operand (before the right operand starts) is the one executed last in it
+        if num_operands == 2:
+            last = tokens[starts[-1] - 1]
+            fused = registry.lookup_fusion(last, token) if isinstance(last, Operator) and not last.is_unary else None
+            if fused is not None:
+                del tokens[starts[-1] - 1]
+                starts[-1] -= 1
+                token = fused
+                changed = True
+
+        # the operator and its operands are now 1 operand starting where its first operand starts
+        start = starts[-num_operands]
+        del starts[-num_operands:]
+        starts.append(start)
+        tokens.append(token)
+
+    if not changed:
+        return queue
+
+    optimised = Queue()
+    for token in tokens:
+        optimised.enqueue(token)
+
+    return optimised
+
+# the operators in 'FOLDED_SYMBOLS', found the first time they're needed by 'canonical'
+folded = None
+
+def folded_operators():
+    """Return the set of operators that are executed when canonicalising if all their operands are numbers"""
+
+    global folded
+    if folded is None:
+        folded = set()
+        for symbol in FOLDED_SYMBOLS:
+            token = registry.lookup(symbol)
+            folded.update(operator for operator in [getattr(token, "unary", None), getattr(token, "binary", None), token] if isinstance(operator, Operator))
+
+    return folded
+
+def describe_value(value):
+    """Return a description of a number or variable in a compiled expression for its canonical form, or 'None' if it can't be described"""
+
+    if type(value) is int:
+        return "i{}".format(value)
+    if type(value) is Num:
+        return "n{}".format(value)
+    if isinstance(value, Variable):
+        return "v{}".format(value.name)
+
+    # other types of value (such as arrays and files of numbers)
+    return None
+
+def canonical(queue):
+    """
+    Return the tokens of the compiled expression 'queue' in canonical form and a description of them, or 'None' if it can't be
+    put in canonical form (if it has too few operands or uses other types of value such as arrays)
+    Operators in 'FOLDED_SYMBOLS' whose operands are all numbers are executed, and the 2 operands of commutative operators (such as '+'
+    and '*') are put in the order of their descriptions. Chains of them (such as 'a + b + c') aren't regrouped as that can change the rounding
+
+    :param queue (Queue): The tokens in postfix notation
+    :return (tuple): The tokens in canonical form as a list and their description
+    """
+
+    stack = []      # each operand as its tokens and their description
+
+    for token in queue:
+
+        if isinstance(token, Operator):
+            num_operands = token.num_operands
+            if len(stack) < num_operands:
+                return None
+            operands = stack[-num_operands:]
+            del stack[-num_operands:]
+
+            # execute it if it's quick, leaving the errors (such as dividing by 0) for 'execute'
+            if token in folded_operators() and all(len(tokens) == 1 and type(tokens[0]) in [int, Num] for tokens, _ in operands):
+                try:
+                    value = as_value(token.execute([tokens[0] for tokens, _ in operands]))
+                except (CalcError, ArithmeticError, ValueError):
+                    value = None
+                if type(value) in [int, Num]:
+                    stack.append(([value], describe_value(value)))
+                    continue
+
+            if token.commutative and operands[1][1] < operands[0][1]:
+                operands.reverse()
+            tokens = [operand_token for operand_tokens, _ in operands for operand_token in operand_tokens] + [token]
+            stack.append((tokens, "{}({})".format(token.name, ", ".join(description for _, description in operands))))
+
+        # functions are described by their symbol, their operands (compiled expressions in canonical form) and the expression with a variable bound in it
+        elif isinstance(token, FunctionInstance):
+            descriptions = []
+            for operand in token.operands:
+                if isinstance(operand, Queue):
+                    operand = canonical(operand)
+                    descriptions.append(operand[1] if operand is not None else None)
+                else:
+                    descriptions.append(describe_value(operand))
+            if token.bound is not None:
+                bound = canonical(token.bound[0])
+                descriptions.append("{} for {}".format(bound[1], token.bound[1]) if bound is not None else None)
+            if token.symbol is None or None in descriptions:
+                return None
+            stack.append(([token], "{}[{}]".format(token.symbol, ", ".join(descriptions))))
+
+        # numbers and variables
+        else:
+            description = describe_value(token)
+            if description is None:
+                return None
+            stack.append(([token], description))
+
+    if len(stack) != 1:
+        return None
+
+    return stack[0]
+
+def canonicalise(queue):
+    """
+    Return the compiled expression 'queue' in canonical form (see 'canonical'), or 'None' if it can't be put in canonical form
+    It gives the same answer as 'queue' but can give a different error (for example if both operands of '+' are invalid)
+
+    :param queue (Queue): The tokens in postfix notation
+    :return (Queue): The tokens in canonical form
+    """
+
+    found = canonical(queue)
+    if found is None:
+        return None
+
+    canonicalised = Queue()
+    for token in found[0]:
+        canonicalised.enqueue(token)
+
+    return canonicalised
+
+def structural_hash(queue):
+    """
+    Return a hash of the compiled expression 'queue' in canonical form, which is the same in every process for expressions that are the
+    same calculation however they are written, or 'None' if it can't be put in canonical form (see 'canonical')
+
+    :param queue (Queue): The tokens in postfix notation
+    :return (str): The hash as hexadecimal
+    """
+
+    found = canonical(queue)
+    if found is None:
+        return None
+
+    # only imported when needed as it's slow to import
+    from hashlib import sha256
+    return sha256(found[1].encode()).hexdigest()
@@ -0,0 +1,292 @@
+"""
+Contains the code for calculating the independent parts of an expression that take a long time, such as the sums in
+'sum(1/i^2, i, 1, 100000) + sum(1/i^3, i, 1, 100000)', at the same time in worker processes so one expression can use many cores
+
+The expression is compiled without executing its functions straight away, then its compiled form (in postfix notation) is split into a
+tree of operations - each operation's operands are the parts before it - and the time each part will take is estimated from the sizes
+of the numbers it uses. Parts that will take long enough and don't depend on each other are sent to the workers as stored compiled
+expressions (see 'Cache.py'), except the first, which is calculated in this process meanwhile, and their answers put in their place
+before the rest is calculated. Expressions that won't take long are calculated as normal without using the workers
+
+Use the 'calculate_parallel' function from code, or run 'Calc.py' with '--workers', for example 'python Calc.py "20000! + 30000!" --workers 2'
+"""
+
+from Calc import compile_expression, execute, post_calc
+from Cache import operator_table, encode_program, decode_program
+from Datatypes import Queue, Num, Operator, FunctionInstance, MAX_INT_DIGITS, is_elementwise
+from Registry import registry
+from Errors import CalcError
+from math import lgamma, log, log10
+from multiprocessing import get_context
+import Calculus
+import os
+
+PARALLEL_SECONDS = 0.05         # how long a part must be estimated to take to be calculated in a worker, well over the time to send it to one
+OPERATION_SECONDS = 1e-6        # the estimated time of an operation on 'Num's or small whole numbers
+LOOP_SECONDS = 1e-6             # the estimated time of each step of operations that loop (such as factorials of 'Num's)
+ARRAY_SECONDS = 4e-9            # the estimated time of an operation on each number in an array, when NumPy is installed
+MULTIPLY_SECONDS = 5e-8         # the estimated time to multiply 2 whole numbers of 64 bits, which grows by the power of 'KARATSUBA'
+KARATSUBA = 1.585
+BINDING_EVALUATIONS = 500       # the estimated number of times a binding that isn't given a range of whole numbers (such as 'integrate') evaluates its expression
+MAX_ESTIMATED_DIGITS = 6        # the most digits a whole number whose value isn't known is estimated to have when it's used as a count
+MAX_COUNT = 10 ** 12            # the most a number used as a count is taken to be, as bigger ones give an error (such as 'Number too big') quickly
+
+class Part:
+    """
+    A part of a compiled expression - an operation and the parts that are its operands - which are the tokens between 'start' and 'end'
+
+    :param start (int): The position of the first token of the part in the compiled expression
+    :param end (int): The position after its last token
+    :param value (object): The value of the part if it's a number in the expression, otherwise 'None'
+    :param digits (int): The estimated number of digits of its answer if it will be a whole number stored as an 'int', otherwise 'None'
+    :param seconds (float): The estimated time to calculate it, including its operands
+    :param operands (list): The parts that are its operands. Default: None (none)
+    """
+
+    def __init__(self, start, end, value, digits, seconds, operands=None):
+        self.start = start
+        self.end = end
+        self.value = value
+        self.digits = digits
+        self.seconds = seconds
+        self.operands = operands if operands is not None else []
+
+    def __repr__(self):
+        return "Part({}:{}, {:.3g}s)".format(self.start, self.end, self.seconds)
+
+def count(part):
+    """Return the value of a part as a whole number if it's known, otherwise an estimate of the biggest it's likely to be"""
+
+    if type(part.value) is int:
+        return min(abs(part.value), MAX_COUNT)
+    if part.value is not None:
+        return int(min(abs(part.value), MAX_COUNT)) if part.value.is_finite() else 0
+    return 10 ** min(part.digits if part.digits is not None else MAX_ESTIMATED_DIGITS, MAX_ESTIMATED_DIGITS)
+
+def multiply_seconds(digits):
+    """Return the estimated time to multiply 2 whole numbers with 'digits' digits"""
+    return MULTIPLY_SECONDS * max(digits / 19, 1) ** KARATSUBA
+
+def estimate_operator(symbol, token, operands):
+    """
+    Return the estimated number of digits of the answer of an operator (see 'Part') and the time to calculate it
+
+    :param symbol (str): The operator's symbol, or for fused operators the symbols of the operators it fuses joined by a space
+    :param token (Operator): The operator
+    :param operands (list): The parts that are its operands
+    :return (tuple): The number of digits and the time in seconds
+    """
+
+    # whole numbers stay 'int's with operators that can calculate them exactly, until they get too big
+    digits = [operand.digits for operand in operands]
+    if None in digits or "int" not in token.backends:
+        digits = None
+    elif symbol == "*":
+        digits = sum(digits)
+    elif symbol == "^":
+        digits = digits[0] * count(operands[1])
+    elif symbol == "!":
+        n = count(operands[0])
+        digits = int(lgamma(n + 1) / log(10)) + 1
+    elif symbol in ["\\", "%"]:
+        digits = digits[1] if symbol == "%" else max(digits[0] - digits[1] + 1, 1)
+    else:
+        digits = max(digits) + 1
+    if digits is not None and digits > MAX_INT_DIGITS:
+        digits = None
+
+    # operations that multiply many times or loop over a range of whole numbers
+    if symbol == "^ %":
+        bits = (operands[1].digits or 1) / log10(2)
+        return digits, bits * multiply_seconds(operands[2].digits or 1) * 2
+    if symbol == "!" and digits is None:
+        return digits, count(operands[0]) * LOOP_SECONDS
+    if symbol in ["p", "c"]:
+        return digits, min(count(operands[0]), count(operands[1])) * LOOP_SECONDS
+    if digits is not None and symbol in ["*", "^", "!"]:
+        return digits, multiply_seconds(digits)
+
+    return digits, OPERATION_SECONDS
+
+def estimate_function(token):
+    """Return the estimated number of digits of the answer of a function (see 'Part') and the time to calculate it"""
+
+    operands = [operand for operand in token.operands if not isinstance(operand, Queue)]
+    sizes = [len(str(abs(operand))) if type(operand) is int else None for operand in operands]
+    digits = max(sizes) if sizes and None not in sizes and "int" in token.backends else None
+
+    # bindings evaluate their expression for each whole number in a range given by their last 2 operands (like 'sum') or many times
+    # (like 'integrate'), many at once if every operation in it works on arrays
+    if token.bound is not None:
+        evaluations = BINDING_EVALUATIONS
+        if len(operands) >= 2 and all(type(operand) is int for operand in operands[-2:]):
+            evaluations = max(operands[-1] - operands[-2] + 1, 1)
+        program = token.bound[0]
+        seconds = ARRAY_SECONDS if is_elementwise(program) and Calculus.numpy() is not None else OPERATION_SECONDS
+        return None, evaluations * len(program) * seconds
+
+    # modular exponentiation multiplies as many times as the exponent has bits
+    if token.symbol == "powmod" and digits is not None:
+        return digits, sizes[1] / log10(2) * multiply_seconds(sizes[2]) * 2
+
+    return digits, OPERATION_SECONDS * (len(operands) + sum(len(operand) for operand in token.operands if isinstance(operand, Queue)))
+
+def operator_symbols():
+    """Return the symbol of each operator in the registry, keyed by the operator, with fused operators' symbols joined by a space"""
+
+    symbols = {}
+    for symbol, token in registry.tokens().items():
+        for operator in [getattr(token, "unary", None), getattr(token, "binary", None), token]:
+            if isinstance(operator, Operator):
+                symbols[operator] = symbol
+    for fused in registry.fusions():
+        symbols[fused] = "{} {}".format(symbols[fused.first], symbols[fused.second])
+
+    return symbols
+
+# the symbol of each operator, found the first time they're needed by 'split'
+symbols = None
+
+def split(program):
+    """
+    Return the tree of parts of the compiled expression 'program' (see 'Part') as the part that is the whole expression,
+    or 'None' if it can't be split (for example if it has too few operands, which 'execute' gives the error for)
+    """
+
+    global symbols
+    if symbols is None:
+        symbols = operator_symbols()
+
+    stack = []
+    for pos, token in enumerate(program):
+        if isinstance(token, Operator):
+            if len(stack) < token.num_operands:
+                return None
+            operands = stack[-token.num_operands:]
+            del stack[-token.num_operands:]
+            digits, seconds = estimate_operator(symbols.get(token), token, operands)
+            stack.append(Part(operands[0].start, pos + 1, None, digits, seconds + sum(operand.seconds for operand in operands), operands))
+
+        elif isinstance(token, FunctionInstance):
+            digits, seconds = estimate_function(token)
+            stack.append(Part(pos, pos + 1, None, digits, seconds))
+
+        # numbers (and other values)
+        else:
+            digits = len(str(abs(token))) if type(token) is int else None
+            stack.append(Part(pos, pos + 1, token if type(token) in [int, Num] else None, digits, OPERATION_SECONDS))
+
+    return stack[0] if len(stack) == 1 else None
+
+def slow_parts(part):
+    """
+    Return the parts of 'part' that don't depend on each other that are estimated to take long enough to calculate in a worker
+    When only 1 of its operands takes long, the parts of that operand are used so they can be calculated with other parts elsewhere
+    """
+
+    slow = [operand for operand in part.operands if operand.seconds >= PARALLEL_SECONDS]
+    own_seconds = part.seconds - sum(operand.seconds for operand in part.operands)
+    if not slow or own_seconds >= PARALLEL_SECONDS and len(slow) < 2:
+        return [part]
+
+    return [found for operand in slow for found in slow_parts(operand)]
+
+# the pools of worker processes, keyed by the number of workers, kept to be used again as starting them takes a while
+pools = {}
+
+def get_pool(workers):
+    """Return a pool of 'workers' worker processes, starting it the first time it's needed"""
+
+    if workers not in pools:
+        pools[workers] = get_context("spawn").Pool(workers)
+
+    return pools[workers]
+
+def close_pools():
+    """Stop the worker processes"""
+
+    for pool in pools.values():
+        pool.terminate()
+    pools.clear()
+
+# the operator table in each worker process, found the first time it's needed by 'execute_part'
+worker_operators = None
+
+def execute_part(data):
+    """Return the answer of a part of an expression in a worker process, given it stored by 'encode_program', or the error message if it's invalid"""
+
+    global worker_operators
+    if worker_operators is None:
+        worker_operators = operator_table()
+
+    try:
+        return execute(decode_program(data, 0, worker_operators)[0])
+    except CalcError as e:
+        return str(e)
+
+def execute_parallel(program, workers=None):
+    """
+    Execute the compiled expression 'program' like 'execute' in 'Calc.py', calculating the parts that take a long time in worker processes
+    If CalcError is raised, it is due to an invalid expression so needs to be caught and presented as an error message
+
+    :param program (Queue): The tokens in postfix notation, best compiled with 'defer' so functions haven't been executed yet
+    :param workers (int): The number of worker processes. Default: None (the number of CPUs)
+    :return (Num): The answer (or another type of value)
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 2:
+        return execute(program)
+
+    whole = split(program)
+    if whole is None or whole.seconds < PARALLEL_SECONDS:
+        return execute(program)
+
+    # only parts that are always the same and can be stored are sent to workers, the rest are calculated with the whole expression
+    tokens = list(program)
+    parts = []
+    positions = {operator: position for position, operator in enumerate(operator_table())}
+    for part in slow_parts(whole):
+        data = bytearray()
+        part_program = Queue()
+        for token in tokens[part.start:part.end]:
+            part_program.enqueue(token)
+        if all(getattr(token, "pure", True) for token in part_program) and encode_program(part_program, positions, data):
+            parts.append((part, part_program, bytes(data)))
+    if len(parts) < 2:
+        return execute(program)
+
+    # the first part is calculated here while the workers calculate the others
+    pool = get_pool(workers)
+    results = [pool.apply_async(execute_part, (data,)) for _, _, data in parts[1:]]
+    answers = [execute(parts[0][1])] + [result.get() for result in results]
+    for answer in answers:
+        if isinstance(answer, str):
+            raise CalcError(answer)
+
+    # put the answers in place of the parts
+    remaining = Queue()
+    starts = {part.start: (part.end, answer) for (part, _, _), answer in zip(parts, answers)}
+    pos = 0
+    while pos < len(tokens):
+        if pos in starts:
+            pos, answer = starts[pos]
+            remaining.enqueue(answer)
+        else:
+            remaining.enqueue(tokens[pos])
+            pos += 1
+
+    return execute(remaining)
+
+def calculate_parallel(expr, workers=None):
+    """
+    Calculate the answer to 'expr' like 'calculate' in 'Calc.py', calculating the parts that take a long time in worker processes
+    If CalcError is raised, it is due to an invalid expression so needs to be caught and presented as an error message
+
+    :param expr (str): The expression to execute
+    :param workers (int): The number of worker processes. Default: None (the number of CPUs)
+    :return ans (str): The answer to 'expr'
+    """
+
+    return post_calc(execute_parallel(compile_expression(expr, defer=True), workers))
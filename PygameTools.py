@@ -1,136 +1,343 @@
-"""
-Tools for writing pygame windows
-"""
-
-import pygame as pg
-
-COLOURS = {
-    "black":    (0,    0,      0),
-    "white":    (255,  255,    255),
-    "grey":     (200,  200,    200),
-    "red":      (255,  0,      0),
-    "green":    (0,    200,    0),
-    "blue":     (0,    0,      255),
-    "yellow":   (255,  255,    0)
-}
-
-def format_text(text, MAX_CHARS_PER_LINE, MAX_LINES=None, break_anywhere=False):
-    """Format text into lines so they fit on the screen and if it exceeds the maximum number of lines, trail off..."""
-
-    # if we allow breaking the string anywhere, we just treat the string as an array of characters
-    if break_anywhere:
-        words = text
-
-    # otherwise we split the text into an array of words (however we haven't dealt with newlines yet)
-    else:
-        words = text.split(" ")
-
-    # initialise the new 'lines' list and 'current_line' string as empty
-    lines = []
-    current_line = ""
-
-    # for each word in the instructions:
-    word_num = 0
-    while (MAX_LINES is None or len(lines) < MAX_LINES) and len(words) > word_num:
-        word = words[word_num]
-
-        # while there is a newline character in the current word:
-        while "\n" in word:
-
-            # the line is the word before the newline character
-            line = word.split("\n")[0]
-
-            # if it can't fit on the current line, add the current line and it as 2 separate lines
-            if len(line) + len(current_line) > MAX_CHARS_PER_LINE:
-                lines.append(current_line)
-                lines.append(line)
-
-            # if it can fit, add the word (add a space between if we don't allow breaking words anywhere)
-            else:
-                if break_anywhere:
-                    lines.append(current_line + line)
-                else:
-                    lines.append(current_line + " " + line)
-
-            # the current line is empty as after a newline character we always start a new line when there is a newline character
-            current_line = ""
-
-            # then replace the 'word' variable with all characters after the first newline character and continue the loop
-            word = "\n".join(word.split("\n")[1:])
-
-        # if there is enough room to put the word on the current line, add it
-        # otherwise, add it to a new line
-        if len(word) + len(current_line) > MAX_CHARS_PER_LINE:
-            lines.append(current_line)
-            current_line = word
-        else:
-            # only add a space if we don't allow breaking anywhere
-            if break_anywhere:
-                current_line += word
-            else:
-                current_line += " " + word
-
-        word_num += 1
-
-    # if we have run out of room, trail off
-    if MAX_LINES is not None and len(lines) == MAX_LINES:
-        lines[-1] += "..."
-
-    # otherwise, add the last line
-    else:
-        lines.append(current_line)
-
-    return lines
-
-def middle_box(box):
-    """Return the middle position of 'box'"""
-    return box[0] + box[2] // 2, box[1] + box[3] // 2
-
-class Text:
-    """Text object facilitating drawing to the screen and changing the text message"""
-    def __init__(self, text_message, size, colour, center_pos, font, display):
-        self.__font = pg.font.Font(font, round(size))
-        self.__colour = colour
-        self.__center_pos = center_pos
-        self.__display = display
-        self.__surf = self.__font.render(str(text_message), True, colour)
-        self.__rect = self.__surf.get_rect()
-        self.__rect.center = center_pos
-    def draw(self):
-        """Draw the text to the display"""
-        self.__display.blit(self.__surf, self.__rect)
-    def edit_text_message(self, new_text_message):
-        """Edit the text message"""
-        self.__surf = self.__font.render(str(new_text_message), True, self.__colour)
-        self.__rect = self.__surf.get_rect()
-        self.__rect.center = self.__center_pos
-
-class Button:
-    """Button object facilitating drawing it and the text in it to the screen, checking whether a point lies within it and changing the text message on the box"""
-    def __init__(self, box, colour, text, display):
-        self.__box = box
-        self.__colour = colour
-        self.__text = text
-        self.__display = display
-    def draw(self):
-        """Draw the button and text in it to the display"""
-        pg.draw.rect(self.__display, self.__colour, self.__box)
-        self.__text.draw()
-    def is_within(self, mouse_pos):
-        """Return whether or not the mouse is within the button"""
-        return self.__box[0] <= mouse_pos[0] <= self.__box[0] + self.__box[2] and self.__box[1] <= mouse_pos[1] <= self.__box[1] + self.__box[3]
-    def edit_text_message(self, new_text_message):
-        """Edit the text message on the button"""
-        self.__text.edit_text_message(new_text_message)
-
-class Draw:
-    """Drawer object which facilitates creating buttons and text in pygame"""
-    def __init__(self, display, font):
-        self.__display = display
-        self.__font = font
-    def button(self, box, box_colour, text_message, text_size, text_colour):
-        """Create a button"""
-        return Button(box, box_colour, self.text(text_message, text_size, text_colour, middle_box(box)), self.__display)
-    def text(self, text_message, size, colour, center_pos):
-        """Create text"""
-        return Text(text_message, size, colour, center_pos, self.__font, self.__display)
+"""
+Tools for writing pygame windows
+"""
+
+import pygame as pg
+from collections import OrderedDict
+
+COLOURS = {
+    "black":    (0,    0,      0),
+    "white":    (255,  255,    255),
+    "grey":     (200,  200,    200),
+    "red":      (255,  0,      0),
+    "green":    (0,    200,    0),
+    "blue":     (0,    0,      255),
+    "yellow":   (255,  255,    0)
+}
+
+class TextLayout:
+    """
+    Formats text into lines in a single pass, remembering the lines of text it has formatted before
+    and the line breaks of the last text formatted with each width, maximum number of lines and mode
+    so when only the end of the text has changed (such as when typing) only the lines from there are formatted again
+
+    :param max_size (int): The maximum number of formatted texts to keep before discarding the least recently used. Default: 256
+    """
+    def __init__(self, max_size=256):
+        self.__max_size = max_size
+        self.__formatted = OrderedDict()
+
+        # the last text formatted with each (width, maximum number of lines, mode) along with its unfinished
+        # lines and checkpoints - tuples of (position, number of lines, current line) to carry on formatting from
+        self.__last = {}
+    def format(self, text, MAX_CHARS_PER_LINE, MAX_LINES=None, break_anywhere=False):
+        """Return the lines of 'text' the same way as 'format_text', only formatting them if they haven't been formatted before"""
+        key = (text, MAX_CHARS_PER_LINE, MAX_LINES, break_anywhere)
+        if key in self.__formatted:
+            self.__formatted.move_to_end(key)
+        else:
+            self.__formatted[key] = tuple(self.__layout(text, MAX_CHARS_PER_LINE, MAX_LINES, break_anywhere))
+            if len(self.__formatted) > self.__max_size:
+                self.__formatted.popitem(last=False)
+        return list(self.__formatted[key])
+    def __layout(self, text, MAX_CHARS_PER_LINE, MAX_LINES, break_anywhere):
+        """Format 'text' into lines, carrying on from the last checkpoint before it differs from the last text formatted the same way"""
+
+        # find the last checkpoint that is still valid, that is where all of the text before it is the same
+        last_text, lines, checkpoints = self.__last.get((MAX_CHARS_PER_LINE, MAX_LINES, break_anywhere), ("", [], [(0, 0, "")]))
+        same = common_prefix_length(text, last_text)
+        while checkpoints[-1][0] > same:
+            checkpoints.pop()
+        pos, num_lines, current_line = checkpoints[-1]
+        del lines[num_lines:]
+
+        if break_anywhere:
+            current_line = self.__break_anywhere(text, pos, lines, current_line, checkpoints, MAX_CHARS_PER_LINE, MAX_LINES)
+        else:
+            current_line = self.__break_words(text, pos, lines, current_line, checkpoints, MAX_CHARS_PER_LINE, MAX_LINES)
+        self.__last[(MAX_CHARS_PER_LINE, MAX_LINES, break_anywhere)] = (text, lines, checkpoints)
+
+        # if we have run out of room, trail off, otherwise add the last line
+        if MAX_LINES is not None and len(lines) == MAX_LINES:
+            return lines[:-1] + [lines[-1] + "..."]
+        return lines + [current_line]
+    def __break_anywhere(self, text, pos, lines, current_line, checkpoints, MAX_CHARS_PER_LINE, MAX_LINES):
+        """Add the lines of 'text' from 'pos' onwards, filling each line with as many characters as fit, and return the unfinished line"""
+
+        while pos < len(text) and (MAX_LINES is None or len(lines) < MAX_LINES):
+
+            # find the end of the characters before the next newline character
+            end = text.find("\n", pos)
+            if end == -1:
+                end = len(text)
+
+            # if they don't all fit on the current line, fill it and start a new line with the next character
+            room = max(MAX_CHARS_PER_LINE - len(current_line), 0)
+            if end - pos > room:
+                lines.append(current_line + text[pos:pos + room])
+                current_line = text[pos + room]
+                pos += room + 1
+
+            # otherwise add them and start a new line if there is a newline character after them
+            else:
+                current_line += text[pos:end]
+                pos = end
+                if pos == len(text):
+                    break
+                lines.append(current_line)
+                if len(current_line) > MAX_CHARS_PER_LINE:
+                    lines.append("")
+                current_line = ""
+                pos += 1
+
+            checkpoints.append((pos, len(lines), current_line))
+
+        return current_line
+    def __break_words(self, text, pos, lines, current_line, checkpoints, MAX_CHARS_PER_LINE, MAX_LINES):
+        """Add the lines of 'text' from 'pos' onwards, filling each line with as many words as fit, and return the unfinished line"""
+
+        # split the rest of the text into words (between spaces) all at once
+        words = text[pos:].split(" ")
+        for count, word in enumerate(words):
+            if MAX_LINES is not None and len(lines) >= MAX_LINES:
+                break
+            num_lines = len(lines)
+
+            # each newline character in the word ends a line, even if it's a separate line to the one before
+            if "\n" in word:
+                parts = word.split("\n")
+                for line in parts[:-1]:
+                    if len(line) + len(current_line) > MAX_CHARS_PER_LINE:
+                        lines.append(current_line)
+                        lines.append(line)
+                    else:
+                        lines.append(current_line + " " + line)
+                    current_line = ""
+                word = parts[-1]
+
+            # add the rest of the word to the current line if there is enough room, otherwise to a new line
+            if len(word) + len(current_line) > MAX_CHARS_PER_LINE:
+                lines.append(current_line)
+                current_line = word
+            else:
+                current_line += " " + word
+
+            # only words followed by a space are finished so can be carried on from
+            pos += len(words[count]) + 1
+            if len(lines) > num_lines and count < len(words) - 1:
+                checkpoints.append((pos, len(lines), current_line))
+
+        return current_line
+
+def common_prefix_length(text, other):
+    """Return the number of characters at the start of 'text' and 'other' that are the same"""
+
+    # binary search for the length, comparing the strings with slicing rather than character by character
+    low, high = 0, min(len(text), len(other))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if text[:middle] == other[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+
+    return low
+
+# the text layout used by 'format_text', shared by everything that formats text
+TEXT_LAYOUT = TextLayout()
+
+def format_text(text, MAX_CHARS_PER_LINE, MAX_LINES=None, break_anywhere=False):
+    """
+    Format text into lines so they fit on the screen and if it exceeds the maximum number of lines, trail off...
+    Each line fits as many words as possible (separated by spaces) or, if 'break_anywhere', as many characters as possible
+    and a newline character always starts a new line. Formatted text is cached so formatting it again is free
+    """
+    return TEXT_LAYOUT.format(text, MAX_CHARS_PER_LINE, MAX_LINES, break_anywhere)
+
+# fonts loaded from disk, shared by all text objects and keyed by (file, size)
+FONTS = {}
+
+def load_font(font, size):
+    """Return the font in the file 'font' at 'size', only loading it from disk the first time"""
+
+    key = (font, size)
+    if key not in FONTS:
+        FONTS[key] = pg.font.Font(font, size)
+
+    return FONTS[key]
+
+class SurfaceCache:
+    """
+    Least recently used cache of rendered text surfaces keyed by (text, size, colour)
+    so text that has been drawn before doesn't need rendering again
+
+    :param font (str): The file of the font to render text with
+    :param max_size (int): The maximum number of surfaces to keep before discarding the least recently used. Default: 512
+    """
+    def __init__(self, font, max_size=512):
+        self.__font = font
+        self.__max_size = max_size
+        self.__surfaces = OrderedDict()
+    def render(self, text_message, size, colour):
+        """Return a surface with the text message rendered on it"""
+        key = (text_message, size, colour)
+        if key in self.__surfaces:
+            self.__surfaces.move_to_end(key)
+        else:
+            self.__surfaces[key] = load_font(self.__font, size).render(text_message, True, colour)
+            if len(self.__surfaces) > self.__max_size:
+                self.__surfaces.popitem(last=False)
+        return self.__surfaces[key]
+    def __len__(self):
+        return len(self.__surfaces)
+
+def middle_box(box):
+    """Return the middle position of 'box'"""
+    return box[0] + box[2] // 2, box[1] + box[3] // 2
+
+class Text:
+    """Text object facilitating drawing to the screen and changing the text message"""
+    def __init__(self, text_message, size, colour, center_pos, font, display, cache=None):
+        self.__size = round(size)
+        self.__colour = colour
+        self.__center_pos = center_pos
+        self.__display = display
+        self.__cache = cache if cache is not None else SurfaceCache(font, 1)
+        self.edit_text_message(text_message)
+    @property
+    def rect(self):
+        """Return the area of the display the text covers"""
+        return self.__rect
+    def draw(self):
+        """Draw the text to the display"""
+        self.__display.blit(self.__surf, self.__rect)
+    def edit_text_message(self, new_text_message):
+        """Edit the text message"""
+        self.__surf = self.__cache.render(str(new_text_message), self.__size, self.__colour)
+        self.__rect = self.__surf.get_rect()
+        self.__rect.center = self.__center_pos
+
+class Button:
+    """Button object facilitating drawing it and the text in it to the screen, checking whether a point lies within it and changing the text message on the box"""
+    def __init__(self, box, colour, text, display):
+        self.__box = box
+        self.__colour = colour
+        self.__text = text
+        self.__display = display
+    @property
+    def rect(self):
+        """Return the area of the display the button covers"""
+        return pg.Rect(self.__box)
+    def draw(self):
+        """Draw the button and text in it to the display"""
+        pg.draw.rect(self.__display, self.__colour, self.__box)
+        self.__text.draw()
+    def is_within(self, mouse_pos):
+        """Return whether or not the mouse is within the button"""
+        return self.__box[0] <= mouse_pos[0] <= self.__box[0] + self.__box[2] and self.__box[1] <= mouse_pos[1] <= self.__box[1] + self.__box[3]
+    def edit_text_message(self, new_text_message):
+        """Edit the text message on the button"""
+        self.__text.edit_text_message(new_text_message)
+
+class VirtualList:
+    """
+    Scrollable list of rows facilitating drawing only the rows in view, scrolling and checking which row a point lies within
+    Only the rows in view are formatted and drawn so it stays fast however many rows there are
+    The lines of text in each row are cached once formatted until the list is reset
+
+    :param box (tuple): The area of the display the list covers (x, y, width, height)
+    :param row_height (int): The height of each row
+    :param colour (tuple): The colour of each row's box
+    :param text_size (int): The size of the text in the rows
+    :param text_colour (tuple): The colour of the text in the rows
+    :param count_rows (function): Returns the number of rows
+    :param format_row (function): Returns the lines of text in the row with the index it is given (the first row is 0)
+    :param drawer (Draw): The drawer to create the text in the rows with
+    :param display (Surface): The surface to draw to
+    :param max_cached_rows (int): The maximum number of rows to keep the lines of before discarding the least recently used. Default: 256
+    """
+    def __init__(self, box, row_height, colour, text_size, text_colour, count_rows, format_row, drawer, display, max_cached_rows=256):
+        self.__box = pg.Rect(box)
+        self.__row_height = row_height
+        self.__colour = colour
+        self.__text_size = text_size
+        self.__text_colour = text_colour
+        self.__count_rows = count_rows
+        self.__format_row = format_row
+        self.__drawer = drawer
+        self.__display = display
+        self.__max_cached_rows = max_cached_rows
+        self.__rows = OrderedDict()
+        self.__scroll = 0
+    @property
+    def rect(self):
+        """Return the area of the display the list covers"""
+        return self.__box
+    def __lines(self, index):
+        """Return the lines of text in the row with index 'index', only formatting them if they aren't cached"""
+        if index in self.__rows:
+            self.__rows.move_to_end(index)
+        else:
+            self.__rows[index] = self.__format_row(index)
+            if len(self.__rows) > self.__max_cached_rows:
+                self.__rows.popitem(last=False)
+        return self.__rows[index]
+    def __visible_rows(self):
+        """Return the range of indexes of the rows that are at least partly in view"""
+        first = self.__scroll // self.__row_height
+        last = (self.__scroll + self.__box[3] - 1) // self.__row_height
+        return range(first, min(last + 1, self.__count_rows()))
+    def draw(self):
+        """Draw the rows in view to the display"""
+        # only draw within the list's area, keeping within any area already being drawn to
+        clip = self.__display.get_clip()
+        self.__display.set_clip(clip.clip(self.__box))
+        for index in self.__visible_rows():
+            top = self.__box[1] + index * self.__row_height - self.__scroll
+            # leave a gap of 1 pixel between the rows to distinguish them
+            pg.draw.rect(self.__display, self.__colour, (self.__box[0], top, self.__box[2], self.__row_height - 1))
+            lines = self.__lines(index)
+            for count, line in enumerate(lines):
+                self.__drawer.text(line, self.__text_size, self.__text_colour, (self.__box[0] + self.__box[2] // 2, top + self.__row_height * (count + 1) // (len(lines) + 1))).draw()
+        # draw a scroll bar if there are more rows than fit
+        content_height = self.__count_rows() * self.__row_height
+        if content_height > self.__box[3]:
+            bar_height = max(self.__box[3] * self.__box[3] // content_height, 10)
+            bar_top = self.__box[1] + (self.__box[3] - bar_height) * self.__scroll // (content_height - self.__box[3])
+            pg.draw.rect(self.__display, self.__text_colour, (self.__box[0] + self.__box[2] - 4, bar_top, 4, bar_height))
+        self.__display.set_clip(clip)
+    def scroll(self, pixels):
+        """Scroll the list down by 'pixels' (up if negative) but not past either end. Return whether or not it moved"""
+        old_scroll = self.__scroll
+        self.__scroll = max(0, min(self.__scroll + pixels, self.__count_rows() * self.__row_height - self.__box[3]))
+        return self.__scroll != old_scroll
+    def row_at(self, mouse_pos):
+        """Return the index of the row the mouse is within or 'None' if it isn't within one"""
+        if not self.__box.collidepoint(mouse_pos):
+            return None
+        index = (mouse_pos[1] - self.__box[1] + self.__scroll) // self.__row_height
+        return index if index < self.__count_rows() else None
+    def reset(self):
+        """Forget the formatted rows, as the rows have changed, and scroll back to the top"""
+        self.__rows.clear()
+        self.__scroll = 0
+
+class Draw:
+    """Drawer object which facilitates creating buttons and text in pygame"""
+    def __init__(self, display, font, cache=None):
+        self.__display = display
+        self.__font = font
+        self.__cache = cache if cache is not None else SurfaceCache(font)
+    @property
+    def cache(self):
+        """Return the cache of rendered text surfaces so other drawers can share it"""
+        return self.__cache
+    def button(self, box, box_colour, text_message, text_size, text_colour):
+        """Create a button"""
+        return Button(box, box_colour, self.text(text_message, text_size, text_colour, middle_box(box)), self.__display)
+    def virtual_list(self, box, row_height, colour, text_size, text_colour, count_rows, format_row):
+        """Create a scrollable list that only formats and draws the rows in view"""
+        return VirtualList(box, row_height, colour, text_size, text_colour, count_rows, format_row, self, self.__display)
+    def text(self, text_message, size, colour, center_pos):
+        """Create text"""
+        return Text(text_message, size, colour, center_pos, self.__font, self.__display, self.__cache)
@@ -0,0 +1,333 @@
+"""
+Contains the registry of the operators, functions and constants that can be used in the calculator
+
+Operations are added to the registry in packs. A pack is a module with a 'register' function that adds its operations
+to the registry it is given with the 'add_unary_operator', 'add_binary_operator', 'add_function' and 'add_constant' methods.
+Packs are declared with the symbols they provide using the 'add_pack' method, like entry points, and are only imported
+the first time one of their symbols is looked up, so processes only pay for importing the packs they use
+
+To add a pack of operations:
+1) write a module with the functions to execute the operations and a 'register(registry)' function that adds them
+2) declare it with 'registry.add_pack(module_name, symbols)' - the built-in packs are declared at the bottom of this file
+3) explain how to use the operations in 'Instructions.txt'
+
+Each operation is either pure (always gives the same answer for the same operands, so the answer can be cached or
+worked out in advance) or not (like 'rand') and may have implementations for other types of number (backends) as well as 'Num'
+Packs can add other types of value (such as arrays) with the 'add_value_type' method and the functions to execute existing
+operations with them with the 'add_backend' method. Packs that need modules that aren't installed give an error message when used
+Packs can also add bindings with the 'add_binding' method - functions that are given an expression with a variable bound in it
+to evaluate many times, such as 'integrate(x^2, x, 0, 1)', which are declared with 'add_pack' separately from the other symbols
+Functions can be lazy, given their operands to evaluate only if they need them, such as 'if' which only calculates the branch it chooses
+Packs can also fuse 2 of their binary operators with the 'add_fusion' method so compiled expressions calculate them together,
+such as '^' then '%' with modular exponentiation rather than calculating the whole power first
+"""
+
+from importlib import import_module
+from decimal import getcontext
+from Datatypes import UnaryOperator, BinaryOperator, BothOperators, FusedOperator, FunctionType, Num, ValueType, value_types
+from Errors import CalcError
+
+GUARD_DIGITS = 8    # the extra significant figures constants are calculated to beyond the precision of calculations
+
+class Registry:
+    """
+    Stores the tokens that can be used in the calculator, importing the packs that provide them when they are first looked up
+    The key is the symbol that will be in expressions and the value is an instance of one of the following classes:
+    UnaryOperator, BinaryOperator, BothOperators, FunctionType or Num
+    """
+
+    def __init__(self):
+
+        # private attributes
+        self.__tokens = {}
+        self.__packs = {}
+        self.__bindings = {}
+        self.__binding_packs = {}
+        self.__fusions = {}
+        self.__fused = set()        # the operators executed first in fusions
+        self.__constants = {}
+        self.__loaded_packs = set()
+
+    def add_pack(self, module_name, symbols, bindings=()):
+        """
+        Declare a pack of operations which will be imported the first time one of its symbols is looked up
+
+        :param module_name (str): The name of the module with a 'register' function to add the operations to a registry
+        :param symbols (list): The symbols the pack provides
+        :param bindings (list): The symbols the pack provides bindings for (see 'add_binding'). Default: ()
+        """
+
+        for symbol in symbols:
+            self.__packs[symbol] = module_name
+        for symbol in bindings:
+            self.__binding_packs[symbol] = module_name
+
+    def load_pack(self, module_name):
+        """Import the pack 'module_name' and add its operations unless it has already been loaded"""
+
+        if module_name not in self.__loaded_packs:
+
+            # packs can need modules that aren't installed, which is an error in the expression rather than the code
+            try:
+                module = import_module(module_name)
+            except ImportError as e:
+                raise CalcError("'{}' needs '{}' to be installed".format(module_name, e.name))
+
+            self.__loaded_packs.add(module_name)
+            module.register(self)
+
+    def loaded_packs(self):
+        """Return the names of the packs that have been loaded"""
+        return sorted(self.__loaded_packs)
+
+    def add_unary_operator(self, symbol, name, func, is_left_associative, pure=True, backends=None, elementwise=False):
+        """
+        Add a unary operator, making the symbol both operators if it is already a binary operator
+
+        :param symbol (str): The symbol that will be in expressions
+        :param name (str): The name of the operator
+        :param func (function): The function to execute the operation on 'Num's
+        :param is_left_associative (bool): Whether or not the operand is on the left side of the operator (alternative is on the right)
+        :param pure (bool): Whether or not the operator always gives the same answer for the same operand. Default: True
+        :param backends (dict): The functions to execute the operation on other types of number, keyed by the name of the type. Default: None
+        :param elementwise (bool): Whether or not the operator works on each number in arrays separately. Default: False
+        """
+
+        self.__add_operator(symbol, UnaryOperator(name, func, is_left_associative, pure, backends, elementwise))
+
+    def add_binary_operator(self, symbol, name, func, precedence, is_left_associative, pure=True, backends=None, elementwise=False, commutative=False):
+        """
+        Add a binary operator, making the symbol both operators if it is already a unary operator
+
+        :param symbol (str): The symbol that will be in expressions
+        :param name (str): The name of the operator
+        :param func (function): The function to execute the operation on 'Num's
+        :param precedence (int/float): The precedence of the operation compared to other operations. Lower numbers means executed first
+        :param is_left_associative (bool): Whether or not the operator is left (-to-right) associative (alternative is right (-to-left) associative)
+        :param pure (bool): Whether or not the operator always gives the same answer for the same operands. Default: True
+        :param backends (dict): The functions to execute the operation on other types of number, keyed by the name of the type. Default: None
+        :param elementwise (bool): Whether or not the operator works on each number in arrays separately. Default: False
+        :param commutative (bool): Whether or not swapping the operands always gives exactly the same answer (like '+' but not '-'). Default: False
+        """
+
+        self.__add_operator(symbol, BinaryOperator(name, func, precedence, is_left_associative, pure, backends, elementwise, commutative))
+
+    def __add_operator(self, symbol, operator):
+        """Add 'operator' with the symbol 'symbol', combining it with an existing operator that takes a different number of operands"""
+
+        # if the symbol is already both operators, replace the one that takes the same number of operands
+        existing = self.__tokens.get(symbol)
+        if isinstance(existing, BothOperators):
+            existing = existing.binary if operator.is_unary else existing.unary
+        if existing is not None and existing.is_unary != operator.is_unary:
+            self.__tokens[symbol] = BothOperators(operator, existing) if operator.is_unary else BothOperators(existing, operator)
+        else:
+            self.__tokens[symbol] = operator
+
+    def add_function(self, symbol, name, func, num_operands, pure=True, backends=None, elementwise=False, lazy=False):
+        """
+        Add a function
+
+        :param symbol (str): The symbol that will be in expressions
+        :param name (str): The name of the function
+        :param func (function): The function to execute the operation on 'Num's
+        :param num_operands (int): The number of operands the function takes. 'None' means any number (at least 1), in which case
+                                   'func' is given an iterator of the values rather than separate operands
+        :param pure (bool): Whether or not the function always gives the same answer for the same operands. Default: True
+        :param backends (dict): The functions to execute the operation on other types of number, keyed by the name of the type. Default: None
+        :param elementwise (bool): Whether or not the function works on each number in arrays separately (like 'sin' but not 'sum'),
+                                   so expressions using it can be evaluated at many values at once. Default: False
+        :param lazy (bool): Whether or not 'func' is given each operand as a 'Branch' - a function to call to evaluate it - rather than its value,
+                            so operands the function doesn't need (such as the branch 'if' doesn't choose) aren't calculated. Default: False
+        """
+
+        self.__tokens[symbol] = FunctionType(name, func, num_operands, pure, backends, elementwise, lazy)
+
+    def add_binding(self, symbol, name, func, num_operands, pure=True):
+        """
+        Add a binding - a function used instead of the function with the same symbol when it's given an expression and the name
+        of a variable as its first 2 operands, such as 'integrate(x^2, x, 0, 1)'. The variable is bound in the expression
+        The symbol doesn't need to be a function as well, in which case it can only be used with a variable
+
+        :param symbol (str): The symbol that will be in expressions
+        :param name (str): The name of the function
+        :param func (function): The function to execute the operation, given the expression as a 'BoundExpression' followed by the other operands
+        :param num_operands (int): The number of operands, including the expression and the name of the variable
+        :param pure (bool): Whether or not the function always gives the same answer for the same expression and operands. Default: True
+        """
+
+        self.__bindings[symbol] = FunctionType(name, func, num_operands, pure)
+
+    def lookup_binding(self, symbol):
+        """Return the binding with the symbol 'symbol' as a 'FunctionType', loading the pack that provides it if needed, or 'None' if there isn't one"""
+
+        binding = self.__bindings.get(symbol)
+        if binding is None and symbol in self.__binding_packs:
+            self.load_pack(self.__binding_packs[symbol])
+            binding = self.__bindings.get(symbol)
+
+        return binding
+
+    def add_fusion(self, first, second, name, func):
+        """
+        Add an operation that compiled expressions use instead of the binary operator 'first' when its answer is the left operand of
+        the binary operator 'second', such as 'x ^ y % m'. It is only used when all of the operands are whole numbers stored as 'int's,
+        otherwise the operators are executed in turn as normal, so it must give the same answer as them
+
+        :param first (str): The symbol of the operator executed first
+        :param second (str): The symbol of the operator executed with the answer of the first as its left operand
+        :param name (str): The name of the operation
+        :param func (function): The function to execute the operation, given the first operator's operands and the second operator's right operand
+        """
+
+        first, second = [token.binary if isinstance(token, BothOperators) else token for token in [self.lookup(first), self.lookup(second)]]
+        self.__fusions[(first, second)] = FusedOperator(name, func, first, second)
+        self.__fused.add(first)
+
+    def lookup_fusion(self, first, second):
+        """Return the 'FusedOperator' to use instead of the operator 'first' followed by the operator 'second' or 'None' if there isn't one"""
+        return self.__fusions.get((first, second))
+
+    def fuses(self, operator):
+        """Return whether or not the binary operator 'operator' is executed first in any fusion (of the packs loaded so far)"""
+        return operator in self.__fused
+
+    def fusions(self):
+        """Return every 'FusedOperator', loading every pack that can be loaded"""
+
+        self.__load_all()
+        return list(self.__fusions.values())
+
+    def add_constant(self, symbol, value):
+        """
+        Add a constant
+
+        :param symbol (str): The symbol that will be in expressions
+        :param value (str/function): The value of the constant, or for constants that can be calculated to any precision (such as
+                                     'pi' in 'Constants.py'), a function that is given a number of significant figures and returns
+                                     the value to that many. It is given a few more than the precision of calculations (the 'decimal'
+                                     context's) whenever it's looked up so raising the precision makes the constant more accurate
+        """
+
+        if callable(value):
+            self.__constants[symbol] = value
+        else:
+            self.__tokens[symbol] = Num(value)
+
+    def add_value_type(self, value_class, backend, format):
+        """
+        Add a type of value other than 'Num' that can be used in the calculator
+
+        :param value_class (type): The class of the values
+        :param backend (str): The key of the functions in operators' and functions' backends that execute them with values of this type
+        :param format (function): Return a value of this type as a string answer, given the value and the function to format numbers with
+        """
+
+        value_types[value_class] = ValueType(backend, format)
+
+    def add_backend(self, symbol, backend, func, is_unary=False):
+        """
+        Add a function to execute an existing operator or function with another type of value, loading the pack that provides it if needed
+
+        :param symbol (str): The symbol of the operator or function
+        :param backend (str): The name of the backend - the 'backend' of the type of value
+        :param func (function): The function to execute the operation with values of that type
+        :param is_unary (bool): If the symbol is both operators, whether to add it to the unary operator rather than the binary one. Default: False
+        """
+
+        token = self.lookup(symbol)
+        if isinstance(token, BothOperators):
+            token = token.unary if is_unary else token.binary
+        token.backends[backend] = func
+
+    def lookup(self, symbol):
+        """Return the token with the symbol 'symbol', loading the pack that provides it if needed, or 'None' if there isn't one"""
+
+        token = self.__tokens.get(symbol)
+        if token is None and symbol in self.__packs:
+            self.load_pack(self.__packs[symbol])
+            token = self.__tokens.get(symbol)
+
+        # constants calculated to the precision of calculations
+        if token is None and symbol in self.__constants:
+            token = self.__constants[symbol](getcontext().prec + GUARD_DIGITS)
+
+        return token
+
+    def is_pure(self, symbol):
+        """Return whether or not the token with the symbol 'symbol' always gives the same answer for the same operands"""
+
+        token = self.lookup(symbol)
+        if isinstance(token, BothOperators):
+            return token.unary.pure and token.binary.pure
+
+        # constants are always pure
+        return getattr(token, "pure", True)
+
+    def __load_all(self):
+        """Load every pack that can be loaded, returning the names of those that can't because they need modules that aren't installed"""
+
+        unavailable = []
+        for module_name in sorted(set(self.__packs.values()) | set(self.__binding_packs.values())):
+            try:
+                self.load_pack(module_name)
+            except CalcError:
+                unavailable.append(module_name)
+
+        return unavailable
+
+    def tokens(self):
+        """Return a dictionary of all of the tokens, loading every pack that can be loaded"""
+
+        self.__load_all()
+        tokens = dict(self.__tokens)
+        for symbol in self.__constants:
+            tokens[symbol] = self.lookup(symbol)
+
+        return tokens
+
+    def signature(self):
+        """
+        Return a hash of every operation in the registry and how it's used in expressions, loading every pack, which changes
+        whenever they do so anything stored that depends on them (such as compiled expressions) can tell when it's out of date
+        Packs that can't be loaded because they need modules that aren't installed are only included by their name
+        """
+
+        parts = ["unavailable {}".format(module_name) for module_name in self.__load_all()]
+
+        # constants calculated to any precision are only included by their symbol as their value depends on the precision
+        parts += ["{} {}".format(symbol, describe(token)) for symbol, token in sorted(self.__tokens.items())]
+        parts += ["binding {} {}".format(symbol, describe(token)) for symbol, token in sorted(self.__bindings.items())]
+        parts += sorted("fusion {} {}".format(describe(first), describe(fused)) for (first, second), fused in self.__fusions.items())
+        parts += sorted("constant {}".format(symbol) for symbol in self.__constants)
+
+        # only imported when needed as it's slow to import
+        from hashlib import sha256
+        return sha256("\n".join(parts).encode()).hexdigest()
+
+    def __contains__(self, symbol):
+        return self.lookup(symbol) is not None or self.lookup_binding(symbol) is not None
+
+    def __repr__(self):
+        return "Registry({})".format(", ".join(self.loaded_packs()))
+
+def describe(token):
+    """Return a description of the token 'token' from the registry, with everything about it that affects compiled expressions"""
+
+    if isinstance(token, BothOperators):
+        return "{} {}".format(describe(token.unary), describe(token.binary))
+    if isinstance(token, Num):
+        return "Num {}".format(token)
+
+    fields = [type(token).__name__] + [str(getattr(token, attr, None)) for attr in ["name", "precedence", "is_left_associative", "num_operands", "pure", "elementwise", "commutative", "lazy"]]
+    return " ".join(fields + sorted(getattr(token, "backends", {})))
+
+# the registry the calculator uses, with the built-in packs
+registry = Registry()
+registry.add_pack("Operations", ["+", "-", "*", "/", "\\", "%", "^", "¬", "p", "c", "!", "ln", "log", "abs", "lcm", "hcf", "rand", "powmod", "modinv", "crt", "isqrt", "quadp", "quadn", "pi", "tau", "e", "g", "phi"])
+registry.add_pack("Aggregates", ["sum", "prod", "mean", "min", "max", "var", "stdev", "median"])
+registry.add_pack("Conditions", ["<", "<=", ">", ">=", "=", "<>", "if", "piecewise"])
+registry.add_pack("Trigonometry", ["sin", "cos", "tan", "arsin", "arcos", "artan", "sinh", "cosh", "tanh", "arsinh", "arcosh", "artanh"])
+registry.add_pack("Matrices", ["[", "dot", "det", "inv", "solve", "reshape"])
+registry.add_pack("Calculus", [], bindings=["solve", "integrate", "sum", "prod"])
+registry.add_pack("Derivatives", [], bindings=["diff"])
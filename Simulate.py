@@ -0,0 +1,321 @@
+"""
+Contains the code for Monte Carlo simulation - calculating an expression that uses 'rand' many times to find out how its answers are spread
+The expression is compiled once and calculated in chunks, each with its own random number generator seeded from the seed and the number
+of the chunk, so the same seed always gives the same answers however many worker processes share the chunks. If NumPy is installed and
+every operation in the expression works on arrays, a whole chunk is calculated at once with 'rand' giving an array of random numbers
+Only a summary of the answers is kept - their number, mean, variance, smallest and largest and a KLL sketch to estimate quantiles -
+which can be merged with the summaries of other chunks, so any number of answers only uses a small amount of memory
+
+Use the 'simulate' function from code, or run 'Calc.py' with '--simulate', for example 'python Calc.py "rand(1, 6) + rand(1, 6)" --simulate 1000000'
+"""
+
+from Calc import compile_expression, evaluate, format_number
+from Datatypes import is_elementwise, is_number
+from Errors import CalcError
+from math import ceil, fsum, inf
+from random import Random, SystemRandom
+from multiprocessing import get_context
+import Calculus
+import Datatypes
+import Operations
+
+CHUNK_SIZE = 10000      # the most answers calculated at once, with the same random number generator
+SKETCH_SIZE = 200       # the number of values kept by the biggest compactor of a sketch - bigger is more accurate but slower
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]   # the quantiles shown in summaries
+
+class Sketch:
+    """
+    A KLL sketch, which estimates the quantiles of many values while only keeping a few of them
+    The values are kept in compactors - the values in each one count twice as much as those in the one before. When a compactor is full,
+    it's sorted and every other value is moved up to the next one (starting from the first or second at random), so half of them are kept
+    The compactors get smaller by a factor of 2/3 from the biggest down so the error in the estimated ranks is about 1 / 'size' of the number of values
+
+    :param size (int): The number of values kept by the biggest compactor. Default: 'SKETCH_SIZE'
+    :param seed (object): The seed of the random number generator that decides which values are kept. Default: None
+    """
+
+    def __init__(self, size=SKETCH_SIZE, seed=None):
+
+        # private attributes
+        self.__size = size
+        self.__random = Random(seed)
+        self.__compactors = [[]]
+        self.__num_kept = 0
+        self.__max_kept = self.__capacity(0)
+
+    def __capacity(self, level):
+        """Return the number of values the compactor 'level' can hold before being compacted"""
+        return int(ceil(self.__size * (2 / 3) ** (len(self.__compactors) - level - 1))) + 1
+
+    def __grow(self):
+        """Add another compactor above the others, which makes the others smaller"""
+
+        self.__compactors.append([])
+        self.__max_kept = sum(self.__capacity(level) for level in range(len(self.__compactors)))
+
+    def __compress(self):
+        """Compact compactors until there are few enough values kept"""
+
+        while self.__num_kept >= self.__max_kept:
+            for level, compactor in enumerate(self.__compactors):
+                if len(compactor) >= self.__capacity(level):
+                    if level + 1 == len(self.__compactors):
+                        self.__grow()
+
+                    # keep every other value (an odd one out stays in this compactor)
+                    compactor.sort()
+                    leftover = [compactor.pop()] if len(compactor) % 2 else []
+                    self.__compactors[level + 1].extend(compactor[self.__random.randrange(2)::2])
+                    compactor[:] = leftover
+                    break
+
+            self.__num_kept = sum(len(compactor) for compactor in self.__compactors)
+
+    def update(self, values):
+        """Add the values in the list 'values' to the sketch"""
+
+        self.__compactors[0].extend(values)
+        self.__num_kept += len(values)
+        self.__compress()
+
+    def merge(self, other):
+        """Add the values summarised by the sketch 'other' to this one"""
+
+        while len(self.__compactors) < len(other.__compactors):
+            self.__grow()
+        for compactor, other_compactor in zip(self.__compactors, other.__compactors):
+            compactor.extend(other_compactor)
+
+        self.__num_kept = sum(len(compactor) for compactor in self.__compactors)
+        self.__compress()
+
+    def quantile(self, q):
+        """Return an estimate of the value that a fraction 'q' (between 0 and 1) of the values are less than or equal to"""
+
+        # each value stands for 2 to the power of its compactor's level values
+        weighted = sorted((value, 2 ** level) for level, compactor in enumerate(self.__compactors) for value in compactor)
+        if not weighted:
+            raise CalcError("There are no values to find the quantiles of")
+
+        target = q * sum(weight for _, weight in weighted)
+        rank = 0
+        for value, weight in weighted:
+            rank += weight
+            if rank >= target:
+                return value
+
+        return weighted[-1][0]
+
+    def __repr__(self):
+        return "Sketch({})".format(", ".join(str(len(compactor)) for compactor in self.__compactors))
+
+class Summary:
+    """
+    A summary of the answers of a simulation, which can be merged with others
+    The mean and variance are combined with Chan's parallel version of Welford's algorithm so they don't lose accuracy
+
+    :param seed (int): The seed of the simulation. Default: None
+    :param chunk (int): The number of the chunk it summarises, which seeds its sketch's random number generator with 'seed'. Default: None
+    """
+
+    def __init__(self, seed=None, chunk=None):
+        self.seed = seed
+        self.count = 0
+        self.mean = 0.0
+        self.sum_of_squares = 0.0   # the sum of the squares of the differences from the mean
+        self.smallest = inf
+        self.largest = -inf
+        self.sketch = Sketch(seed="{}:{}".format(seed, chunk))
+
+    def __combine(self, count, mean, sum_of_squares, smallest, largest):
+        """Add the number, mean, sum of squared differences from the mean, smallest and largest of other answers to the summary"""
+
+        total = self.count + count
+        if total == 0:
+            return
+
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.sum_of_squares += sum_of_squares + delta * delta * self.count * count / total
+        self.count = total
+        self.smallest = min(self.smallest, smallest)
+        self.largest = max(self.largest, largest)
+
+    def update(self, values):
+        """Add the answers in the list 'values' (of floats) to the summary"""
+
+        if values:
+            mean = fsum(values) / len(values)
+            self.__combine(len(values), mean, fsum((value - mean) ** 2 for value in values), min(values), max(values))
+            self.sketch.update(values)
+
+    def merge(self, other):
+        """Add the answers summarised by 'other' to this summary"""
+
+        self.__combine(other.count, other.mean, other.sum_of_squares, other.smallest, other.largest)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self):
+        """Return the (sample) variance of the answers"""
+
+        if self.count < 2:
+            raise CalcError("There must be at least 2 answers to find the variance")
+
+        return self.sum_of_squares / (self.count - 1)
+
+    @property
+    def stdev(self):
+        """Return the (sample) standard deviation of the answers"""
+        return self.variance ** 0.5
+
+    def quantile(self, q):
+        """Return an estimate of the answer that a fraction 'q' (between 0 and 1) of the answers are less than or equal to"""
+        return self.sketch.quantile(q)
+
+    def __str__(self):
+
+        lines = [
+            "Answers: {}".format(self.count),
+            "Mean: {}".format(format_number(self.mean)),
+            "Variance: {}".format(format_number(self.variance) if self.count > 1 else "-"),
+            "Standard deviation: {}".format(format_number(self.stdev) if self.count > 1 else "-"),
+            "Smallest: {}".format(format_number(self.smallest)),
+            "Largest: {}".format(format_number(self.largest))
+        ]
+        lines += ["{}% quantile: {}".format(format_number(q * 100), format_number(self.quantile(q))) for q in QUANTILES]
+        lines.append("Seed: {}".format(self.seed))
+
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return "Summary({} answers)".format(self.count)
+
+class ArrayGenerator:
+    """
+    A random number generator that gives an array of random numbers each time, used by 'rand' to calculate a whole chunk at once
+
+    :param generator (numpy.random.Generator): NumPy's random number generator
+    :param size (int): The number of random numbers in each array
+    """
+
+    def __init__(self, generator, size):
+        self.__generator = generator
+        self.__size = size
+
+    def randint(self, low, high):
+        """Return an array of random whole numbers between 'low' and 'high' inclusive (as floats so they can be used with any operation)"""
+        return self.__generator.integers(low, high + 1, self.__size).astype(float)
+
+def simulate_chunk(program, seed, chunk, size):
+    """
+    Return the summary of the answers of the chunk numbered 'chunk' of a simulation
+
+    :param program (Queue): The compiled expression
+    :param seed (int): The seed of the simulation
+    :param chunk (int): The number of the chunk, which seeds its random number generator with 'seed'
+    :param size (int): The number of answers in the chunk
+    :return (Summary): The summary of its answers
+    """
+
+    summary = Summary(seed, chunk)
+
+    # calculate the whole chunk at once if possible
+    np = Calculus.numpy() if is_elementwise(program) and size > 1 else None
+    if np is not None:
+        Operations.generator = ArrayGenerator(np.random.default_rng([seed, chunk]), size)
+        try:
+            values = Calculus.evaluate_array(np, lambda _: evaluate(program, round_answer=False), np.empty(size))
+        finally:
+            Operations.generator = None
+        if values is not None:
+            summary.update(values.tolist())
+            return summary
+
+    # otherwise calculate each answer in turn with the calculator's numbers
+    Operations.generator = Random("{}:{}".format(seed, chunk))
+    try:
+        values = [evaluate(program, round_answer=False) for _ in range(size)]
+    finally:
+        Operations.generator = None
+    if not all(is_number(value) for value in values):
+        raise CalcError("The expression must give a number")
+    summary.update([float(value) for value in values])
+
+    return summary
+
+# the compiled expression in each worker process, compiled once by 'start_worker'
+worker_program = None
+
+def start_worker(expr, sources, files_directory):
+    """
+    Compile the expression being simulated in a worker process, with the definitions 'sources',
+    allowing files of numbers to be read from 'files_directory' the same as in the process simulating it
+    """
+
+    global worker_program
+    Datatypes.number_files_directory = files_directory
+
+    from Definitions import Definitions
+    definitions = Definitions()
+    for source in sources:
+        definitions.record(source)
+
+    worker_program = compile_expression(expr, definitions.scope())
+
+def simulate_worker_chunk(args):
+    """Return the summary of a chunk simulated in a worker process, or the error message if the expression is invalid"""
+
+    try:
+        return simulate_chunk(worker_program, *args)
+    except CalcError as e:
+        return str(e)
+
+def simulate(expr, n, seed=None, workers=1, definitions=None, progress=None):
+    """
+    Calculate the expression 'expr' 'n' times and return a summary of the answers
+    If CalcError is raised, it is due to an invalid expression or an answer that can't be calculated so needs to be caught and presented as an error message
+
+    :param expr (str): The expression, which uses 'rand' to give different answers each time
+    :param n (int): The number of times to calculate it
+    :param seed (int): The seed of the random number generators, 0 or more - the same seed always gives the same summary. Default: None (a random seed)
+    :param workers (int): The number of processes to calculate it in. Default: 1 (this process)
+    :param definitions (Definitions): The variables and functions defined by the user that the expression can use. Default: None
+    :param progress (function): Called with the summary of the answers so far after each chunk, such as to show progress. Default: None
+    :return (Summary): The summary of the answers
+    """
+
+    if n < 1:
+        raise CalcError("There must be at least 1 answer")
+    if workers < 1:
+        raise CalcError("There must be at least 1 worker")
+    if seed is None:
+        seed = SystemRandom().getrandbits(32)
+    if type(seed) is not int or seed < 0:
+        raise CalcError("The seed must be a whole number that is 0 or more")
+
+    # each chunk has its own random number generator so can be calculated anywhere
+    chunks = [(seed, chunk, min(CHUNK_SIZE, n - chunk * CHUNK_SIZE)) for chunk in range(ceil(n / CHUNK_SIZE))]
+    sources = definitions.sources() if definitions is not None else []
+    summary = Summary(seed)
+
+    if workers == 1 or len(chunks) == 1:
+        program = compile_expression(expr, definitions.scope() if definitions is not None else None)
+        for args in chunks:
+            summary.merge(simulate_chunk(program, *args))
+            if progress is not None:
+                progress(summary)
+
+        return summary
+
+    # the expression is compiled in each worker process. The chunks' summaries are merged in order so they're the same however many workers there are
+    compile_expression(expr, definitions.scope() if definitions is not None else None)
+    with get_context("spawn").Pool(min(workers, len(chunks)), start_worker, (expr, sources, Datatypes.number_files_directory)) as pool:
+        for result in pool.imap(simulate_worker_chunk, chunks):
+            if isinstance(result, str):
+                raise CalcError(result)
+            summary.merge(result)
+            if progress is not None:
+                progress(summary)
+
+    return summary
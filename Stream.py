@@ -0,0 +1,742 @@
+"""
+Contains the code for calculating very big expressions, such as machine-generated ones of many megabytes with brackets and functions
+nested thousands deep, using a small amount of memory and without recursion
+
+The expression is read from a file object (or a memory-mapped file) a chunk at a time and each token is converted to postfix notation by
+the shunting yard algorithm and executed as soon as it is output, so rather than every token, only the stacks are kept - the operators
+waiting to be executed, the values waiting to be used and the frames of the functions whose operands are being calculated. Functions don't
+compile each operand separately (which recurses for each level of nesting) but calculate them on the same stacks, with their frame marking
+where their operands start. The answers of binary operators that the registry fuses with others are only calculated when they are used so
+fused operators (such as 'x ^ y % m') are still calculated together
+
+Functions that can bind a variable in an expression (such as 'sum(1/i, i, 1, 100)') only do if their second operand is the name of the
+variable, so their tokens are recorded until it's calculated and if it couldn't be, the outermost one being recorded is read whole from the
+recording and compiled as normal (failing straight away if it has functions nested too deep to compile). Functions that can only be used with a variable bound (such as 'integrate') are always read whole. Lazy functions (such as 'if')
+have all of their operands calculated but errors in them are only raised if the function needs that operand, so the rest of the operand
+is skipped once one is raised
+
+Use the 'calculate_stream' function with a file object or the 'calculate_file' function with a path from code,
+or run 'Calc.py' with '--file', for example 'python Calc.py --file expression.txt'
+"""
+
+from Calc import identify, should_be_executed_first, compile_expression, execute, post_calc, round_value
+from Datatypes import Operator, OpenBracket, CloseBracket, FunctionInstance, Variable, NumberFile, Branch, get_regex, as_value, is_number
+from Registry import registry
+from Errors import CalcError
+from decimal import DecimalException, Overflow, InvalidOperation
+from codecs import getincrementaldecoder
+from sys import getrecursionlimit
+from mmap import mmap, ACCESS_READ
+import os
+import re
+
+CHUNK_SIZE = 1 << 16        # the number of characters (or bytes) read at once
+RECORD_LIMIT = 10000        # the most tokens recorded for functions that could bind a variable before the outermost are assumed not to
+NUMBER_CHARACTERS = "0123456789.~+-"                 # the characters that numbers are made of
+NUMBER_PREFIX = re.compile(r"\d*\.?\d*(~[+-]?\d*)?")    # text that could be the start of a number
+
+class RunError(CalcError):
+    """Errors raised while executing operators and functions, rather than in how the expression is written, which lazy functions only raise if they need the operand"""
+    pass
+
+class Frame:
+    """
+    A function whose operands are being calculated, kept on the operator stack to mark where its operands start
+
+    :param function (FunctionInstance): The function
+    :param close (str): The bracket that ends its operands - ')', or ']' for arrays
+    :param base (int): The number of values on the value stack before its first operand
+    :param depth (int): The number of brackets open, including its own
+    """
+
+    def __init__(self, function, close, base, depth):
+        self.function = function
+        self.close = close
+        self.base = base
+        self.depth = depth
+        self.done = 0   # the number of operands calculated so far
+
+    def __repr__(self):
+        return "Frame({})".format(self.function)
+
+class Pending:
+    """
+    The answer of a binary operator that hasn't been calculated yet, so it can be fused with the operator that uses it (see 'add_fusion' in 'Registry.py')
+
+    :param operator (Operator): The operator
+    :param operands (list): Its operands
+    """
+
+    def __init__(self, operator, operands):
+        self.operator = operator
+        self.operands = operands
+
+    def value(self):
+        """Return the answer"""
+        return run(self.operator, self.operands)
+
+    def __repr__(self):
+        return "Pending({})".format(self.operator)
+
+class Failed(Branch):
+    """
+    An operand of a lazy function that raised an error while it was calculated, which raises it again if the function needs it
+
+    :param error (RunError): The error
+    """
+
+    def __init__(self, error):
+        super().__init__(None, None)
+        self.error = error
+
+    def __call__(self):
+        raise self.error
+
+    def __repr__(self):
+        return "Failed({})".format(self.error)
+
+def run(token, operands=None):
+    """
+    Return the answer when an operator is executed with 'operands', or a function with its own operands if 'operands' is 'None',
+    converting errors raised by the 'decimal' library to my format the same as 'execute' in 'Calc.py'
+    """
+
+    try:
+        return as_value(token.execute() if operands is None else token.execute(operands))
+    except InvalidOperation:
+        raise RunError("Invalid operation")
+    except Overflow:
+        raise RunError("Number too big")
+    except DecimalException as e:
+        raise RunError("Error: " + str(e).split("decimal.")[1].split("'>]")[0])
+    except RunError:
+        raise
+    except CalcError as e:
+        raise RunError(str(e))
+
+def round_operand(value):
+    """Return the operand of a function rounded the same as when each one is compiled and evaluated separately (see 'evaluate' in 'Calc.py')"""
+
+    if not is_number(value):
+        return value
+
+    # numbers too big for answers can't be rounded
+    try:
+        return round_value(value)
+    except CalcError as e:
+        raise RunError(str(e))
+
+def find(stack, item):
+    """Return the index of 'item' in the list 'stack', comparing by identity from the top, or 'None' if it isn't in it"""
+
+    for index in range(len(stack) - 1, -1, -1):
+        if stack[index] is item:
+            return index
+
+    return None
+
+def read_tokens(source):
+    """
+    Yield the kind of each token (the name of the regex group that matched it, see 'get_regex'), the token in lower case and the token
+    as it was written with the whitespace before it, reading the expression from the file object 'source' (which can give bytes or strings) a chunk at a time
+    """
+
+    regex = get_regex()
+    decoder = getincrementaldecoder("utf-8")()
+    buffer = ""
+    done = False
+
+    while not done:
+        chunk = source.read(CHUNK_SIZE)
+        done = not chunk
+        buffer += decoder.decode(chunk, done) if isinstance(chunk, bytes) else chunk
+
+        # keep the original for the paths of files of numbers as they are case sensitive (unless lower case changes the length)
+        lower = buffer.lower()
+        if len(lower) != len(buffer):
+            buffer = lower
+
+        # the token at the end of the chunk could carry on in the next one, and so could the tokens before it that together could be
+        # the start of a number, such as '1.' before '25' or '2~' before '3', which can only be in the tail of characters that numbers are made of
+        tail = len(lower) if done else min(len(lower.rstrip(NUMBER_CHARACTERS)), len(lower) - 1)
+        held = []
+        pos = 0
+        for match in regex.finditer(lower):
+            end = match.end()
+            if end > tail:
+                held.append(match)
+                continue
+            kind = match.lastgroup
+            if kind != "whitespace":
+                yield kind, match.group(), buffer[pos:end]
+                pos = end
+
+        # the last token is kept with the ones before it that could be the start of a number with it
+        start = 0
+        while start < len(held) - 1 and not NUMBER_PREFIX.fullmatch(lower, held[start].start(), held[-1].end()):
+            start += 1
+        for match in held[:start]:
+            kind = match.lastgroup
+            if kind != "whitespace":
+                yield kind, match.group(), buffer[pos:match.end()]
+                pos = match.end()
+
+        buffer = buffer[pos:]
+
+class StreamCalculator:
+    """
+    Calculates an expression a token at a time, only keeping the stacks of the shunting yard algorithm and of the values (see the top of this file)
+
+    :param names (object): The names defined by the user, such as a 'Scope' from 'Definitions.py'. Default: None
+    """
+
+    def __init__(self, names=None):
+        self.names = names
+
+        # private attributes
+        self.__operators = []       # operators, open brackets and frames
+        self.__values = []
+        self.__frames = []
+        self.__prev = None          # the previous token, to decide whether operators are unary
+        self.__function = None      # a function waiting for its open bracket
+        self.__capture = None       # the text of a function being read whole, the brackets it's waiting for and how many are of functions
+        self.__file = None          # the path of a file of numbers being read, as an operand of a function
+        self.__depth = 0            # the number of brackets open
+        self.__recording = None     # the tokens since the start of the outermost function that could bind a variable
+        self.__recorded = 0         # the number of tokens forgotten from the start of the recording
+        self.__recorders = []       # the frames of the functions being recorded (or 'None' before their open bracket) and where they start
+        self.__skip = None          # the error raised in the operand of a lazy function whose tokens are being skipped
+
+    def __floor(self):
+        """Return the number of values on the value stack that operators can't use - those before the operand being calculated"""
+        return self.__frames[-1].base + self.__frames[-1].done if self.__frames else 0
+
+    def __take(self):
+        """Remove and return the value at the top of the value stack, calculating it if it hasn't been"""
+
+        value = self.__values.pop()
+        return value.value() if isinstance(value, Pending) else value
+
+    def __apply(self, operator):
+        """Execute 'operator' with the values at the top of the value stack, only calculating binary operators that could be fused when their answer is used"""
+
+        if len(self.__values) - self.__floor() < operator.num_operands:
+            raise RunError("Too few operands or too many operators")
+
+        if operator.is_unary:
+            self.__values.append(run(operator, [self.__take()]))
+            return
+
+        right = self.__values.pop()
+        left = self.__values.pop()
+
+        # the operator that calculated the left operand may be fused with this one
+        fused = registry.lookup_fusion(left.operator, operator) if isinstance(left, Pending) else None
+        if fused is not None:
+            right = right.value() if isinstance(right, Pending) else right
+            self.__values.append(run(fused, left.operands + [right]))
+            return
+
+        left = left.value() if isinstance(left, Pending) else left
+        right = right.value() if isinstance(right, Pending) else right
+        self.__values.append(Pending(operator, [left, right]) if registry.fuses(operator) else run(operator, [left, right]))
+
+    def __enclosing(self):
+        """Return the open bracket or frame nearest the top of the operator stack, or 'None' if there isn't one"""
+
+        for token in reversed(self.__operators):
+            if not isinstance(token, Operator):
+                return token
+
+        return None
+
+    def __reduce(self):
+        """Execute the operators at the top of the operator stack until an open bracket or frame"""
+
+        while self.__operators and isinstance(self.__operators[-1], Operator):
+            self.__apply(self.__operators.pop())
+
+    def __end_operand(self):
+        """Finish calculating an operand of the function whose frame is at the top of the operator stack"""
+
+        self.__reduce()
+        frame = self.__operators[-1]
+        if len(self.__values) - frame.base != frame.done + 1:
+            raise RunError("Too many operands or too few operators")
+
+        # the operands of lazy functions are calculated (and rounded) in full now so errors in them are given to the function in their place
+        if frame.function.lazy:
+            value = self.__values[-1]
+            self.__values[-1] = round_operand(value.value() if isinstance(value, Pending) else value)
+        frame.done += 1
+
+        # functions only bind a variable that is their second operand so once it's been calculated they don't
+        if frame.done == 2 and self.__recorders and frame is self.__recorders[-1][0]:
+            self.__stop_recording()
+
+    def __close_frame(self):
+        """Finish calculating the last operand of the function whose frame is at the top of the operator stack, and execute it"""
+
+        self.__end_operand()
+        self.__execute_frame()
+
+    def __execute_frame(self):
+        """Execute the function whose frame is at the top of the operator stack with the operands calculated for it"""
+
+        frame = self.__operators.pop()
+        self.__frames.pop()
+        if self.__recorders and frame is self.__recorders[-1][0]:
+            self.__stop_recording()
+
+        operands = [round_operand(value.value() if isinstance(value, Pending) else value) for value in self.__values[frame.base:]]
+        del self.__values[frame.base:]
+
+        frame.function.restore(operands)
+        self.__values.append(run(frame.function))
+        self.__prev = CloseBracket()
+
+    def __start_function(self, function, bracket):
+        """Start calculating the operands of 'function', which have started with the bracket 'bracket'"""
+
+        frame = Frame(function, "]" if bracket == "[" else ")", len(self.__values), self.__depth)
+        self.__operators.append(frame)
+        self.__frames.append(frame)
+        self.__prev = OpenBracket()
+
+        if self.__recorders and self.__recorders[-1][0] is None:
+            self.__recorders[-1][0] = frame
+
+    def __start_recording(self, kind, token, original):
+        """Start recording the tokens of a function that could bind a variable, from the token of its name"""
+
+        if not self.__recorders:
+            self.__recording, self.__recorded = [(kind, token, original)], 0
+        self.__recorders.append([None, self.__recorded + len(self.__recording) - 1])
+
+    def __stop_recording(self):
+        """Stop recording the innermost function being recorded, forgetting the recording if it's the outermost"""
+
+        self.__recorders.pop()
+        if not self.__recorders:
+            self.__recording = None
+
+    def __trim_recording(self):
+        """
+        Stop recording the outermost functions being recorded, as the recording has more tokens than the limit, until it has at most half of it
+        The functions are assumed not to bind a variable
+        """
+
+        end = self.__recorded + len(self.__recording)
+        outermost = 0
+        while outermost < len(self.__recorders) and end - self.__recorders[outermost][1] > RECORD_LIMIT // 2:
+            outermost += 1
+        del self.__recorders[:outermost]
+        if not self.__recorders:
+            self.__recording = None
+            return
+
+        start = self.__recorders[0][1]
+        del self.__recording[:start - self.__recorded]
+        self.__recorded = start
+
+    def __capture_token(self, kind, token, original):
+        """Add a token to the function being read whole, compiling and executing it once it's complete"""
+
+        text, brackets, functions = self.__capture
+        text.append(original)
+        if kind == "bracket":
+            if token in "([":
+                brackets.append(")" if token == "(" else "]")
+
+                # compiling recurses a few times for each function in another one so deeper functions would raise RecursionError,
+                # but only after a long time as each one reads everything inside it again, so they fail straight away
+                function = token == "[" or text[-2][-1:].isalpha()
+                functions.append(function)
+                if function and functions.count(True) > getrecursionlimit() // 4:
+                    raise CalcError("Expression too deeply nested")
+
+            elif not brackets:
+                raise CalcError("Functions must be immediately followed by brackets")
+            elif brackets.pop() != token:
+                raise CalcError("Brackets must be closed with the same type of bracket")
+            else:
+                functions.pop()
+            if not brackets:
+                self.__end_capture()
+
+        elif not brackets:
+            raise CalcError("Functions must be immediately followed by brackets")
+
+    def __end_capture(self):
+        """Compile and execute the function that has been read whole"""
+
+        text, _, _ = self.__capture
+        self.__capture = None
+
+        # it's compiled the same way as by 'calculate', which only defers executing functions in the operands of lazy functions
+        # (compiling and executing recurse for each level of nesting)
+        try:
+            program = compile_expression("".join(text), self.names, any(frame.function.lazy for frame in self.__frames))
+        except RecursionError:
+            raise CalcError("Expression too deeply nested")
+        try:
+            self.__values.append(execute(program))
+        except RecursionError:
+            raise CalcError("Expression too deeply nested")
+        except RunError:
+            raise
+        except CalcError as e:
+            raise RunError(str(e))
+
+        self.__prev = CloseBracket()
+
+    def __replay(self):
+        """
+        Read the outermost function being recorded whole from its recording, as calculating its operands failed so a function in it could bind a variable
+        The outermost is read so the functions inside it are compiled together once, rather than each one being read whole again
+        when the one around it fails too (such as when they are nested and each binds a variable)
+        """
+
+        frame, start = self.__recorders[0]
+        del self.__operators[find(self.__operators, frame):]
+        del self.__frames[find(self.__frames, frame):]
+        del self.__values[frame.base:]
+        self.__function = self.__file = self.__skip = None
+
+        tokens = self.__recording[start - self.__recorded:]
+        self.__recorders.clear()
+        self.__recording = None
+        self.__capture = ([tokens[0][2]], [], [])
+        for token in tokens[1:]:
+            self.__capture_token(*token)
+
+    def __skip_token(self, kind, token):
+        """Skip a token of the operand of the lazy function whose frame is at the top of the operator stack, which has raised an error, until the operand ends"""
+
+        frame = self.__operators[-1]
+        depth = self.__depth - frame.depth
+        if depth > 0 or depth == 0 and kind != "comma":
+            return
+
+        # the function is given the error in place of the operand
+        error, self.__skip = self.__skip, None
+        self.__values.append(Failed(error))
+        frame.done += 1
+        if depth == 0:
+            self.__prev = OpenBracket()
+        elif token != frame.close:
+            raise CalcError("Brackets must be closed with the same type of bracket")
+        else:
+            self.__execute_frame()
+
+    def __defer(self, error, frame, kind, token):
+        """Forget everything calculated since the start of the operand of the lazy function with the frame 'frame' and skip the rest of it, as it raised 'error'"""
+
+        del self.__operators[find(self.__operators, frame) + 1:]
+        del self.__frames[find(self.__frames, frame) + 1:]
+        del self.__values[frame.base + frame.done:]
+        self.__function = self.__capture = self.__file = None
+        while self.__recorders and self.__recorders[-1][0].depth > frame.depth:
+            self.__stop_recording()
+
+        self.__skip = error
+        self.__skip_token(kind, token)
+
+    def __recover(self, error, kind, token):
+        """
+        Carry on after 'error' was raised by the token 'token' of the kind 'kind', by skipping the rest of the operand of the innermost lazy function
+        if it was raised while executing, otherwise by reading the outermost function being recorded whole, otherwise raise it
+        """
+
+        while True:
+            try:
+
+                # functions whose open bracket hasn't been added can't be read whole
+                while self.__recorders and self.__recorders[-1][0] is None:
+                    self.__stop_recording()
+                recorder = self.__recorders[-1][0] if self.__recorders else None
+                lazy = next((frame for frame in reversed(self.__frames) if frame.function.lazy), None)
+
+                # errors raised while executing are given to the innermost lazy function in place of the operand,
+                # unless a function being recorded is inside it, which is read whole instead
+                if isinstance(error, RunError) and lazy is not None and (recorder is None or lazy.depth > recorder.depth):
+                    self.__defer(error, lazy, kind, token)
+                elif recorder is not None:
+                    self.__replay()
+                else:
+                    break
+                return
+
+            # executing the lazy function (or the function read whole) could raise another error
+            except CalcError as e:
+                error = e
+
+        raise error
+
+    def __file_token(self, kind, token, original):
+        """Add a token to the path of the file of numbers being read, returning whether or not it's part of the path"""
+
+        if kind == "comma" or kind == "bracket" and token in ")]":
+            self.__values.append(NumberFile("".join(self.__file).strip()))
+            self.__file = None
+            self.__prev = CloseBracket()
+            return False
+
+        self.__file.append(original)
+        return True
+
+    def add(self, kind, token, original):
+        """
+        Add the next token of the expression
+
+        :param kind (str): The kind of token - the name of the regex group that matched it (see 'get_regex'), except whitespace
+        :param token (str): The token in lower case
+        :param original (str): The token as it was written, with the whitespace before it
+        """
+
+        if kind == "bracket":
+            self.__depth += 1 if token in "([" else -1
+
+        if self.__recording is not None:
+            self.__recording.append((kind, token, original))
+            if len(self.__recording) > RECORD_LIMIT:
+                self.__trim_recording()
+
+        try:
+            if self.__skip is not None:
+                self.__skip_token(kind, token)
+            else:
+                self.__calculate_token(kind, token, original)
+        except CalcError as error:
+            self.__recover(error, kind, token)
+
+    def __calculate_token(self, kind, token, original):
+        """Calculate as much as possible with the next token of the expression (see 'add')"""
+
+        if self.__capture is not None:
+            self.__capture_token(kind, token, original)
+            return
+        if self.__file is not None and self.__file_token(kind, token, original):
+            return
+
+        # functions must be followed by their open bracket (or be an array, whose operands start straight away)
+        if self.__function is not None:
+            function, self.__function = self.__function, None
+            if token != "(":
+                raise CalcError("Functions must be immediately followed by brackets")
+            self.__start_function(function, token)
+            return
+
+        # numbers are the most common tokens so are added straight away
+        if kind == "number":
+            self.__prev = identify(kind, token, None)
+            self.__values.append(self.__prev)
+            return
+
+        # files of numbers can be operands of functions that take any number of operands
+        if token == "@" and self.__frames and isinstance(self.__prev, OpenBracket):
+            function = self.__frames[-1].function
+            if function.num_operands is not None or function.lazy:
+                raise CalcError("Files of numbers can only be used in functions that take any number of operands, not {}".format(function.name))
+            self.__file = []
+            return
+
+        # commas end the operand of the function whose frame is at the top of the operator stack
+        if kind == "comma":
+            if not isinstance(self.__enclosing(), Frame):
+                raise CalcError("Commas only allowed inside functions")
+            self.__end_operand()
+            self.__prev = OpenBracket()
+            return
+
+        # close brackets execute the operators since their open bracket, or end a function's operands
+        if token in ")]":
+            enclosing = self.__enclosing()
+            if isinstance(enclosing, Frame):
+                if enclosing.close != token:
+                    raise CalcError("Brackets must be closed with the same type of bracket")
+                self.__close_frame()
+            elif token == "]":
+                raise CalcError("Invalid token: ']'")
+            elif enclosing is None:
+                raise CalcError("Too many close brackets or not enough open brackets")
+            else:
+                self.__reduce()
+                self.__operators.pop()
+            self.__prev = CloseBracket()
+            return
+
+        token = identify(kind, token, self.__prev, self.names)
+
+        if isinstance(token, FunctionInstance):
+
+            # functions that can only be used with a variable bound need their operands compiled so are read whole
+            binding = registry.lookup_binding(token.symbol)
+            if binding is not None and registry.lookup(token.symbol) is None:
+                self.__capture = ([original], [], [])
+            elif token.symbol == "[":
+                self.__start_function(token, "[")
+            else:
+                if binding is not None:
+                    self.__start_recording(kind, token.symbol, original)
+                self.__function = token
+
+        elif isinstance(token, Operator):
+            while self.__operators and should_be_executed_first(self.__operators[-1], token):
+                self.__apply(self.__operators.pop())
+            self.__operators.append(token)
+            self.__prev = token
+
+        elif isinstance(token, OpenBracket):
+            self.__operators.append(token)
+            self.__prev = token
+
+        # numbers and other values
+        else:
+            self.__values.append(token.value(None) if isinstance(token, Variable) else token)
+            self.__prev = token
+
+    def finish(self):
+        """Return the answer once every token has been added, closing any brackets and functions that haven't been closed"""
+
+        while True:
+
+            # functions read whole are compiled as they are, which closes their brackets
+            try:
+                if self.__capture is not None:
+                    self.__depth -= len(self.__capture[1])
+                    self.__end_capture()
+                    continue
+            except CalcError as error:
+                self.__recover(error, None, None)
+                continue
+
+            # functions without their brackets give the error for having the wrong number of operands
+            if self.__function is not None:
+                self.__function.restore([])
+
+            elif self.__skip is not None:
+                close = ")" if self.__depth > self.__operators[-1].depth else self.__operators[-1].close
+
+            else:
+                enclosing = self.__enclosing()
+                if enclosing is None:
+                    break
+
+                # an empty last operand is left out, the same as when the expression is compiled
+                if isinstance(enclosing, Frame) and isinstance(self.__prev, OpenBracket) and self.__operators[-1] is enclosing:
+                    self.__depth -= 1
+                    try:
+                        self.__execute_frame()
+                    except CalcError as error:
+                        self.__recover(error, None, None)
+                    continue
+
+                close = enclosing.close if isinstance(enclosing, Frame) else ")"
+
+            self.add("bracket", close, close)
+
+        self.__reduce()
+        if len(self.__values) != 1:
+            raise CalcError("Too many operands or too few operators")
+
+        return self.__take()
+
+def calculate_stream(source, names=None):
+    """
+    Calculate the answer to the expression read from 'source' a chunk at a time, using a small amount of memory however big it is
+    If CalcError is raised, it is due to an invalid expression so needs to be caught and presented as an error message
+
+    :param source (file): The file object (text or binary) or memory-mapped file to read the expression from
+    :param names (object): The names defined by the user, such as a 'Scope' from 'Definitions.py'. Default: None
+    :return ans (str): The answer to the expression
+    """
+
+    calculator = StreamCalculator(names)
+    for kind, token, original in read_tokens(source):
+        calculator.add(kind, token, original)
+
+    return post_calc(calculator.finish())
+
+def calculate_file(path, names=None):
+    """
+    Calculate the answer to the expression in the file at 'path', memory-mapping it so it's read straight from the file
+    If CalcError is raised, it is due to an invalid expression or a file that can't be read so needs to be caught and presented as an error message
+
+    :param path (str): The path of the file
+    :param names (object): The names defined by the user, such as a 'Scope' from 'Definitions.py'. Default: None
+    :return ans (str): The answer to the expression
+    """
+
+    try:
+        f = open(path, "rb")
+    except OSError:
+        raise CalcError("Cannot read the file '{}'".format(path))
+
+    with f:
+
+        # empty files can't be memory-mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            return calculate_stream(f, names)
+        with mmap(f.fileno(), 0, access=ACCESS_READ) as mapped:
+            return calculate_stream(mapped, names)
+
+# only runs if the file is run directly (not if imported)
+# checks generated expressions give the same answers (or error messages) as 'calculate' in 'Calc.py' when they're read a few characters
+# at a time, so tokens are split between chunks, for example 'python Stream.py 1000 --seed 1'
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from Calc import calculate
+    from io import StringIO
+    import random
+
+    parser = ArgumentParser(description="Check calculating generated expressions a few characters at a time gives the same answers as 'calculate'")
+    parser.add_argument("count", nargs="?", type=int, default=1000, help="the number of expressions to check. Default: 1000")
+    parser.add_argument("--seed", type=int, help="the seed of the random expressions, to check the same ones again. Default: random")
+    args = parser.parse_args()
+    rand = random.Random(args.seed)
+
+    def generate(depth):
+        """Return a random expression with numbers written in each way and functions (including ones that bind a variable and lazy ones) nested up to 'depth' deep"""
+
+        if depth == 0 or rand.random() < 0.3:
+            return rand.choice([
+                str(rand.randint(0, 50)),
+                "{}.{}".format(rand.randint(0, 9), rand.randint(0, 99)),
+                "{}.{}~{}{}".format(rand.randint(1, 9), rand.randint(0, 9), rand.choice(["", "+", "-"]), rand.randint(0, 5)),
+                rand.choice(["i", "pi"])
+            ])
+
+        operands = [generate(depth - 1) for _ in range(3)]
+        return rand.choice([
+            "{0} " + rand.choice(["+", "-", "*", "/", "^", "<", "="]) + " {1}",
+            "({0})", "abs({0})", "max({0}, {1})", "sum({0}, {1})", "if({0}, {1}, {2})",
+            "sum({0}, i, 1, " + str(rand.randint(1, 4)) + ")", "prod({0}, i, 1, 3)"
+        ]).format(*operands)
+
+    # expressions that have given different answers or errors before, checked before the generated ones
+    REGRESSIONS = [
+        "prod(1~900000, i, 1, 3)",
+        "sum(1~999999*i, i, 1, 20)",
+        "sum(sum(sum(i, i, 1, 2) * i, i, 1, 2), i, 1, 2)"
+    ]
+
+    def answer(func, expr):
+        """Return the answer to 'expr' from 'func', or the error message if it's invalid"""
+
+        try:
+            return func(expr)
+        except CalcError as e:
+            return "Error: {}".format(e)
+
+    different = 0
+    for expr in REGRESSIONS + [generate(4) for _ in range(args.count)]:
+        CHUNK_SIZE = rand.randint(1, 5)
+        expected = answer(calculate, expr)
+        ans = answer(lambda expr: calculate_stream(StringIO(expr)), expr)
+        if ans != expected:
+            different += 1
+            print("{}\n    calculate: {}\n    stream:    {}".format(expr, expected, ans))
+
+    print("{} of {} expressions different".format(different, len(REGRESSIONS) + args.count))
+    parser.exit(1 if different else 0)
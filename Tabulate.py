@@ -0,0 +1,94 @@
+"""
+Contains the code for tabulating an expression - calculating its answer for each value of a variable over a range and writing them as CSV
+The expression is compiled once and evaluated at each value (many at once if NumPy is installed and every operation in it works
+on arrays) and the rows are written in chunks as they are calculated, so any number of values only uses a small amount of memory
+
+Use the 'tabulate' function from code, or run 'Calc.py' with '--table', for example 'python Calc.py "sin(x)" --table "x=0:pi:0.01"'
+"""
+
+from Calc import compile_expression, evaluate, post_calc, format_number, BoundNames
+from Datatypes import Num, BoundExpression, is_number
+from Errors import CalcError
+import Calculus
+import csv
+import sys
+
+CHUNK_SIZE = 10000      # the most rows calculated and written at once
+
+def parse_range(spec):
+    """
+    Split a range written as 'variable=start:stop:step', for example 'x=0:100:0.001', into its parts
+    The start, stop and step can be expressions, for example 'x=0:2*pi:pi/100'
+
+    :param spec (str): The range
+    :return (tuple): The name of the variable and the start, stop and step as 'Num's
+    """
+
+    if "=" not in spec or spec.count(":") != 2:
+        raise CalcError("Ranges must be written as 'variable=start:stop:step', for example 'x=0:100:0.001'")
+
+    variable, bounds = spec.split("=", 1)
+    variable = variable.strip().lower()
+    if not (variable.isascii() and variable.isalpha()):
+        raise CalcError("'{}' can't be the name of a variable as it isn't only letters".format(variable))
+
+    # the bounds aren't rounded like answers so, for example, 'pi/4' steps add up to 'pi'
+    bounds = [evaluate(compile_expression(bound), round_answer=False) for bound in bounds.split(":")]
+    if not all(is_number(bound) for bound in bounds):
+        raise CalcError("The start, stop and step must be numbers")
+
+    return (variable, *bounds)
+
+def tabulate(expr, variable, start, stop, step, output=None, names=None):
+    """
+    Write the answer to 'expr' for each value of 'variable' from 'start' to 'stop' (inclusive) going up in 'step's as CSV rows
+    The first row is the variable and the expression. Values where the expression has no answer (such as when dividing by 0) are left blank
+    If CalcError is raised, it is due to an invalid expression or range so needs to be caught and presented as an error message
+
+    :param expr (str): The expression
+    :param variable (str): The name of the variable
+    :param start (Num/str): The first value of the variable
+    :param stop (Num/str): The last value of the variable, which is only included if it's a whole number of steps from the start
+    :param step (Num/str): The difference between each value of the variable
+    :param output (file): The file to write the rows to. Default: standard output
+    :param names (object): The names defined by the user, such as a 'Scope' from 'Definitions.py'. Default: None
+    :return (int): The number of values the expression was calculated for
+    """
+
+    start, stop, step = [Num(str(bound).replace("~", "e")) for bound in [start, stop, step]]
+    if step <= 0:
+        raise CalcError("The step must be more than 0")
+    if stop < start:
+        raise CalcError("The stop must be at least the start")
+
+    variable = variable.strip().lower()
+    f = BoundExpression(compile_expression(expr, BoundNames(names, [variable])), variable, evaluate)
+    num_values = int((stop - start) / step) + 1
+
+    writer = csv.writer(output if output is not None else sys.stdout, lineterminator="\n")
+    writer.writerow([variable, expr.strip()])
+    for first in range(0, num_values, CHUNK_SIZE):
+        writer.writerows(chunk(f, start, step, first, min(first + CHUNK_SIZE, num_values)))
+
+    return num_values
+
+def chunk(f, start, step, first, last):
+    """Return the rows for the values of the variable numbered 'first' up to (not including) 'last', all at once if possible"""
+
+    np = Calculus.numpy() if f.elementwise and last - first > 1 else None
+    if np is not None:
+        xs = float(start) + float(step) * np.arange(first, last, dtype=float)
+        ys = Calculus.evaluate_array(np, f, xs)
+        if ys is not None:
+            return [(format_number(x), format_number(y)) for x, y in zip(xs.tolist(), ys.tolist())]
+
+    # one at a time with the calculator's numbers, leaving values without an answer blank
+    rows = []
+    for i in range(first, last):
+        x = Num(start + step * i)
+        try:
+            rows.append((post_calc(x), post_calc(f(x))))
+        except (CalcError, ArithmeticError, ValueError):
+            rows.append((post_calc(x), ""))
+
+    return rows
@@ -0,0 +1,118 @@
+"""
+Contains the code for the trigonometric and hyperbolic functions that can be used in the calculator
+This is a pack of functions, added to the registry in 'Registry.py' with the 'register' function the first time one is used
+"""
+
+from Errors import CalcOperationError
+from math import sin, cos, tan, asin, acos, atan, sinh, cosh, tanh, asinh, acosh, atanh
+
+def func_sin(x):
+    """Return sin(x) where x is in radians"""
+
+    # use the function from the 'math' library
+    return sin(x)
+
+def func_cos(x):
+    """Return cos(x) where x is in radians"""
+
+    # use the function from the 'math' library
+    return cos(x)
+
+def func_tan(x):
+    """Return tan(x) where x is in radians"""
+
+    from Registry import registry
+    from Datatypes import Num
+
+    # invalid cases
+    if x % registry.lookup("pi") == Num("0.5") * registry.lookup("pi"):
+        raise CalcOperationError("Tangent is undefined for values half way between multiples of pi", "tan", [x])
+
+    # use the function from the 'math' library
+    return tan(x)
+
+def func_arsin(x):
+    """Return arsin(x) where the answer is in radians"""
+
+    # invalid cases
+    if x < -1 or x > 1:
+        raise CalcOperationError("Inverse sine is only defined for values between -1 and 1 inclusive", "arsin", [x])
+
+    # use the function from the 'math' library
+    return asin(x)
+
+def func_arcos(x):
+    """Return arcos(x) where the answer is in radians"""
+
+    # invalid cases
+    if x < -1 or x > 1:
+        raise CalcOperationError("Inverse cosine is only defined for values between -1 and 1 inclusive", "arcos", [x])
+
+    # use the function from the 'math' library
+    return acos(x)
+
+def func_artan(x):
+    """Return artan(x) where the answer is in radian"""
+
+    # use the function from the 'math' library
+    return atan(x)
+
+def func_sinh(x):
+    """Return sinh(x) where x is in radians"""
+
+    # use the function from the 'math' library
+    return sinh(x)
+
+def func_cosh(x):
+    """Return cosh(x) where x is in radians"""
+
+    # use the function from the 'math' library
+    return cosh(x)
+
+def func_tanh(x):
+    """Return tanh(x) where x is in radians"""
+
+    # use the function from the 'math' library
+    return tanh(x)
+
+def func_arsinh(x):
+    """Return arsinh(x) where the answer is in radians"""
+
+    # use the function from the 'math' library
+    return asinh(x)
+
+def func_arcosh(x):
+    """Return arcosh(x) where the answer is in radians"""
+
+    # invalid cases
+    if x < 1:
+        raise CalcOperationError("Inverse hyperbolic cosine is undefined for values less than 1", "arcosh", [x])
+
+    # use the function from the 'math' library
+    return acosh(x)
+
+def func_artanh(x):
+    """Return artanh(x) where the answer is in radian"""
+
+    # invalid cases
+    if x <= -1 or x >= 1:
+        raise CalcOperationError("Inverse hyperbolic tangent is only defined for values between -1 and 1 exclusive", "artanh", [x])
+
+    # use the function from the 'math' library
+    return atanh(x)
+
+def register(registry):
+    """Add the functions in this pack to 'registry'"""
+
+    registry.add_function("sin", "Sin (sin)", func_sin, 1, elementwise=True)
+    registry.add_function("cos", "Cosine (cos)", func_cos, 1, elementwise=True)
+    registry.add_function("tan", "Tangent (tan)", func_tan, 1, elementwise=True)
+    registry.add_function("arsin", "Inverse sine (arsin)", func_arsin, 1)
+    registry.add_function("arcos", "Inverse cosine (arcos)", func_arcos, 1)
+    registry.add_function("artan", "Inverse tangent (artan)", func_artan, 1)
+    registry.add_function("sinh", "Hyperbolic sin (sinh)", func_sinh, 1)
+    registry.add_function("cosh", "Hyperbolic cosine (cosh)", func_cosh, 1)
+    registry.add_function("tanh", "Hyperbolic tangent (tanh)", func_tanh, 1)
+    registry.add_function("arsinh", "Inverse hyperbolic sine (arsinh)", func_arsinh, 1)
+    registry.add_function("arcosh", "Inverse hyperbolic cosine (arcosh)", func_arcosh, 1)
+    registry.add_function("artanh", "Inverse hyperbolic tangent (artanh)", func_artanh, 1)
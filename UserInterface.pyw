@@ -1,390 +1,543 @@
-"""
-A graphical user interface for the calculator
-To open, instantiate the 'Window' class and then call the 'run' method
-"""
-
-import pygame as pg
-from PygameTools import COLOURS, Draw, format_text
-from Interface import Interface
-from Errors import CalcError
-
-class Window:
-
-    def __init__(self):
-
-        # constants
-        self.__RESOLUTION = self.__WIDTH, self.__HEIGHT = 800, 600
-        self.__TARGET_FPS = 30
-        self.__BACKGROUND_COLOUR = COLOURS["grey"]
-        self.__FONT = "freesansbold.ttf"
-
-        # variables needed for the calculator
-        self.__calculator = Interface()
-        self.__expr = self.__ans = self.__error_msg = ""
-
-        # the current mode name and mapping between mode names and their methods
-        self.__mode = "normal"
-        self.__modes = {
-            "normal": self.__mode_normal,
-            "instructions": self.__mode_instructions
-        }
-
-        # the distance the instructions scrollable view is positioned above the top of the screen
-        self.__scroll = 0
-
-        # whether or not to exit the calculator
-        self.__done = False
-
-    def run(self):
-        """Run the calculator user interface"""
-
-        # start pygame, create the window, caption it and start the clock
-        pg.init()
-        self.__display = pg.display.set_mode(self.__RESOLUTION)
-        pg.display.set_caption("Calculator")
-        clock = pg.time.Clock()
-
-        # create my drawer for drawing things on the screen
-        self.__drawer = Draw(self.__display, self.__FONT)
-
-        # create buttons and text I will draw later
-        self.__button_instructions = self.__drawer.button((0, 0, 200, 50), COLOURS["yellow"], "Instructions", 25, COLOURS["black"])
-        self.__button_clear_memory = self.__drawer.button((200, 0, 200, 50), COLOURS["red"], "Clear Memory", 25, COLOURS["black"])
-        self.__button_back = self.__drawer.button((self.__WIDTH - 100, 0, 100, 50), COLOURS["black"], "Back", 25, COLOURS["white"])
-        self.__texts_expr = []
-        self.__texts_ans = []
-        self.__texts_error_msg = []
-        self.__text_instructions_title = self.__drawer.text("Instructions", 25, COLOURS["yellow"], (400, 50))
-        self.__text_memory = self.__drawer.text("Memory", 25, COLOURS["green"], (700, 50))
-        self.__buttons_memory = []
-        self.__text_extra_memory = []
-        self.__format_instructions()
-
-        # main loop
-        while not self.__done:
-
-            # clear screen
-            self.__display.fill(self.__BACKGROUND_COLOUR)
-
-            # get events
-            events = pg.event.get()
-
-            # let windows close the window
-            for event in events:
-                if event.type == pg.QUIT:
-                    self.__done = True
-
-            if not self.__done:
-
-                # call the current mode's method
-                self.__modes[self.__mode](events)
-
-                # update the display and tick the clock
-                pg.display.update()
-                clock.tick(self.__TARGET_FPS)
-
-        # close the pygame window
-        pg.quit()
-
-    def __mode_normal(self, events):
-        """Runs every tick when in normal mode"""
-
-        # draw buttons and text
-        self.__button_instructions.draw()
-        self.__button_clear_memory.draw()
-        self.__text_memory.draw()
-        for button in self.__buttons_memory:
-            button.draw()
-        for text in self.__texts_expr + self.__texts_ans + self.__texts_error_msg + self.__text_extra_memory:
-            text.draw()
-
-        # draw lines between the buttons to distinguish them (same colour as background so when they aren't there it looks the same)
-        for count in range(2, 5+1):
-            pg.draw.line(self.__display, self.__BACKGROUND_COLOUR, (600, 100 * count), (800, 100 * count))
-
-        # handle events
-        for event in events:
-            if event.type == pg.KEYDOWN:
-
-                # if the user pressed escape, clear the expression
-                if event.key == pg.K_ESCAPE:
-                    self.__expr = ""
-                    self.__update_text_and_buttons(expr=True)
-
-                # if the user presses backspace, remove 1 character from the expression
-                elif event.key == pg.K_BACKSPACE:
-                    self.__expr = self.__expr[:-1]
-                    self.__update_text_and_buttons(expr=True)
-
-                # if either or the return/enter keys are pressed, call the 'calculate' method
-                elif event.key == pg.K_RETURN or event.key == pg.K_KP_ENTER:
-                    self.__calculate()
-
-                # otherwise add the text to the expression
-                else:
-
-                    # if the first thing they type isn't a number or a letter, insert the last answer into the start of the expression
-                    if event.key not in [pg.K_0, pg.K_1, pg.K_2, pg.K_3, pg.K_4, pg.K_5, pg.K_6, pg.K_7, pg.K_8, pg.K_9, pg.K_KP0, pg.K_KP1, pg.K_KP2, pg.K_KP3, pg.K_KP4, pg.K_KP5, pg.K_KP6, pg.K_KP7, pg.K_KP8, pg.K_KP9, pg.K_a, pg.K_b, pg.K_c, pg.K_d, pg.K_e, pg.K_f, pg.K_g, pg.K_h, pg.K_i, pg.K_j, pg.K_k, pg.K_l, pg.K_m, pg.K_n, pg.K_o, pg.K_p, pg.K_q, pg.K_r, pg.K_s, pg.K_t, pg.K_u, pg.K_v, pg.K_w, pg.K_x, pg.K_y, pg.K_z] and self.__expr == "":
-                        self.__expr = self.__ans
-
-                    self.__ans = self.__error_msg = ""
-                    self.__expr += event.unicode
-                    self.__update_text_and_buttons(expr=True, ans=True, error=True)
-
-            elif event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
-                mouse_pos = pg.mouse.get_pos()
-
-                # if the user clicked the instructions button, change to instructions mode
-                if self.__button_instructions.is_within(mouse_pos):
-                    self.__mode = "instructions"
-
-                # if the user clicked the clear memory button, clear the memory
-                elif self.__button_clear_memory.is_within(mouse_pos):
-                    self.__calculator.clear_memory()
-                    self.__ans = self.__error_msg = ""
-                    self.__update_text_and_buttons(memory=True, ans=True, error=True)
-
-                # if the user clicked on a memory item, insert that item into the expression
-                else:
-                    for button in self.__buttons_memory:
-                        if button.is_within(mouse_pos):
-                            self.__expr += "M{}".format(self.__buttons_memory.index(button) + 1)
-                            self.__update_text_and_buttons(expr=True)
-
-    def __mode_instructions(self, events):
-        """Runs every tick when in instructions mode"""
-
-        # draw the instructions text onto the intemediate surface
-        for line in self.__texts_instructions:
-            line.draw()
-
-        # draw the intemediate surface onto the main surface
-        self.__display.blit(self.__intermediate, (0, 100 + self.__scroll))
-
-        # draw a rectangle, the title and back button over the top of the top of the surface
-        pg.draw.rect(self.__display, self.__BACKGROUND_COLOUR, (0, 0, self.__WIDTH, 100))
-        self.__text_instructions_title.draw()
-        self.__button_back.draw()
-
-        # handle events
-        for event in events:
-
-            # if the user pressed escape or clicked the back button, change to normal mode
-            if event.type == pg.KEYDOWN:
-                if event.key == pg.K_ESCAPE:
-                    self.__mode = "normal"
-            elif event.type == pg.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    mouse_pos = pg.mouse.get_pos()
-                    if self.__button_back.is_within(mouse_pos):
-                        self.__mode = "normal"
-
-                # if the user scrolled up, lower the intemediate surface but not lower than the origin
-                elif event.button == 4:
-                    self.__scroll = min(self.__scroll + 15, 0)
-
-                # if the user scrolled down, raise the intemediate surface but not higher than the point
-                # where the bottom instructions line is fully visible
-                elif event.button == 5:
-                    self.__scroll = max(self.__scroll - 15, self.__HEIGHT - len(self.__texts_instructions) * 20 - 100)
-
-    def __clean_up_expr(self, expr):
-        """Remove whitespace and extra brackets on the outside of the expression"""
-
-        expr = expr.strip()
-        if len(expr) > 0:
-            while expr[0] == "(" and expr[-1] == ")":
-                expr = expr[1:-1].strip()
-
-        return expr
-
-    def __calculate(self):
-        """Calculate the answer to the expression and update everything"""
-
-        # remove whitespace at the start and end, make lower case and replace 'ans' with 'm1'
-        expr = self.__expr.strip().lower().replace("ans", "m1")
-
-        # replace all memory references with the actual answers, clean up the expression and call
-        # the main calculator with the resulting expression, catching errors and displaying them
-        try:
-            self.__ans = self.__calculator.calculate(self.__clean_up_expr(self.__convert_memory_references(expr)))
-        except CalcError as e:
-            self.__error_msg = str(e)
-            self.__ans = ""
-            self.__update_text_and_buttons(ans=True, error=True)
-        else:
-            self.__error_msg = ""
-            self.__expr = ""
-            self.__update_text_and_buttons(True, True, True, True)
-
-    def __convert_memory_references(self, expr):
-        """Convert all memory references to the actual answers"""
-
-        # runs for every 'm' in 'expr'
-        for _ in range(expr.count("m")):
-
-            # get the string after the first 'm'
-            index = expr.split("m")[1]
-
-            # find the number of characters until the first non-numerical character
-            pos = 0
-            while pos < len(index) and index[pos] in "0123456789":
-                pos += 1
-
-            # find the string between the first 'm' and the first non-numerical characters
-            # the slice means all characters up to pos characters through it
-            index = index[:pos]
-
-            # if there is a number after the 'm':
-            if index != "":
-                index = int(index)
-
-                # if valid, replace the reference with the actual answer
-                if 1 <= index <= self.__calculator.len_memory():
-                    expr = expr.replace("m{}".format(index), "(" + self.__calculator.memory_item(index)[1] + ")", 1)
-
-                # otherwise, give an error message
-                else:
-                    raise CalcError("Memory references must be between 1 and the number of items in memory")
-
-        return expr
-
-    def __update_text_and_buttons(self, memory=False, expr=False, ans=False, error=False):
-        """
-        Update the message on text and button objects if the message has changed
-        The parameters are whether or not to update the message on those text/button objects
-        """
-
-        # if we need to update the memory buttons:
-        if memory:
-
-            self.__text_extra_memory = []
-            count = 0
-
-            # for the most recent 5 items in memory:
-            for expression, answer in self.__calculator.recent_memory(5):
-
-                # format the text for each memory item into lines
-                lines = format_text("{}: {} ({})".format(count + 1, answer, expression), 15, 3, True)
-
-                # if there is only 1 line, make it
-                if len(lines) == 1:
-
-                    # if there is already a button, change the text
-                    if len(self.__buttons_memory) > count:
-                        self.__buttons_memory[count].edit_text_message(lines[0])
-
-                    # otherwise create a button with the new text
-                    else:
-                        self.__buttons_memory.append(self.__drawer.button((600, 100 * (count + 1), 200, 100), COLOURS["black"], lines[0], 20, COLOURS["white"]))
-
-                # otherwise make it and add the other 1 or 2 lines
-                else:
-                    # if there is already a button, change the text
-                    if len(self.__buttons_memory) > count:
-                        self.__buttons_memory[count].edit_text_message(lines[1])
-
-                    # otherwise create a button with the new text
-                    else:
-                        self.__buttons_memory.append(self.__drawer.button((600, 100 * (count + 1), 200, 100), COLOURS["black"], lines[1], 20, COLOURS["white"]))
-
-                    # add the first line
-                    self.__text_extra_memory.append(self.__drawer.text(lines[0], 20, COLOURS["white"], (700, (100 * count) + 125)))
-
-                    # if there are 3 lines, add this too
-                    if len(lines) == 3:
-                        self.__text_extra_memory.append(self.__drawer.text(lines[2], 20, COLOURS["white"], (700, (100 * count) + 175)))
-
-                count += 1
-
-            # remove buttons that aren't in memory anymore
-            self.__buttons_memory = self.__buttons_memory[:count]
-
-        # if we need to update the expression text objects:
-        if expr:
-
-            # format the expression into lines
-            lines = format_text(self.__expr, 18, 5, True)
-            count = 0
-            for line in lines:
-
-                # if there are already enough objects, change the message on it
-                if len(self.__texts_expr) > count:
-                    self.__texts_expr[count].edit_text_message(line)
-
-                # otherwise, create a new object with the message
-                else:
-                    self.__texts_expr.append(self.__drawer.text(line, 35, COLOURS["blue"], (300, 200 + (30 * count))))
-
-                count += 1
-
-            # remove unnecessary objects
-            self.__texts_expr = self.__texts_expr[:count]
-
-        # if we need to update the answer text objects:
-        if ans:
-
-            # format the answer into lines
-            lines = format_text(self.__ans, 18, 5, True)
-            count = 0
-            for line in lines:
-
-                # if there are already enough objects, change the message on it
-                if len(self.__texts_ans) > count:
-                    self.__texts_ans[count].edit_text_message(line)
-
-                # otherwise, create a new object with the message
-                else:
-                    self.__texts_ans.append(self.__drawer.text(line, 35, COLOURS["green"], (300, 400 + (30 * count))))
-
-                count += 1
-
-            # remove unnecessary objects
-            self.__texts_ans = self.__texts_ans[:count]
-
-        # if we need to update the error text objects:
-        if error:
-
-            # format the error message into lines
-            lines = format_text(self.__error_msg, 40, 3)
-            count = 0
-            for line in lines:
-
-                # if there are already enough objects, change the message on it
-                if len(self.__texts_error_msg) > count:
-                    self.__texts_error_msg[count].edit_text_message(line)
-
-                # otherwise, create a new object with the message
-                else:
-                    self.__texts_error_msg.append(self.__drawer.text(line, 25, COLOURS["red"], (300, 100 + (25 * count))))
-
-                count += 1
-
-            # remove unnecessary objects
-            self.__texts_error_msg = self.__texts_error_msg[:count]
-
-    def __format_instructions(self):
-        """Format the instructions into lines on a scrollable surface"""
-
-        # extend the instructions
-        instructions = "SCROLL DOWN TO VIEW MORE:\n\n" + self.__calculator.instructions + "\n\nTo insert a previous answer into the expression, click on the item in the memory section. You can also type 'ans' to insert the last answer into the expression or 'Mx' to insert the xth answer into the expression.\n\nYou can press ESCAPE at any time to clear the expression and when you start typing on an empty expression it will add the previous answer before it unless you type a number of just pressed ESCAPE."
-
-        # format the instructions into lines
-        lines = format_text(instructions, 75)
-
-        # make the intemediate surface just bit enough to hold all the instruction lines and make it the background colour
-        self.__intermediate = pg.surface.Surface((self.__WIDTH, len(lines) * 20 + 10))
-        self.__intermediate.fill(self.__BACKGROUND_COLOUR)
-
-        # make a new drawer to draw on the intemediate surface
-        new_drawer = Draw(self.__intermediate, self.__FONT)
-
-        # create a text object for each line
-        self.__texts_instructions = []
-        count = 0
-        for line in lines:
-            self.__texts_instructions.append(new_drawer.text(line, 20, COLOURS["black"], (400, 10 + 20 * count)))
-            count += 1
-
-if __name__ == "__main__":
-    Window().run()
+"""
+A graphical user interface for the calculator
+To open, instantiate the 'Window' class and then call the 'run' method
+"""
+
+import pygame as pg
+from PygameTools import COLOURS, Draw, format_text
+from Interface import Interface, calculate_with_definitions, preview_with_definitions
+from Worker import Worker
+from Errors import CalcError
+
+class Window:
+
+    def __init__(self):
+
+        # constants
+        self.__RESOLUTION = self.__WIDTH, self.__HEIGHT = 800, 600
+        self.__TARGET_FPS = 30
+        self.__POLL_INTERVAL = 50
+        self.__PREVIEW_DELAY = 150
+        self.__PREVIEW_BUDGET = 500
+        self.__BACKGROUND_COLOUR = COLOURS["grey"]
+        self.__FONT = "freesansbold.ttf"
+
+        # variables needed for the calculator
+        # any file of numbers can be read as it's the user at the keyboard typing the expressions
+        self.__calculator = Interface(files_directory="")
+        self.__expr = self.__ans = self.__error_msg = ""
+
+        # the expression as it was typed when it was last submitted to the worker to be calculated
+        self.__submitted_expr = None
+
+        # the time to preview the answer to the expression (once the user has stopped typing for a moment) or 'None'
+        # and the time the preview worker started calculating the current preview
+        self.__preview_due = None
+        self.__preview_started = 0
+
+        # the current mode name and mappings between mode names and their methods to handle events and draw
+        self.__mode = "normal"
+        self.__modes = {
+            "normal": self.__mode_normal,
+            "instructions": self.__mode_instructions
+        }
+        self.__views = {
+            "normal": self.__draw_normal,
+            "instructions": self.__draw_instructions
+        }
+
+        # the distance the instructions scrollable view is positioned above the top of the screen
+        self.__scroll = 0
+
+        # the areas of the display that have changed since they were last drawn
+        self.__dirty_rects = []
+
+        # whether or not to exit the calculator
+        self.__done = False
+
+    def run(self):
+        """Run the calculator user interface"""
+
+        # start pygame, create the window, caption it and start the clock
+        pg.init()
+        self.__display = pg.display.set_mode(self.__RESOLUTION)
+        pg.display.set_caption("Calculator")
+        clock = pg.time.Clock()
+
+        # mouse movement is never used so don't wake up for it
+        pg.event.set_blocked(pg.MOUSEMOTION)
+
+        # start the worker processes that calculate answers and previews so the window never freezes
+        # (they are given the definitions with each expression so they can use them)
+        self.__worker = Worker(calculate_with_definitions)
+        self.__preview_worker = Worker(preview_with_definitions)
+
+        # create my drawer for drawing things on the screen
+        self.__drawer = Draw(self.__display, self.__FONT)
+
+        # create buttons and text I will draw later
+        self.__button_instructions = self.__drawer.button((0, 0, 200, 50), COLOURS["yellow"], "Instructions", 25, COLOURS["black"])
+        self.__button_clear_memory = self.__drawer.button((200, 0, 200, 50), COLOURS["red"], "Clear Memory", 25, COLOURS["black"])
+        self.__button_back = self.__drawer.button((self.__WIDTH - 100, 0, 100, 50), COLOURS["black"], "Back", 25, COLOURS["white"])
+        self.__texts_expr = []
+        self.__texts_ans = []
+        self.__texts_error_msg = []
+        self.__text_instructions_title = self.__drawer.text("Instructions", 25, COLOURS["yellow"], (400, 50))
+        self.__text_memory = self.__drawer.text("Memory", 25, COLOURS["green"], (700, 50))
+        self.__text_busy = self.__drawer.text("", 35, COLOURS["green"], (300, 400))
+        self.__busy_message = ""
+        self.__text_preview = self.__drawer.text("", 35, COLOURS["black"], (300, 400))
+        self.__list_memory = self.__drawer.virtual_list((600, 100, 200, 500), 100, COLOURS["black"], 20, COLOURS["white"], self.__calculator.len_memory, self.__format_memory_item)
+        self.__format_instructions()
+
+        # draw everything the first time
+        self.__invalidate()
+
+        # main loop
+        while not self.__done:
+
+            # only redraw the areas that have changed
+            self.__render()
+
+            # sleep until there is an event and then get all the others that have happened too
+            events = [pg.event.wait(self.__wait_timeout())] + pg.event.get()
+
+            for event in events:
+
+                # let windows close the window
+                if event.type == pg.QUIT:
+                    self.__done = True
+
+                # redraw everything if the window has been covered up or minimised
+                elif event.type == pg.VIDEOEXPOSE or event.type == pg.WINDOWEXPOSED:
+                    self.__invalidate()
+
+            if not self.__done:
+
+                # call the current mode's method and check for answers from the workers
+                self.__modes[self.__mode](events)
+                self.__poll_worker()
+                self.__poll_preview()
+
+                # tick the clock so a burst of events (such as scrolling) can't redraw more than the target FPS
+                clock.tick(self.__TARGET_FPS)
+
+        # stop the workers and close the pygame window
+        self.__worker.close()
+        self.__preview_worker.close()
+        pg.quit()
+
+    def __wait_timeout(self):
+        """Return the number of milliseconds until something needs doing even if there are no events, 0 meaning never"""
+
+        timeouts = []
+
+        # if calculating, wake up regularly to check whether the answer has arrived
+        if self.__worker.busy or self.__preview_worker.busy:
+            timeouts.append(self.__POLL_INTERVAL)
+
+        # wake up when it's time to preview the answer
+        if self.__preview_due is not None:
+            timeouts.append(max(self.__preview_due - pg.time.get_ticks(), 1))
+
+        return min(timeouts) if timeouts else 0
+
+    def __invalidate(self, rect=None):
+        """Mark an area of the display as needing to be redrawn. 'None' means the whole display"""
+
+        self.__dirty_rects.append(pg.Rect(rect) if rect is not None else self.__display.get_rect())
+
+    def __change_mode(self, mode):
+        """Change to the mode 'mode' and redraw everything"""
+
+        self.__mode = mode
+        self.__invalidate()
+
+    def __render(self):
+        """Redraw the dirty areas of the display with the current mode's view and update only them on the screen"""
+
+        if not self.__dirty_rects:
+            return
+
+        # merge overlapping areas so nothing is drawn twice
+        rects = []
+        for rect in self.__dirty_rects:
+            for other in rects[:]:
+                if rect.colliderect(other):
+                    rect = rect.union(other)
+                    rects.remove(other)
+            rects.append(rect)
+        self.__dirty_rects = []
+
+        for rect in rects:
+
+            # clip to the area so only it is drawn over, clear it and draw everything that is in it
+            self.__display.set_clip(rect)
+            self.__display.fill(self.__BACKGROUND_COLOUR, rect)
+            self.__views[self.__mode](rect)
+
+        self.__display.set_clip(None)
+        pg.display.update(rects)
+
+    def __draw_normal(self, rect):
+        """Draw everything in normal mode that is within 'rect'"""
+
+        # draw buttons and text
+        for widget in [self.__button_instructions, self.__button_clear_memory, self.__text_memory, self.__list_memory] + self.__texts_expr + self.__texts_ans + self.__texts_error_msg:
+            if widget.rect.colliderect(rect):
+                widget.draw()
+
+        # show that the answer is being calculated or otherwise the preview of the answer
+        if self.__worker.busy:
+            if self.__text_busy.rect.colliderect(rect):
+                self.__text_busy.draw()
+        elif self.__ans == "" and self.__text_preview.rect.colliderect(rect):
+            self.__text_preview.draw()
+
+    def __draw_instructions(self, rect):
+        """Draw everything in instructions mode that is within 'rect'"""
+
+        # draw the pre-rendered instructions surface onto the main surface
+        self.__display.blit(self.__intermediate, (0, 100 + self.__scroll))
+
+        # draw a rectangle, the title and back button over the top of the top of the surface
+        pg.draw.rect(self.__display, self.__BACKGROUND_COLOUR, (0, 0, self.__WIDTH, 100))
+        self.__text_instructions_title.draw()
+        self.__button_back.draw()
+
+    def __mode_normal(self, events):
+        """Handles the events when in normal mode"""
+
+        # handle events
+        for event in events:
+            if event.type == pg.KEYDOWN:
+
+                # if the user pressed escape while calculating, cancel the calculation
+                if event.key == pg.K_ESCAPE and self.__worker.busy:
+                    self.__worker.cancel()
+                    self.__error_msg = "Calculation cancelled"
+                    self.__update_text_and_buttons(error=True)
+                    self.__update_busy()
+
+                # otherwise if the user pressed escape, clear the expression
+                elif event.key == pg.K_ESCAPE:
+                    self.__expr = ""
+                    self.__update_text_and_buttons(expr=True)
+
+                # if the user presses backspace, remove 1 character from the expression
+                elif event.key == pg.K_BACKSPACE:
+                    self.__expr = self.__expr[:-1]
+                    self.__update_text_and_buttons(expr=True)
+
+                # if either or the return/enter keys are pressed, call the 'calculate' method
+                elif event.key == pg.K_RETURN or event.key == pg.K_KP_ENTER:
+                    self.__calculate()
+
+                # otherwise add the text to the expression
+                else:
+
+                    # if the first thing they type isn't a number or a letter, insert the last answer into the start of the expression
+                    if event.key not in [pg.K_0, pg.K_1, pg.K_2, pg.K_3, pg.K_4, pg.K_5, pg.K_6, pg.K_7, pg.K_8, pg.K_9, pg.K_KP0, pg.K_KP1, pg.K_KP2, pg.K_KP3, pg.K_KP4, pg.K_KP5, pg.K_KP6, pg.K_KP7, pg.K_KP8, pg.K_KP9, pg.K_a, pg.K_b, pg.K_c, pg.K_d, pg.K_e, pg.K_f, pg.K_g, pg.K_h, pg.K_i, pg.K_j, pg.K_k, pg.K_l, pg.K_m, pg.K_n, pg.K_o, pg.K_p, pg.K_q, pg.K_r, pg.K_s, pg.K_t, pg.K_u, pg.K_v, pg.K_w, pg.K_x, pg.K_y, pg.K_z] and self.__expr == "":
+                        self.__expr = self.__ans
+
+                    self.__ans = self.__error_msg = ""
+                    self.__expr += event.unicode
+                    self.__update_text_and_buttons(expr=True, ans=True, error=True)
+
+            elif event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
+                mouse_pos = pg.mouse.get_pos()
+
+                # if the user clicked the instructions button, change to instructions mode
+                if self.__button_instructions.is_within(mouse_pos):
+                    self.__change_mode("instructions")
+
+                # if the user clicked the clear memory button, clear the memory
+                elif self.__button_clear_memory.is_within(mouse_pos):
+                    self.__calculator.clear_memory()
+                    self.__ans = self.__error_msg = ""
+                    self.__update_text_and_buttons(memory=True, ans=True, error=True)
+
+                # if the user clicked on a memory item, insert that item into the expression
+                else:
+                    index = self.__list_memory.row_at(mouse_pos)
+                    if index is not None:
+                        self.__expr += "M{}".format(index + 1)
+                        self.__update_text_and_buttons(expr=True)
+
+            # if the user scrolled over the memory, scroll through it
+            elif event.type == pg.MOUSEBUTTONDOWN and event.button in (4, 5):
+                if self.__list_memory.rect.collidepoint(pg.mouse.get_pos()):
+                    if self.__list_memory.scroll(-30 if event.button == 4 else 30):
+                        self.__invalidate(self.__list_memory.rect)
+
+    def __mode_instructions(self, events):
+        """Handles the events when in instructions mode"""
+
+        for event in events:
+
+            # if the user pressed escape or clicked the back button, change to normal mode
+            if event.type == pg.KEYDOWN:
+                if event.key == pg.K_ESCAPE:
+                    self.__change_mode("normal")
+            elif event.type == pg.MOUSEBUTTONDOWN:
+                if event.button == 1:
+                    mouse_pos = pg.mouse.get_pos()
+                    if self.__button_back.is_within(mouse_pos):
+                        self.__change_mode("normal")
+
+                # if the user scrolled up, lower the intemediate surface but not lower than the origin
+                elif event.button == 4:
+                    self.__scroll_instructions(min(self.__scroll + 15, 0))
+
+                # if the user scrolled down, raise the intemediate surface but not higher than the point
+                # where the bottom instructions line is fully visible
+                elif event.button == 5:
+                    self.__scroll_instructions(max(self.__scroll - 15, self.__HEIGHT - self.__num_instructions_lines * 20 - 100))
+
+    def __scroll_instructions(self, scroll):
+        """Scroll the instructions to 'scroll' and redraw them if they moved"""
+
+        if scroll != self.__scroll:
+            self.__scroll = scroll
+            self.__invalidate((0, 100, self.__WIDTH, self.__HEIGHT - 100))
+
+    def __clean_up_expr(self, expr):
+        """Remove whitespace and extra brackets on the outside of the expression"""
+
+        expr = expr.strip()
+        if len(expr) > 0:
+            while expr[0] == "(" and expr[-1] == ")":
+                expr = expr[1:-1].strip()
+
+        return expr
+
+    def __prepare_expr(self):
+        """Return the expression ready to be calculated, raising 'CalcError' if it contains invalid memory references"""
+
+        # clean up the expression and then replace all memory references ('ans' and 'Mx') with the actual answers, so their brackets aren't removed
+        # (it isn't made lower case as the paths of files of numbers are case sensitive - the calculator ignores the case of everything else)
+        return self.__calculator.insert_answers(self.__clean_up_expr(self.__expr))
+
+    def __calculate(self):
+        """Send the expression to the worker to calculate the answer and show that it is being calculated"""
+
+        # send the prepared expression to the worker, catching errors and displaying them
+        try:
+            self.__worker.submit(self.__prepare_expr(), self.__calculator.definition_sources(), None, "")
+        except CalcError as e:
+            self.__error_msg = str(e)
+            self.__ans = ""
+            self.__update_text_and_buttons(ans=True, error=True)
+        else:
+            self.__submitted_expr = self.__expr
+            self.__error_msg = self.__ans = ""
+            self.__update_text_and_buttons(ans=True, error=True)
+            self.__update_busy()
+
+    def __poll_worker(self):
+        """Check whether the worker has calculated the answer and if so update everything"""
+
+        if not self.__worker.busy:
+            return
+
+        # get the answer if it has arrived, catching errors and displaying them
+        try:
+            result = self.__worker.poll()
+        except CalcError as e:
+            self.__error_msg = str(e)
+            self.__ans = ""
+            self.__update_text_and_buttons(ans=True, error=True)
+        else:
+
+            # if it's still being calculated, animate the busy indicator
+            if result is None:
+                self.__update_busy()
+                return
+
+            # store the answer in memory and clear the expression unless the user has changed it since
+            expr, self.__ans = result
+            self.__calculator.remember(expr, self.__ans)
+            self.__error_msg = ""
+            if self.__expr == self.__submitted_expr:
+                self.__expr = ""
+            self.__update_text_and_buttons(True, True, True, True)
+
+        self.__update_busy()
+
+    def __update_busy(self):
+        """Update the busy indicator - 'Calculating' with a number of dots that increases over time - if it has changed"""
+
+        message = "Calculating" + "." * (pg.time.get_ticks() // 300 % 4) if self.__worker.busy else ""
+        if message != self.__busy_message:
+            self.__busy_message = message
+            self.__edit_text(self.__text_busy, message)
+
+    def __poll_preview(self):
+        """Start previewing the answer once the user has stopped typing and show the preview once it has been calculated"""
+
+        now = pg.time.get_ticks()
+
+        # send the expression to the preview worker once it's due, showing no preview if it's empty or the memory references are invalid
+        if self.__preview_due is not None and now >= self.__preview_due:
+            self.__preview_due = None
+            try:
+                expr = self.__prepare_expr()
+            except CalcError:
+                expr = ""
+            if expr == "":
+                self.__preview_worker.cancel()
+                self.__edit_text(self.__text_preview, "")
+            else:
+
+                # previews are usually quick so the last one is replaced rather than cancelled, as cancelling restarts the worker process
+                # (throwing away what it keeps to preview quicker), with the budget starting from when the worker started being busy
+                if not self.__preview_worker.busy:
+                    self.__preview_started = now
+                self.__preview_worker.replace(expr, self.__calculator.definition_sources(), "")
+
+        if self.__preview_worker.busy:
+            result = self.__preview_worker.poll()
+
+            # show the preview (the answer is 'None' if the expression is incomplete or invalid so show nothing)
+            if result is not None:
+                self.__edit_text(self.__text_preview, "" if result[1] is None else format_text("= " + result[1], 18, 1, True)[0])
+
+            # give up on previews that take too long
+            elif now - self.__preview_started > self.__PREVIEW_BUDGET:
+                self.__preview_worker.cancel()
+                self.__edit_text(self.__text_preview, "")
+
+    def __edit_text(self, text, message):
+        """Edit the message on a text object and redraw the areas it covered before and covers after"""
+
+        old_rect = text.rect.copy()
+        text.edit_text_message(message)
+        self.__invalidate(old_rect)
+        self.__invalidate(text.rect)
+
+    def __update_text_and_buttons(self, memory=False, expr=False, ans=False, error=False):
+        """
+        Update the message on text and button objects if the message has changed
+        The parameters are whether or not to update the message on those text/button objects
+        """
+
+        # the areas the objects covered before updating need redrawing as well as the areas they cover after
+        old_rects = self.__widget_rects(memory, expr, ans, error)
+
+        # if we need to update the memory list, forget the formatted items as they are now numbered differently
+        if memory:
+            self.__list_memory.reset()
+
+        # if we need to update the expression text objects:
+        if expr:
+
+            # preview the answer to the new expression once the user has stopped typing for a moment
+            self.__preview_due = pg.time.get_ticks() + self.__PREVIEW_DELAY
+
+            # format the expression into lines
+            lines = format_text(self.__expr, 18, 5, True)
+            count = 0
+            for line in lines:
+
+                # if there are already enough objects, change the message on it
+                if len(self.__texts_expr) > count:
+                    self.__texts_expr[count].edit_text_message(line)
+
+                # otherwise, create a new object with the message
+                else:
+                    self.__texts_expr.append(self.__drawer.text(line, 35, COLOURS["blue"], (300, 200 + (30 * count))))
+
+                count += 1
+
+            # remove unnecessary objects
+            self.__texts_expr = self.__texts_expr[:count]
+
+        # if we need to update the answer text objects:
+        if ans:
+
+            # format the answer into lines
+            lines = format_text(self.__ans, 18, 5, True)
+            count = 0
+            for line in lines:
+
+                # if there are already enough objects, change the message on it
+                if len(self.__texts_ans) > count:
+                    self.__texts_ans[count].edit_text_message(line)
+
+                # otherwise, create a new object with the message
+                else:
+                    self.__texts_ans.append(self.__drawer.text(line, 35, COLOURS["green"], (300, 400 + (30 * count))))
+
+                count += 1
+
+            # remove unnecessary objects
+            self.__texts_ans = self.__texts_ans[:count]
+
+        # if we need to update the error text objects:
+        if error:
+
+            # format the error message into lines
+            lines = format_text(self.__error_msg, 40, 3)
+            count = 0
+            for line in lines:
+
+                # if there are already enough objects, change the message on it
+                if len(self.__texts_error_msg) > count:
+                    self.__texts_error_msg[count].edit_text_message(line)
+
+                # otherwise, create a new object with the message
+                else:
+                    self.__texts_error_msg.append(self.__drawer.text(line, 25, COLOURS["red"], (300, 100 + (25 * count))))
+
+                count += 1
+
+            # remove unnecessary objects
+            self.__texts_error_msg = self.__texts_error_msg[:count]
+
+        for rect in old_rects + self.__widget_rects(memory, expr, ans, error):
+            self.__invalidate(rect)
+
+    def __widget_rects(self, memory=False, expr=False, ans=False, error=False):
+        """Return the areas of the display covered by the text/button objects for each of the parameters that are true"""
+
+        widgets = []
+        if memory:
+            widgets.append(self.__list_memory)
+        if expr:
+            widgets += self.__texts_expr
+        if ans:
+            widgets += self.__texts_ans
+        if error:
+            widgets += self.__texts_error_msg
+
+        return [widget.rect.copy() for widget in widgets]
+
+    def __format_memory_item(self, index):
+        """Return the lines of text in the memory list for the item 'index' calculations ago (0 being the most recent)"""
+
+        expression, answer = self.__calculator.memory_item(index + 1)
+        return format_text("{}: {} ({})".format(index + 1, answer, expression), 15, 3, True)
+
+    def __format_instructions(self):
+        """Format the instructions into lines on a scrollable surface"""
+
+        # extend the instructions
+        instructions = "SCROLL DOWN TO VIEW MORE:\n\n" + self.__calculator.instructions + "\n\nTo insert a previous answer into the expression, click on the item in the memory section, scrolling over it to see older answers. You can also type 'ans' to insert the last answer into the expression or 'Mx' to insert the xth answer into the expression.\n\nYou can press ESCAPE at any time to clear the expression and when you start typing on an empty expression it will add the previous answer before it unless you type a number of just pressed ESCAPE.\n\nWhile you type, a preview of the answer is shown in black once you stop for a moment. Press ENTER to calculate the answer and, if it is taking too long, press ESCAPE to cancel it."
+
+        # format the instructions into lines
+        lines = format_text(instructions, 75)
+
+        # make the intemediate surface just bit enough to hold all the instruction lines and make it the background colour
+        self.__intermediate = pg.surface.Surface((self.__WIDTH, len(lines) * 20 + 10))
+        self.__intermediate.fill(self.__BACKGROUND_COLOUR)
+
+        # make a new drawer to draw on the intemediate surface
+        new_drawer = Draw(self.__intermediate, self.__FONT)
+
+        # draw each line onto the intermediate surface once as it never changes
+        for count, line in enumerate(lines):
+            new_drawer.text(line, 20, COLOURS["black"], (400, 10 + 20 * count)).draw()
+        self.__num_instructions_lines = len(lines)
+
+if __name__ == "__main__":
+    Window().run()
@@ -0,0 +1,150 @@
+"""
+Calculates expressions in a separate process so a user interface stays responsive while they are calculated
+
+Instantiate the 'Worker' class and:
+- use the 'submit' method to start calculating an expression (with any other arguments the target function needs)
+  (or the 'replace' method to calculate it after the last one, rather than cancelling it, when the last one is usually quick such as for previews)
+- call the 'poll' method regularly to get the answer once it has been calculated
+- use the 'cancel' method to stop the calculation, for example if it is taking too long
+- use the 'close' method when finished with it
+
+Only 1 expression is calculated at a time so submitting another while one is being calculated cancels the first, which restarts the process,
+whereas replacing it only ignores its answer so the process (and anything it keeps to be quicker next time) is kept
+"""
+
+from multiprocessing import get_context
+from Calc import calculate
+from Errors import CalcError
+
+def serve(connection, target):
+    """
+    Calculate each expression received through 'connection' and send back the answer or error message
+    Runs in the worker process until the connection is closed
+
+    :param connection (Connection): The worker process's end of the pipe to the user interface
+    :param target (function): The function to calculate the answer to an expression with
+    """
+
+    while True:
+        try:
+            job_id, expr, args = connection.recv()
+
+            # skip expressions that have been replaced by the time they'd be calculated
+            while connection.poll():
+                job_id, expr, args = connection.recv()
+        except EOFError:
+            return
+
+        # send back the answer or the error message (errors in the code are sent back to be raised in the user interface)
+        try:
+            connection.send((job_id, target(expr, *args), None))
+        except CalcError as e:
+            connection.send((job_id, None, str(e)))
+        except Exception as e:
+            connection.send((job_id, None, e))
+
+# start worker processes from scratch rather than forking so they don't inherit anything from the
+# user interface (such as pygame's signal handlers, which would stop them being terminated)
+context = get_context("spawn")
+
+class Worker:
+    """
+    Calculates expressions in a separate process that can be stopped at any time
+    The process is started when the worker is created and restarted after a calculation is cancelled
+
+    :param target (function): The function to calculate answers with, which must be defined at the top level of a module. Default: 'calculate' from 'Calc.py'
+    """
+
+    def __init__(self, target=calculate):
+
+        # private attributes
+        self.__target = target
+        self.__process = None
+        self.__connection = None
+        self.__job_id = 0
+        self.__expr = None
+        self.__start()
+
+    def __start(self):
+        """Start the worker process"""
+
+        self.__connection, child_connection = context.Pipe()
+        self.__process = context.Process(target=serve, args=(child_connection, self.__target), daemon=True)
+        self.__process.start()
+        child_connection.close()
+
+    @property
+    def busy(self):
+        """Return whether or not an expression is being calculated"""
+        return self.__expr is not None
+
+    @property
+    def expr(self):
+        """Return the expression being calculated or 'None' if there isn't one"""
+        return self.__expr
+
+    def submit(self, expr, *args):
+        """
+        Start calculating 'expr', cancelling the last expression if it hasn't finished
+
+        :param expr (str): The expression to calculate
+        :param args: Any other arguments to give the target function after the expression, which must be able to be pickled
+        """
+
+        if self.busy:
+            self.cancel()
+
+        self.replace(expr, *args)
+
+    def replace(self, expr, *args):
+        """
+        Start calculating 'expr' once the last expression has finished (if it hasn't) without cancelling it, ignoring the last one's answer
+        The process isn't restarted so this is quicker than 'submit' unless the last expression takes a long time
+
+        :param expr (str): The expression to calculate
+        :param args: Any other arguments to give the target function after the expression, which must be able to be pickled
+        """
+
+        self.__job_id += 1
+        self.__expr = expr
+        self.__connection.send((self.__job_id, expr, args))
+
+    def poll(self):
+        """
+        Return the answer if the expression has been calculated, otherwise 'None'
+        If the expression was invalid, raise 'CalcError' with the error message
+
+        :return (tuple): A 2-value tuple where the 0th index is the string expression and the 1st is the string answer
+        """
+
+        while self.busy and self.__connection.poll():
+            job_id, ans, error = self.__connection.recv()
+
+            # ignore answers to jobs that have since been replaced
+            if job_id != self.__job_id:
+                continue
+
+            expr, self.__expr = self.__expr, None
+            if isinstance(error, str):
+                raise CalcError(error)
+            if error is not None:
+                raise error
+
+            return expr, ans
+
+        return None
+
+    def cancel(self):
+        """Stop calculating the current expression by stopping the worker process and starting a new one"""
+
+        if self.busy:
+            self.__expr = None
+            self.close()
+            self.__start()
+
+    def close(self):
+        """Stop the worker process"""
+
+        self.__connection.close()
+        self.__process.terminate()
+        self.__process.join()